@@ -1,11 +1,25 @@
 """LangGraph agent for wearables assistant chatbot."""
+import json
+import time
+import uuid
 from typing import Annotated, TypedDict, Literal
 from dotenv import load_dotenv
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from execution_stats import execution_stats
+from llm_gateway import llm_gateway
+from model_router import ROUTER, RESPONSE, tier_stats, validate_tool_calls
+from offload import process_pool
+from prefetch import tool_prefetcher
+from temporal import temporal_stats
+from tool_selection import estimate_tokens, message_tokens, prompt_accounting, select_tools
+from analytics import detect_anomalies, correlate_metrics, analyze_workout
 from tools import (
     get_daily_steps,
     get_sleep_data,
@@ -13,61 +27,150 @@ from tools import (
     get_activity_history,
     get_weekly_summary,
     get_device_info,
-    search_data_by_date_range
+    search_data_by_date_range,
+    get_dashboard,
+    compare_periods
 )
 
 # Load environment variables
 load_dotenv()
 
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
 
-# Define tools using LangChain's @tool decorator
+
+def _user_id(config: RunnableConfig) -> int:
+    """User the current run is for (set by the API, never by the model)."""
+    return (config or {}).get("configurable", {}).get("user_id", 1)
+
+
+def cpu_heavy(tool_):
+    """Mark a tool as CPU-heavy in the registry (its body runs its analysis in the process pool)."""
+    tool_.metadata = {**(tool_.metadata or {}), "cpu_heavy": True}
+    return tool_
+
+
+# Define tools using LangChain's @tool decorator; the injected config is hidden from the model
 @tool
-def daily_steps_tool(date: str = None, days: int = 7) -> str:
+def daily_steps_tool(date: str = None, days: int = 7, config: RunnableConfig = None) -> str:
     """Get daily step counts. Use 'date' for a specific date (YYYY-MM-DD) or 'days' to look back multiple days."""
-    return get_daily_steps(date, days)
+    return get_daily_steps(date, days, user_id=_user_id(config))
 
 
 @tool
-def sleep_data_tool(date: str = None, days: int = 7) -> str:
+def sleep_data_tool(date: str = None, days: int = 7, config: RunnableConfig = None) -> str:
     """Get sleep data including total sleep, deep sleep, REM sleep, and sleep score. 
     Use 'date' for a specific date (YYYY-MM-DD) or 'days' to look back multiple days."""
-    return get_sleep_data(date, days)
+    return get_sleep_data(date, days, user_id=_user_id(config))
 
 
 @tool
-def heart_rate_tool(date: str = None) -> str:
+def heart_rate_tool(date: str = None, config: RunnableConfig = None) -> str:
     """Get heart rate data including resting, average, max, and min heart rates. 
     Use 'date' for a specific date (YYYY-MM-DD) or leave empty for today."""
-    return get_heart_rate_data(date)
+    return get_heart_rate_data(date, user_id=_user_id(config))
 
 
 @tool
-def activity_history_tool(days: int = 14, activity_type: str = None) -> str:
+def activity_history_tool(days: int = 14, activity_type: str = None, config: RunnableConfig = None) -> str:
     """Get workout and activity history. Optionally filter by activity type (e.g., 'Running', 'Cycling', 'Swimming')."""
-    return get_activity_history(days, activity_type)
+    return get_activity_history(days, activity_type, user_id=_user_id(config))
 
 
 @tool
-def weekly_summary_tool() -> str:
+def weekly_summary_tool(config: RunnableConfig = None) -> str:
     """Get a comprehensive weekly summary of all health and fitness metrics."""
-    return get_weekly_summary()
+    return get_weekly_summary(user_id=_user_id(config))
+
+
+@tool
+def period_comparison_tool(period_days: int = 7, periods: int = 2, end_date: str = None,
+                           config: RunnableConfig = None) -> str:
+    """Compare consecutive periods (e.g. this week vs last week) with exact averages, deltas and
+    percent changes for steps, sleep, resting heart rate and workouts.
+    Args:
+        period_days: Length of each period in days (7 for weeks)
+        periods: Number of consecutive periods to compare (2 or more)
+        end_date: Last day of the most recent period (YYYY-MM-DD); leave empty for today
+    """
+    return compare_periods(period_days, periods, end_date, user_id=_user_id(config))
 
 
 @tool
-def device_info_tool() -> str:
+def device_info_tool(config: RunnableConfig = None) -> str:
     """Get information about the user's wearable device and profile."""
-    return get_device_info()
+    return get_device_info(user_id=_user_id(config))
 
 
 @tool
-def date_range_search_tool(start_date: str, end_date: str, metric_type: str = "steps") -> str:
+def date_range_search_tool(start_date: str, end_date: str, metric_type: str = "steps",
+                           config: RunnableConfig = None) -> str:
     """Search for data within a specific date range. 
     Args:
         start_date: Start date (YYYY-MM-DD)
         end_date: End date (YYYY-MM-DD)
         metric_type: Type of data ('steps' or 'sleep')
     """
-    return search_data_by_date_range(start_date, end_date, metric_type)
+    return search_data_by_date_range(start_date, end_date, metric_type, user_id=_user_id(config))
+
+
+@tool
+def dashboard_tool(start_date: str, end_date: str, metrics: str = "steps,sleep,heart_rate,activities",
+                   config: RunnableConfig = None) -> str:
+    """Get several metrics at once for a date range, aligned per day. Prefer this over calling
+    the individual steps, sleep, heart rate and activity tools one by one for broad questions.
+    Args:
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        metrics: Comma-separated subset of 'steps', 'sleep', 'heart_rate', 'activities'
+    """
+    return get_dashboard(start_date, end_date, metrics, user_id=_user_id(config))
+
+
+@cpu_heavy
+@tool
+def anomaly_detection_tool(days: int = 30, sensitivity: float = 2.5, config: RunnableConfig = None) -> str:
+    """Find unusual days and trends against the user's own baseline: step-count drops, resting
+    heart rate drifting up, accumulating sleep debt and other outliers. Returns only the flagged days.
+    Args:
+        days: Number of recent days to check (default 30)
+        sensitivity: z-score threshold; lower flags more days (default 2.5)
+    """
+    return process_pool.run(detect_anomalies, days, sensitivity, user_id=_user_id(config))
+
+
+@cpu_heavy
+@tool
+def correlation_tool(metric_x: str, metric_y: str, start_date: str = None, end_date: str = None,
+                     max_lag: int = 2, config: RunnableConfig = None) -> str:
+    """Measure how one daily metric relates to another (e.g. does exercise affect sleep?), including
+    delayed effects. Returns Pearson/Spearman coefficients, slopes and sample sizes per lag.
+    Args:
+        metric_x: Possible cause - one of 'steps', 'active_minutes', 'calories_burned', 'distance_km',
+            'sleep_hours', 'deep_sleep_hours', 'rem_sleep_hours', 'sleep_score', 'resting_hr',
+            'workout_minutes', 'workout_calories'
+        metric_y: Possible effect (same choices as metric_x)
+        start_date: Start date (YYYY-MM-DD); leave empty for all history
+        end_date: End date (YYYY-MM-DD); leave empty for all history
+        max_lag: Also test metric_x leading metric_y by up to this many days (default 2)
+    """
+    return process_pool.run(correlate_metrics, metric_x, metric_y, start_date, end_date, max_lag,
+                            user_id=_user_id(config))
+
+
+@cpu_heavy
+@tool
+def workout_analysis_tool(date: str = None, activity_type: str = None, split_km: float = 1.0,
+                          activity_id: int = None, config: RunnableConfig = None) -> str:
+    """Analyze a recorded workout in detail: per-km (or custom) splits with pace and heart rate,
+    and time spent in each heart-rate zone. Defaults to the most recent recorded workout.
+    Args:
+        date: Workout date (YYYY-MM-DD); leave empty for the latest
+        activity_type: Filter by type (e.g., 'Running', 'Cycling')
+        split_km: Split length in km (default 1.0; e.g. 1.609 for miles, 5 for 5 km splits)
+        activity_id: Specific workout ID, if known from a previous analysis
+    """
+    return process_pool.run(analyze_workout, activity_id, date, activity_type, split_km,
+                            user_id=_user_id(config))
 
 
 # Define the state
@@ -83,17 +186,76 @@ tools = [
     heart_rate_tool,
     activity_history_tool,
     weekly_summary_tool,
+    period_comparison_tool,
     device_info_tool,
-    date_range_search_tool
+    date_range_search_tool,
+    dashboard_tool,
+    anomaly_detection_tool,
+    correlation_tool,
+    workout_analysis_tool
 ]
 
 
-def create_agent():
-    """Create the LangGraph agent with tools."""
+def create_agent(gateway=llm_gateway, prefetcher=tool_prefetcher, response_model: str = DEFAULT_MODEL,
+                 router_model: str = None, temperature: float = 0, response_llm=None, router_llm=None,
+                 tool_subsetting: bool = True, timeout: float = None):
+    """
+    Create the LangGraph agent with tools.
+    
+    With a router model, the small model picks tools at every step and the
+    response model only writes final answers (and redoes router steps whose
+    tool calls fail validation). Without one, the response model does both.
+    
+    Args:
+        gateway: LLMGateway that admits, rate-limits and retries model calls
+        prefetcher: ToolPrefetcher that runs predicted tool calls during the first
+            model call of a turn (None disables speculation)
+        response_model: Groq model for final answers
+        router_model: Groq model for tool selection (None or the response model = single tier)
+        temperature: Sampling temperature for both tiers
+        response_llm: Chat model to use instead of response_model (e.g. a local stub)
+        router_llm: Chat model to use instead of router_model (e.g. a local stub)
+        tool_subsetting: Bind only the tools relevant to the question (all tools
+            when the question matches none)
+        timeout: Seconds before a single Groq request is abandoned (None = client default)
+    """
     
-    # Initialize the LLM with tools (using Groq)
-    llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
-    llm_with_tools = llm.bind_tools(tools)
+    # Initialize the LLMs with tools (using Groq); retries are owned by the gateway
+    if response_llm is None:
+        response_llm = ChatGroq(model=response_model, temperature=temperature, max_retries=0,
+                                request_timeout=timeout)
+    if router_llm is None and router_model and router_model != response_model:
+        router_llm = ChatGroq(model=router_model, temperature=temperature, max_retries=0,
+                              request_timeout=timeout)
+    tier_stats.models[RESPONSE] = getattr(response_llm, "model_name", None) or type(response_llm).__name__
+    tier_stats.models[ROUTER] = (getattr(router_llm, "model_name", None) or type(router_llm).__name__) \
+        if router_llm is not None else None
+    
+    # Mapping of tool names to tool functions
+    tool_map = {tool.name: tool for tool in tools}
+    
+    # Tool schemas are converted once; bound models are cached per (tier, tool subset)
+    tool_schemas = {tool.name: convert_to_openai_tool(tool) for tool in tools}
+    schema_tokens = {name: estimate_tokens(json.dumps(schema)) for name, schema in tool_schemas.items()}
+    all_schema_tokens = sum(schema_tokens.values())
+    bound_models = {}
+    
+    def bind(tier: str, names: tuple = None):
+        """Model for a tier with a subset of tools bound (None = all tools)."""
+        key = (tier, names)
+        runnable = bound_models.get(key)
+        if runnable is None:
+            llm = router_llm if tier == ROUTER else response_llm
+            runnable = llm.bind_tools([tool_schemas[name] for name in (names or tool_map)])
+            if tier == ROUTER and hasattr(runnable, "with_config"):
+                # Router text is never shown, so keep its tokens out of the stream
+                runnable = runnable.with_config(tags=[TAG_NOSTREAM])
+            bound_models[key] = runnable
+        return runnable
+    
+    bind(RESPONSE)
+    if router_llm is not None:
+        bind(ROUTER)
     
     # System message
     system_message = SystemMessage(content="""You are a helpful AI assistant for wearables and health tracking data. 
@@ -105,8 +267,13 @@ You can help users with:
 - Heart rate data and trends
 - Workout and exercise history
 - Weekly summaries of all metrics
+- Period-over-period comparisons (e.g. this week vs last week)
 - Device and profile information
 - Custom date range queries
+- Multi-metric dashboards (steps, sleep, heart rate and workouts together) for a date range
+- Spotting unusual days and trends (step drops, resting heart rate drift, sleep debt)
+- Relationships between metrics (e.g. whether exercise affects sleep), including delayed effects
+- Detailed workout analysis (splits, pace, heart-rate zones) for imported GPS/heart-rate recordings
 
 IMPORTANT INSTRUCTIONS:
 - NEVER mention the names of tools, functions, or technical implementation details (like "activity_history_tool", "daily_steps_tool", etc.)
@@ -115,25 +282,91 @@ IMPORTANT INSTRUCTIONS:
 - Instead of "I'll use the activity_history_tool", say "Let me check your activity history" or "I'll review your recent activities"
 - Instead of "using the sleep_data_tool", say "Let me look at your sleep data" or "Checking your sleep records"
 - Focus on the information and insights, not the mechanics of how you obtain them
+- For broad questions covering several metrics, fetch them together in one dashboard request instead of one metric at a time
+- For comparisons between periods, use the computed deltas and percentages rather than doing the arithmetic yourself
+- To check for anything unusual, use the anomaly results instead of scanning raw day-by-day data
+- For "does X affect Y" questions, use the correlation results and explain the strength and sample size honestly
 
 Be friendly, informative, and provide insights when relevant. When users ask vague questions, 
 check the appropriate data or ask for clarification. Always format data clearly and highlight important trends.""")
+    prefix = [system_message]
+    system_tokens = estimate_tokens(system_message.content)
     
-    # Define the agent node
-    def call_model(state: AgentState) -> AgentState:
-        """Call the model with the current state."""
+    def invoke_tier(tier: str, state: AgentState, config: RunnableConfig):
+        """Call one model tier through the gateway with the tools relevant to this turn."""
         messages = state["messages"]
         
-        # Add system message if this is the first call
-        if not any(isinstance(m, SystemMessage) for m in messages):
-            messages = [system_message] + messages
+        # The question of this turn decides which tools are bound
+        names = None
+        if tool_subsetting:
+            question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+            names = select_tools(question if isinstance(question, str) else "", tool_map)
+        runnable = bind(tier, names)
+        
+        # Precomputed system prefix (unless the history already has one), then the turn's date context
+        configurable = config.get("configurable", {})
+        head = [] if messages and isinstance(messages[0], SystemMessage) else prefix
+        context = configurable.get("temporal_context")
+        prompt = head + ([SystemMessage(content=context)] if context else []) + messages
+        
+        response = tier_stats.timed(tier, lambda: gateway.invoke(
+            runnable,
+            prompt,
+            channel_id=configurable.get("channel_id", "default"),
+            priority=configurable.get("priority", 0),
+            deadline=configurable.get("deadline")
+        ))
+        
+        usage = getattr(response, "usage_metadata", None) or {}
+        prompt_accounting.record(
+            tier,
+            system_tokens=system_tokens if head else 0,
+            tool_schema_tokens=sum(schema_tokens[name] for name in names) if names else all_schema_tokens,
+            variable_tokens=message_tokens(messages) + (estimate_tokens(context) if context else 0),
+            tools_bound=len(names) if names else len(tool_map),
+            all_tools_tokens=all_schema_tokens,
+            reported_input_tokens=usage.get("input_tokens")
+        )
+        return response
+    
+    # Define the agent node
+    def call_model(state: AgentState, config: RunnableConfig) -> AgentState:
+        """Call the model with the current state (the router tier, if there is one)."""
+        start = time.perf_counter()
+        configurable = config.get("configurable", {})
         
-        response = llm_with_tools.invoke(messages)
+        # Start of a turn: run the likely tool calls while the model decides
+        if prefetcher is not None and isinstance(state["messages"][-1], HumanMessage):
+            prefetcher.start(configurable.get("turn_id"), state["messages"][-1].content, tool_map,
+                             {"configurable": dict(configurable)}, today=configurable.get("today"))
+        
+        if router_llm is None:
+            response = invoke_tier(RESPONSE, state, config)
+        else:
+            response = invoke_tier(ROUTER, state, config)
+            if not response.tool_calls and not getattr(response, "invalid_tool_calls", None):
+                # No (more) tools needed: the respond node writes the answer
+                execution_stats.record_node("agent", time.perf_counter() - start)
+                return {"messages": []}
+            errors = validate_tool_calls(response, tool_map)
+            if errors:
+                tier_stats.record_fallback(errors)
+                response = invoke_tier(RESPONSE, state, config)
+        execution_stats.record_node("agent", time.perf_counter() - start)
+        return {"messages": [response]}
+    
+    # Define the response node (router tier only)
+    def respond(state: AgentState, config: RunnableConfig) -> AgentState:
+        """Write the answer with the response model (it may still ask for tools)."""
+        start = time.perf_counter()
+        response = invoke_tier(RESPONSE, state, config)
+        execution_stats.record_node("respond", time.perf_counter() - start)
         return {"messages": [response]}
     
     # Define the tool execution node
-    def execute_tools(state: AgentState) -> AgentState:
+    def execute_tools(state: AgentState, config: RunnableConfig) -> AgentState:
         """Execute tools based on the model's tool calls."""
+        start = time.perf_counter()
         messages = state["messages"]
         last_message = messages[-1]
         
@@ -141,21 +374,32 @@ check the appropriate data or ask for clarification. Always format data clearly
         tool_calls = getattr(last_message, "tool_calls", [])
         
         if not tool_calls:
+            execution_stats.record_node("tools", time.perf_counter() - start)
             return {"messages": []}
         
-        # Create a mapping of tool names to tool functions
-        tool_map = {tool.name: tool for tool in tools}
+        configurable = config.get("configurable", {})
+        handle = prefetcher.handle(configurable.get("turn_id")) if prefetcher else None
+        # Batches share tool results across their turns
+        tool_cache = configurable.get("tool_cache")
         
         # Execute each tool call
         tool_messages = []
         for tool_call in tool_calls:
             tool_name = tool_call["name"]
             tool_args = tool_call["args"]
+            execution_stats.record_tool(tool_name)
             
             if tool_name in tool_map:
                 tool_func = tool_map[tool_name]
                 try:
-                    result = tool_func.invoke(tool_args)
+                    # Use the speculative result when the prediction matched
+                    result = handle.take(tool_name, tool_args) if handle else None
+                    if result is None and tool_cache is not None:
+                        result = tool_cache.get_or_run(tool_func, tool_args, _user_id(config),
+                                                       lambda: tool_func.invoke(tool_args, config))
+                    elif result is None:
+                        # The run config carries the user the tools should query
+                        result = tool_func.invoke(tool_args, config)
                     tool_messages.append({
                         "role": "tool",
                         "content": str(result),
@@ -170,11 +414,12 @@ check the appropriate data or ask for clarification. Always format data clearly
                         "name": tool_name
                     })
         
+        execution_stats.record_node("tools", time.perf_counter() - start)
         return {"messages": tool_messages}
     
     # Define routing logic
-    def should_continue(state: AgentState) -> Literal["tools", "end"]:
-        """Determine if we should continue to tools or end."""
+    def should_continue(state: AgentState) -> Literal["tools", "respond", "end"]:
+        """Determine if we should continue to tools, hand over to the response model or end."""
         messages = state["messages"]
         last_message = messages[-1]
         
@@ -182,6 +427,10 @@ check the appropriate data or ask for clarification. Always format data clearly
         if hasattr(last_message, "tool_calls") and last_message.tool_calls:
             return "tools"
         
+        # The router added nothing: the response model answers
+        if not isinstance(last_message, AIMessage):
+            return "respond"
+        
         # Otherwise, end
         return "end"
     
@@ -191,28 +440,45 @@ check the appropriate data or ask for clarification. Always format data clearly
     # Add nodes
     workflow.add_node("agent", call_model)
     workflow.add_node("tools", execute_tools)
+    if router_llm is not None:
+        workflow.add_node("respond", respond)
     
     # Set entry point
     workflow.set_entry_point("agent")
     
     # Add edges
-    workflow.add_conditional_edges(
-        "agent",
-        should_continue,
-        {
-            "tools": "tools",
-            "end": END
-        }
-    )
+    routes = {"tools": "tools", "end": END}
+    if router_llm is not None:
+        workflow.add_conditional_edges("respond", should_continue, routes)
+        routes = {**routes, "respond": "respond"}
+    workflow.add_conditional_edges("agent", should_continue, routes)
     workflow.add_edge("tools", "agent")
     
-    # Compile the graph
+    # Compile the graph; chat() and stream_chat() end turns on the prefetcher it starts them on
     app = workflow.compile()
+    app.prefetcher = prefetcher
     
     return app
 
 
-def chat(agent, user_message: str, conversation_history: list = None) -> tuple[str, list]:
+def _run_config(channel_id: str, deadline: float = None, priority: int = 0, user_id: int = 1,
+                turn_id: str = None, temporal_context: str = None, tool_cache=None, today=None) -> dict:
+    """Build the LangGraph run config read by the agent nodes and tools."""
+    return {"configurable": {"channel_id": channel_id, "deadline": deadline, "priority": priority,
+                             "user_id": user_id, "turn_id": turn_id, "temporal_context": temporal_context,
+                             "tool_cache": tool_cache, "today": today}}
+
+
+def _finish_turn(agent, turn_id: str):
+    """Cancel or count the turn's unused speculative tool calls."""
+    prefetcher = getattr(agent, "prefetcher", None)
+    if prefetcher is not None:
+        prefetcher.finish(turn_id)
+
+
+def chat(agent, user_message: str, conversation_history: list = None,
+         channel_id: str = "default", deadline: float = None, user_id: int = 1,
+         timezone: str = None, priority: int = 0, tool_cache=None) -> tuple[str, list]:
     """
     Send a message to the agent and get a response.
     
@@ -220,6 +486,12 @@ def chat(agent, user_message: str, conversation_history: list = None) -> tuple[s
         agent: The compiled LangGraph agent
         user_message: The user's message
         conversation_history: Previous messages in the conversation
+        channel_id: Channel the conversation belongs to (for fair LLM queuing)
+        deadline: time.monotonic() value after which LLM calls are rejected
+        user_id: User whose data the tools query
+        timezone: User's IANA timezone for resolving dates (None = default)
+        priority: LLM queue priority (lower values are served first)
+        tool_cache: ToolResultCache shared with other turns (e.g. of a batch)
     
     Returns:
         Tuple of (response text, updated conversation history)
@@ -230,8 +502,21 @@ def chat(agent, user_message: str, conversation_history: list = None) -> tuple[s
     # Add the user message
     conversation_history.append(HumanMessage(content=user_message))
     
-    # Run the agent
-    result = agent.invoke({"messages": conversation_history})
+    # Resolve date expressions before the graph runs
+    temporal_context, resolved = temporal_stats.context_for(user_message, timezone)
+    
+    # Run the agent, recording node timings for the graph heatmap
+    turn_id = str(uuid.uuid4())
+    try:
+        with execution_stats.track():
+            result = agent.invoke({"messages": conversation_history},
+                                  _run_config(channel_id, deadline, priority, user_id=user_id, turn_id=turn_id,
+                                              temporal_context=temporal_context, tool_cache=tool_cache,
+                                              today=temporal_stats.today(timezone)))
+    finally:
+        _finish_turn(agent, turn_id)
+    temporal_stats.record_turn(resolved, temporal_context is not None,
+                               result["messages"][len(conversation_history):])
     
     # Get the final response
     final_message = result["messages"][-1]
@@ -241,3 +526,79 @@ def chat(agent, user_message: str, conversation_history: list = None) -> tuple[s
     conversation_history = result["messages"]
     
     return response_text, conversation_history
+
+
+def stream_chat(agent, user_message: str, conversation_history: list = None,
+                channel_id: str = "default", deadline: float = None, user_id: int = 1,
+                timezone: str = None):
+    """
+    Send a message to the agent and stream incremental events.
+    
+    Args:
+        agent: The compiled LangGraph agent
+        user_message: The user's message
+        conversation_history: Previous messages in the conversation
+        channel_id: Channel the conversation belongs to (for fair LLM queuing)
+        deadline: time.monotonic() value after which LLM calls are rejected
+        user_id: User whose data the tools query
+        timezone: User's IANA timezone for resolving dates (None = default)
+    
+    Yields:
+        Event dicts with a "type" of "token", "tool_start", "tool_end" or
+        "final". The "final" event carries the response text and the
+        updated conversation history.
+    """
+    if conversation_history is None:
+        conversation_history = []
+    
+    # Add the user message
+    conversation_history.append(HumanMessage(content=user_message))
+    
+    temporal_context, resolved = temporal_stats.context_for(user_message, timezone)
+    
+    final_state = None
+    turn_id = str(uuid.uuid4())
+    try:
+        with execution_stats.track():
+            for mode, chunk in agent.stream(
+                {"messages": conversation_history},
+                _run_config(channel_id, deadline, user_id=user_id, turn_id=turn_id,
+                            temporal_context=temporal_context, today=temporal_stats.today(timezone)),
+                stream_mode=["messages", "updates", "values"]
+            ):
+                if mode == "messages":
+                    # LLM tokens from the agent node
+                    message_chunk, metadata = chunk
+                    if metadata.get("langgraph_node") in ("agent", "respond") \
+                            and isinstance(message_chunk.content, str) \
+                            and message_chunk.content:
+                        yield {"type": "token", "content": message_chunk.content}
+                
+                elif mode == "updates":
+                    for node, update in chunk.items():
+                        for message in (update or {}).get("messages", []):
+                            if node == "agent":
+                                for tool_call in getattr(message, "tool_calls", None) or []:
+                                    yield {
+                                        "type": "tool_start",
+                                        "tool_name": tool_call["name"],
+                                        "arguments": tool_call["args"]
+                                    }
+                            elif node == "tools":
+                                content = message["content"] if isinstance(message, dict) else message.content
+                                name = message["name"] if isinstance(message, dict) else message.name
+                                yield {"type": "tool_end", "tool_name": name, "result": str(content)[:500]}
+                
+                elif mode == "values":
+                    final_state = chunk
+    finally:
+        _finish_turn(agent, turn_id)
+    temporal_stats.record_turn(resolved, temporal_context is not None,
+                               final_state["messages"][len(conversation_history):])
+    
+    final_message = final_state["messages"][-1]
+    yield {
+        "type": "final",
+        "content": final_message.content,
+        "history": final_state["messages"]
+    }
@@ -0,0 +1,541 @@
+"""Vectorized analytics over wearables data (baselines and anomaly detection)."""
+import threading
+import warnings
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from tools import get_db_connection, get_data_versions
+
+# Daily series used for baselines, with the direction that counts as "worse":
+# -1 means unusually low values are flagged, +1 means unusually high values are.
+METRICS = ("steps", "active_minutes", "sleep_hours", "sleep_score", "resting_hr")
+METRIC_DIRECTION = np.array([-1, -1, -1, -1, +1])
+METRIC_LABELS = {
+    "steps": ("steps", "{:,.0f}"),
+    "active_minutes": ("active minutes", "{:.0f} min"),
+    "sleep_hours": ("sleep", "{:.1f}h"),
+    "sleep_score": ("sleep score", "{:.0f}"),
+    "resting_hr": ("resting HR", "{:.0f} bpm"),
+}
+# Smallest baseline spread per metric, so flat history doesn't turn noise into anomalies
+MIN_SCALE = np.array([500.0, 5.0, 0.25, 3.0, 1.5])
+
+# Tables whose rows feed the daily series, with their date expression
+SOURCE_TABLES = {
+    "daily_metrics": "date",
+    "sleep_data": "date",
+    "heart_rate": "date(timestamp)",
+    "heart_rate_minute": "date(timestamp)",
+    "heart_rate_hour": "date(timestamp)",
+}
+
+BASELINE_WINDOW = 28  # Trailing days used for the median/MAD baseline
+MIN_BASELINE_DAYS = 7  # Days of history required before scoring
+EWMA_ALPHA = 0.3  # Smoothing for sustained shifts (drift)
+SLEEP_DEBT_DAYS = 7
+SLEEP_DEBT_HOURS = 5.0  # Accumulated shortfall vs baseline that is flagged
+
+
+def _load_rows(cursor, user_id: int, since: str) -> list:
+    """Fetch (date, metric, value) rows on or after `since` in one query."""
+    cursor.execute('''
+        SELECT date, 'steps', steps FROM daily_metrics WHERE user_id = :user AND date >= :since
+        UNION ALL
+        SELECT date, 'active_minutes', active_minutes FROM daily_metrics WHERE user_id = :user AND date >= :since
+        UNION ALL
+        SELECT date, 'sleep_hours', total_sleep_hours FROM sleep_data WHERE user_id = :user AND date >= :since
+        UNION ALL
+        SELECT date, 'sleep_score', sleep_score FROM sleep_data WHERE user_id = :user AND date >= :since
+        UNION ALL
+        SELECT date(timestamp), 'resting_hr', SUM(sum_resting) / SUM(resting_count)
+        FROM heart_rate_samples WHERE user_id = :user AND timestamp >= :since
+        GROUP BY date(timestamp)
+    ''', {"user": user_id, "since": since})
+    return cursor.fetchall()
+
+
+def _pivot(rows: list, first_day: Optional[date] = None, metrics: tuple = METRICS):
+    """
+    Turn (date, metric, value) rows into a contiguous daily matrix.
+
+    Returns:
+        Tuple of (list of dates, float array of shape (len(metrics), days) with NaN gaps)
+    """
+    if not rows:
+        return [], np.empty((len(metrics), 0))
+    days = [datetime.strptime(row[0], '%Y-%m-%d').date() for row in rows]
+    start = first_day or min(days)
+    length = (max(days) - start).days + 1
+    values = np.full((len(metrics), length), np.nan)
+    metric_index = {name: i for i, name in enumerate(metrics)}
+    for day, (_, metric, value) in zip(days, rows):
+        if value is not None:
+            values[metric_index[metric], (day - start).days] = value
+    return [start + timedelta(days=i) for i in range(length)], values
+
+
+def _score(history: np.ndarray, new: np.ndarray, ewma: np.ndarray):
+    """
+    Score new days against the trailing baseline of the days before them.
+
+    All metrics are scored at once: rolling windows come from a strided
+    view, and the EWMA recursion runs over days with metrics vectorized.
+
+    Args:
+        history: Values of earlier days, shape (metrics, n)
+        new: Values of the days to score, shape (metrics, m)
+        ewma: EWMA state after the last history day, shape (metrics,)
+
+    Returns:
+        Tuple of (baseline median, robust z, EWMA z, updated EWMA state, EWMA values)
+    """
+    metrics, m = new.shape
+    tail = history[:, -BASELINE_WINDOW:]
+    pad = np.full((metrics, BASELINE_WINDOW - tail.shape[1]), np.nan)
+    combined = np.concatenate([pad, tail, new], axis=1)
+
+    # Window j holds the BASELINE_WINDOW days strictly before new day j
+    windows = np.lib.stride_tricks.sliding_window_view(combined, BASELINE_WINDOW, axis=1)[:, :m]
+    enough = np.sum(~np.isnan(windows), axis=2) >= MIN_BASELINE_DAYS
+    with warnings.catch_warnings():
+        # All-NaN windows (no history yet) are expected and masked below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(windows, axis=2)
+        mad = np.nanmedian(np.abs(windows - median[:, :, None]), axis=2)
+    median[~enough] = np.nan
+    scale = np.maximum(1.4826 * mad, MIN_SCALE[:, None])
+    z = (new - median) / scale
+
+    ewma = ewma.copy()
+    ewma_values = np.empty_like(new)
+    for j in range(m):
+        observed = ~np.isnan(new[:, j])
+        first = observed & np.isnan(ewma)
+        ewma[first] = new[first, j]
+        update = observed & ~first
+        ewma[update] = EWMA_ALPHA * new[update, j] + (1 - EWMA_ALPHA) * ewma[update]
+        ewma_values[:, j] = ewma
+    ewma_z = (ewma_values - median) / scale
+    return median, z, ewma_z, ewma, ewma_values
+
+
+class _UserBaseline:
+    """Scored daily series for one user."""
+
+    def __init__(self):
+        self.days = []
+        self.values = np.empty((len(METRICS), 0))
+        self.median = np.empty((len(METRICS), 0))
+        self.z = np.empty((len(METRICS), 0))
+        self.ewma_z = np.empty((len(METRICS), 0))
+        self.ewma_values = np.empty((len(METRICS), 0))
+        self.versions = {}
+
+    def truncate(self, keep: int):
+        """Drop scored days from index `keep` onwards."""
+        self.days = self.days[:keep]
+        for name in ("values", "median", "z", "ewma_z", "ewma_values"):
+            setattr(self, name, getattr(self, name)[:, :keep])
+
+    def extend(self, days: list, values: np.ndarray):
+        """Score and append new days."""
+        ewma = self.ewma_values[:, -1] if self.days else np.full(len(METRICS), np.nan)
+        median, z, ewma_z, _, ewma_values = _score(self.values, values, ewma)
+        self.days += days
+        self.values = np.concatenate([self.values, values], axis=1)
+        self.median = np.concatenate([self.median, median], axis=1)
+        self.z = np.concatenate([self.z, z], axis=1)
+        self.ewma_z = np.concatenate([self.ewma_z, ewma_z], axis=1)
+        self.ewma_values = np.concatenate([self.ewma_values, ewma_values], axis=1)
+
+
+class BaselineCache:
+    """
+    Per-user baselines, updated incrementally as new days arrive.
+
+    New rows are detected from table versions (row count, max rowid, write
+    count). If the only writes were inserts and every new row is dated on or
+    after the last scored day, only that day onwards is re-read and
+    re-scored; updates, deletions or back-filled history trigger a full
+    recompute.
+    """
+
+    def __init__(self):
+        self._baselines = {}
+        self._lock = threading.Lock()
+
+    def _needs_full_refresh(self, cursor, baseline: _UserBaseline, versions: dict) -> bool:
+        if not baseline.days:
+            return True
+        last_day = baseline.days[-1].isoformat()
+        for table, date_expr in SOURCE_TABLES.items():
+            old_count, old_max, old_writes = baseline.versions.get(table, (0, 0, 0))
+            new_count, new_max, new_writes = versions.get(table, (0, 0, 0))
+            if new_writes == old_writes:
+                continue
+            cursor.execute(f"SELECT COUNT(*), MIN({date_expr}) FROM {table} WHERE rowid > ?", (old_max,))
+            added, earliest = cursor.fetchone()
+            if (old_count + added != new_count or new_writes - old_writes != added
+                    or (earliest is not None and earliest < last_day)):
+                return True
+        return False
+
+    def get(self, user_id: int = 1) -> _UserBaseline:
+        """Return the up-to-date baseline for a user."""
+        with self._lock:
+            versions = get_data_versions(user_id)
+            baseline = self._baselines.get(user_id)
+            if baseline is not None and baseline.versions == versions:
+                return baseline
+
+            conn = get_db_connection(user_id)
+            cursor = conn.cursor()
+            if baseline is None or self._needs_full_refresh(cursor, baseline, versions):
+                baseline = _UserBaseline()
+                days, values = _pivot(_load_rows(cursor, user_id, ""))
+            else:
+                # Re-score from the last day (it may have been partial)
+                since = baseline.days[-1]
+                baseline.truncate(len(baseline.days) - 1)
+                days, values = _pivot(_load_rows(cursor, user_id, since.isoformat()), first_day=since)
+            conn.close()
+
+            if days:
+                baseline.extend(days, values)
+            baseline.versions = versions
+            self._baselines[user_id] = baseline
+            return baseline
+
+    def clear(self):
+        """Drop all cached baselines."""
+        with self._lock:
+            self._baselines.clear()
+
+
+baseline_cache = BaselineCache()
+
+
+def detect_anomalies(days: int = 30, sensitivity: float = 2.5, user_id: int = 1) -> str:
+    """
+    Detect anomalous days across all metrics.
+
+    Flags single-day outliers (robust z-score vs the trailing 28-day
+    median/MAD), sustained drifts (EWMA vs baseline, e.g. rising resting HR)
+    and accumulated sleep debt over the last week.
+
+    Args:
+        days: Number of recent days to report on (default 30)
+        sensitivity: z-score threshold for outliers; drift uses 80% of it
+        user_id: User to analyze
+
+    Returns:
+        String listing only the anomalous days with their scores
+    """
+    baseline = baseline_cache.get(user_id)
+    if not baseline.days:
+        return "No data available for anomaly detection"
+
+    start = max(0, len(baseline.days) - days)
+    direction = METRIC_DIRECTION[:, None]
+    z = baseline.z[:, start:] * direction
+    ewma_z = baseline.ewma_z[:, start:] * direction
+    outliers = np.argwhere(np.nan_to_num(z) >= sensitivity)
+    drifts = np.argwhere((np.nan_to_num(ewma_z) >= sensitivity * 0.8) & ~(np.nan_to_num(z) >= sensitivity))
+
+    # Sleep debt: rolling sum of nightly shortfall vs personal baseline
+    sleep = METRICS.index("sleep_hours")
+    shortfall = np.clip(np.nan_to_num(baseline.median[sleep] - baseline.values[sleep]), 0, None)
+    debt = np.convolve(shortfall, np.ones(SLEEP_DEBT_DAYS))[:len(shortfall)][start:]
+
+    findings = []
+    for metric, offset in outliers:
+        i = start + offset
+        name, fmt = METRIC_LABELS[METRICS[metric]]
+        kind = "unusually high" if METRIC_DIRECTION[metric] > 0 else "unusually low"
+        findings.append((baseline.days[i], f"{name} {fmt.format(baseline.values[metric, i])} "
+                         f"vs baseline {fmt.format(baseline.median[metric, i])} "
+                         f"(z {baseline.z[metric, i]:+.1f}, {kind})"))
+
+    # Report each drift once, at the day it peaks
+    for metric in sorted(set(drifts[:, 0])):
+        offsets = drifts[drifts[:, 0] == metric][:, 1]
+        peak = start + offsets[np.argmax(ewma_z[metric, offsets])]
+        first = baseline.days[start + offsets.min()]
+        name, fmt = METRIC_LABELS[METRICS[metric]]
+        trend = "drifting up" if METRIC_DIRECTION[metric] > 0 else "drifting down"
+        findings.append((baseline.days[peak], f"{name} {trend} since {first}: "
+                         f"{fmt.format(baseline.ewma_values[metric, peak])} (smoothed) "
+                         f"vs baseline {fmt.format(baseline.median[metric, peak])} "
+                         f"(z {baseline.ewma_z[metric, peak]:+.1f})"))
+
+    over = np.flatnonzero(debt >= SLEEP_DEBT_HOURS)
+    if over.size:
+        peak = start + over[np.argmax(debt[over])]
+        findings.append((baseline.days[peak], f"sleep debt {debt[peak - start]:.1f}h over "
+                         f"{SLEEP_DEBT_DAYS} nights (vs personal baseline)"))
+
+    period = f"{baseline.days[start]} to {baseline.days[-1]}"
+    if not findings:
+        return f"No anomalies found from {period} (sensitivity {sensitivity})"
+
+    output = f"Anomalies from {period} (baseline: trailing {BASELINE_WINDOW}-day median):\n"
+    for day, text in sorted(findings):
+        output += f"- {day}: {text}\n"
+    return output
+
+
+# Per-day series available for correlation: metric -> (SQL select over its table, fill missing days with 0)
+CORRELATION_METRICS = {
+    "steps": ("SELECT date AS day, steps AS value FROM daily_metrics WHERE user_id = :user", False),
+    "active_minutes": ("SELECT date AS day, active_minutes AS value FROM daily_metrics WHERE user_id = :user", False),
+    "calories_burned": ("SELECT date AS day, calories_burned AS value FROM daily_metrics WHERE user_id = :user", False),
+    "distance_km": ("SELECT date AS day, distance_km AS value FROM daily_metrics WHERE user_id = :user", False),
+    "sleep_hours": ("SELECT date AS day, total_sleep_hours AS value FROM sleep_data WHERE user_id = :user", False),
+    "deep_sleep_hours": ("SELECT date AS day, deep_sleep_hours AS value FROM sleep_data WHERE user_id = :user", False),
+    "rem_sleep_hours": ("SELECT date AS day, rem_sleep_hours AS value FROM sleep_data WHERE user_id = :user", False),
+    "sleep_score": ("SELECT date AS day, sleep_score AS value FROM sleep_data WHERE user_id = :user", False),
+    "resting_hr": ("SELECT date(timestamp) AS day, SUM(sum_resting) / SUM(resting_count) AS value "
+                   "FROM heart_rate_samples WHERE user_id = :user GROUP BY date(timestamp)", False),
+    "workout_minutes": ("SELECT date AS day, SUM(duration_minutes) AS value FROM activities "
+                        "WHERE user_id = :user GROUP BY date", True),
+    "workout_calories": ("SELECT date AS day, SUM(calories) AS value FROM activities "
+                         "WHERE user_id = :user GROUP BY date", True),
+}
+MIN_CORRELATION_SAMPLES = 5
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Ranks with ties averaged (for Spearman correlation)."""
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    # Average rank of each distinct value is its cumulative position minus half its ties
+    average = np.cumsum(counts) - (counts - 1) / 2.0
+    return average[inverse]
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+    x = x - x.mean()
+    y = y - y.mean()
+    denominator = np.sqrt((x * x).sum() * (y * y).sum())
+    return float((x * y).sum() / denominator) if denominator > 0 else float("nan")
+
+
+def _strength(r: float) -> str:
+    size = abs(r)
+    if np.isnan(size):
+        return "n/a"
+    if size < 0.1:
+        return "none"
+    label = "weak" if size < 0.3 else "moderate" if size < 0.5 else "strong"
+    return f"{label} {'positive' if r > 0 else 'negative'}"
+
+
+def correlate_metrics(metric_x: str, metric_y: str, start_date: str = None, end_date: str = None,
+                      max_lag: int = 2, user_id: int = 1) -> str:
+    """
+    Correlate two daily metrics, with metric_x leading metric_y by 0..max_lag days.
+
+    Both series are fetched in one query and aligned on date; per-lag
+    Pearson and Spearman coefficients are computed over the days where both
+    values exist, followed by a distributed-lag regression of metric_y on
+    metric_x at all lags together.
+
+    Args:
+        metric_x: Candidate cause (e.g. 'workout_minutes')
+        metric_y: Candidate effect (e.g. 'sleep_score')
+        start_date: First day (YYYY-MM-DD); defaults to all history
+        end_date: Last day (YYYY-MM-DD); defaults to all history
+        max_lag: Largest lag in days to test
+        user_id: User to analyze
+
+    Returns:
+        String with a short table of coefficients and sample sizes
+    """
+    unknown = [m for m in (metric_x, metric_y) if m not in CORRELATION_METRICS]
+    if unknown:
+        return f"Unknown metric(s): {', '.join(unknown)}. Available: {', '.join(CORRELATION_METRICS)}"
+    if metric_x == metric_y and max_lag == 0:
+        return "Choose two different metrics, or a lag above 0 to correlate a metric with itself"
+    max_lag = max(0, min(int(max_lag), 14))
+
+    # Lagged days need history from before start_date
+    since = ((datetime.strptime(start_date, '%Y-%m-%d') - timedelta(days=max_lag)).strftime('%Y-%m-%d')
+             if start_date else "")
+    until = end_date or "9999-12-31"
+
+    # Both series in one query, tagged 'x' and 'y' (they may be the same metric)
+    conn = get_db_connection(user_id)
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT day, 'x', value FROM ({CORRELATION_METRICS[metric_x][0]}) WHERE day BETWEEN :since AND :until
+        UNION ALL
+        SELECT day, 'y', value FROM ({CORRELATION_METRICS[metric_y][0]}) WHERE day BETWEEN :since AND :until
+    ''', {"user": user_id, "since": since, "until": until})
+    rows = cursor.fetchall()
+    conn.close()
+
+    days, values = _pivot(rows, metrics=("x", "y"))
+    if not days:
+        return f"No data found for {metric_x} and {metric_y} in that range"
+    for i, metric in enumerate((metric_x, metric_y)):
+        if CORRELATION_METRICS[metric][1]:
+            values[i] = np.nan_to_num(values[i])
+    x, y = values
+
+    # Lag matrix: column k holds metric_x from k days before each day of metric_y
+    n_days = len(days)
+    lagged = np.full((n_days, max_lag + 1), np.nan)
+    for k in range(max_lag + 1):
+        lagged[k:, k] = x[:n_days - k]
+    first = max_lag if start_date else 0
+    lagged, y = lagged[first:], y[first:]
+    # A metric trivially correlates with itself at lag 0
+    min_lag = 1 if metric_x == metric_y else 0
+
+    output = f"Correlation of {metric_x} (leading) with {metric_y}, {days[first]} to {days[-1]}:\n"
+    output += "lag_days | n | pearson_r | spearman_rho | slope | strength\n"
+    for k in range(min_lag, max_lag + 1):
+        valid = ~np.isnan(lagged[:, k]) & ~np.isnan(y)
+        n = int(valid.sum())
+        if n < MIN_CORRELATION_SAMPLES:
+            output += f"{k} | {n} | - | - | - | too few days\n"
+            continue
+        xs, ys = lagged[valid, k], y[valid]
+        r = _pearson(xs, ys)
+        rho = _pearson(_rank(xs), _rank(ys))
+        slope = float(np.polyfit(xs, ys, 1)[0]) if np.ptp(xs) > 0 else float("nan")
+        output += f"{k} | {n} | {r:+.2f} | {rho:+.2f} | {slope:+.4g} | {_strength(r)}\n"
+
+    # Distributed-lag regression: metric_y ~ intercept + sum_k b_k * metric_x(t - k)
+    lagged = lagged[:, min_lag:]
+    valid = ~np.isnan(lagged).any(axis=1) & ~np.isnan(y)
+    n = int(valid.sum())
+    if lagged.shape[1] > 1 and n >= MIN_CORRELATION_SAMPLES + lagged.shape[1]:
+        design = np.column_stack([np.ones(n), lagged[valid]])
+        coefficients, _, rank, _ = np.linalg.lstsq(design, y[valid], rcond=None)
+        if rank == design.shape[1]:
+            residual = y[valid] - design @ coefficients
+            total = ((y[valid] - y[valid].mean()) ** 2).sum()
+            r_squared = 1 - (residual ** 2).sum() / total if total > 0 else float("nan")
+            terms = ", ".join(f"lag {k}: {b:+.4g}" for k, b in enumerate(coefficients[1:], start=min_lag))
+            output += f"Joint lagged regression (n={n}, R²={r_squared:.2f}): {terms}\n"
+
+    output += "Correlation is not causation; |r| below 0.3 or n below ~20 is weak evidence."
+    return output
+
+
+# Heart-rate zones as fractions of max HR (lower bounds)
+HR_ZONES = (("Z1 recovery", 0.5), ("Z2 endurance", 0.6), ("Z3 tempo", 0.7), ("Z4 threshold", 0.8), ("Z5 max", 0.9))
+MAX_SAMPLE_GAP = 30.0  # Seconds; longer gaps (auto-pause) don't count towards zone time
+
+
+def _clock(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+
+def analyze_workout(activity_id: int = None, date: str = None, activity_type: str = None,
+                    split_km: float = 1.0, user_id: int = 1) -> str:
+    """
+    Analyze splits, pace and heart-rate zones of a workout with a recorded track.
+
+    Args:
+        activity_id: Specific workout; otherwise the latest matching one is used
+        date: Workout date (YYYY-MM-DD)
+        activity_type: Filter by type (e.g. 'Running')
+        split_km: Split length in km (default 1.0)
+        user_id: User to analyze
+
+    Returns:
+        String with the workout summary, per-split pace/HR and time in HR zones
+    """
+    from importers.workout_files import load_track
+
+    conn = get_db_connection(user_id)
+    cursor = conn.cursor()
+    query = '''
+        SELECT a.activity_id, a.date, a.activity_type, a.distance_km, t.start_time
+        FROM activities a JOIN track_points t ON t.activity_id = a.activity_id
+        WHERE a.user_id = ?
+    '''
+    params = [user_id]
+    if activity_id is not None:
+        query += " AND a.activity_id = ?"
+        params.append(activity_id)
+    if date:
+        query += " AND a.date = ?"
+        params.append(date)
+    if activity_type:
+        query += " AND a.activity_type LIKE ?"
+        params.append(f"%{activity_type}%")
+    cursor.execute(query + " ORDER BY t.start_time DESC LIMIT 1", params)
+    workout = cursor.fetchone()
+    if workout is None:
+        conn.close()
+        return "No workout with recorded track data found (import a FIT, GPX or TCX file first)"
+    track = load_track(conn, workout[0])
+    cursor.execute("SELECT age FROM users WHERE user_id = ?", (user_id,))
+    user = cursor.fetchone()
+    conn.close()
+
+    offsets = track["offsets"].astype(np.float64)
+    heart_rate = track["heart_rate"]
+    duration = offsets[-1]
+    output = f"{workout[2]} on {workout[1]} (started {workout[4][11:16]}, activity {workout[0]}): {_clock(duration)}"
+
+    distance = track["distance_m"]
+    if distance is not None and np.nanmax(distance) > 0:
+        # Cumulative distance made monotonic, with gaps carried forward
+        distance = np.fmax.accumulate(np.nan_to_num(distance.astype(np.float64), nan=0.0))
+        total_m = distance[-1]
+        output += (f", {total_m / 1000:.2f} km, avg pace {_clock(duration / (total_m / 1000))}/km "
+                   f"({total_m / 1000 / (duration / 3600):.1f} km/h)")
+    else:
+        distance = None
+    if heart_rate is not None:
+        output += f", avg HR {np.nanmean(heart_rate):.0f} bpm, max {np.nanmax(heart_rate):.0f} bpm"
+    output += "\n"
+
+    if distance is not None and split_km > 0:
+        split_m = split_km * 1000
+        marks = np.arange(split_m, total_m, split_m)
+        # Time each split boundary was crossed (first sample reaching it)
+        crossed = offsets[np.searchsorted(distance, marks)]
+        bounds_t = np.concatenate([[0.0], crossed, [duration]])
+        bounds_d = np.concatenate([[0.0], marks, [total_m]])
+        split_index = np.searchsorted(marks, distance, side="right")
+
+        output += f"\nSplits ({split_km:g} km):\nsplit | km | time | pace/km | km/h | avg HR\n"
+        for i in range(len(bounds_t) - 1):
+            seconds = bounds_t[i + 1] - bounds_t[i]
+            km = (bounds_d[i + 1] - bounds_d[i]) / 1000
+            if km < 0.01:
+                continue
+            hr = ""
+            if heart_rate is not None:
+                in_split = heart_rate[split_index == i]
+                if not np.isnan(in_split).all():
+                    hr = f"{np.nanmean(in_split):.0f}"
+            output += f"{i + 1} | {km:.2f} | {_clock(seconds)} | {_clock(seconds / km)} | {km / (seconds / 3600):.1f} | {hr}\n"
+
+    if heart_rate is not None:
+        max_hr = 220 - user[0] if user and user[0] else float(np.nanmax(heart_rate))
+        # Each sample's HR holds until the next sample; pauses are skipped
+        gaps = np.diff(offsets)
+        gaps[gaps > MAX_SAMPLE_GAP] = 0.0
+        hr = heart_rate[:-1]
+        valid = ~np.isnan(hr)
+        bounds = np.array([fraction for _, fraction in HR_ZONES]) * max_hr
+        zone = np.searchsorted(bounds, hr[valid], side="right") - 1  # -1 = below zone 1
+        seconds = np.bincount(zone + 1, weights=gaps[valid], minlength=len(HR_ZONES) + 1)
+        counted = seconds.sum()
+        output += f"\nHeart-rate zones (max HR {max_hr:.0f} bpm):\n"
+        for i, (name, fraction) in enumerate(HR_ZONES):
+            upper = f"{HR_ZONES[i + 1][1] * max_hr:.0f}" if i + 1 < len(HR_ZONES) else "max"
+            share = seconds[i + 1] / counted * 100 if counted else 0.0
+            output += f"- {name} ({fraction * max_hr:.0f}-{upper} bpm): {_clock(seconds[i + 1])} ({share:.0f}%)\n"
+        if seconds[0]:
+            output += f"- below zones: {_clock(seconds[0])}\n"
+    return output
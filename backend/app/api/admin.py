@@ -0,0 +1,54 @@
+"""
+Admin API endpoints
+"""
+from typing import Any, Dict
+from fastapi import APIRouter
+from app.core.config import ensure_project_root_on_path
+from app.core.responses import ORJSONResponse
+from app.models.schemas import QueryTraceSettings
+
+ensure_project_root_on_path()
+
+from db_trace import query_tracer
+
+router = APIRouter(prefix="/admin", tags=["admin"], default_response_class=ORJSONResponse)
+
+
+@router.get("/queries", response_model=Dict[str, Any])
+async def get_query_stats(limit: int = 50):
+    """
+    Get aggregated SQL statement stats
+
+    Args:
+        limit: Maximum number of statements to return (slowest total time first)
+
+    Returns:
+        Tracing settings, per-statement calls/timings/rows/query plans and
+        the slow-query log (newest first)
+    """
+    return ORJSONResponse(query_tracer.stats(limit))
+
+
+@router.put("/queries/settings", response_model=Dict[str, Any])
+async def update_query_tracing(update: QueryTraceSettings):
+    """
+    Turn query tracing on or off and adjust its settings
+
+    New settings apply from the next query; pooled connections are
+    reopened when tracing is switched on or off.
+
+    Args:
+        update: Settings to change
+
+    Returns:
+        Current tracing settings
+    """
+    query_tracer.configure(**update.model_dump())
+    stats = query_tracer.stats(limit=0)
+    return ORJSONResponse({key: stats[key] for key in ("enabled", "slow_query_ms", "trace_sql", "progress_steps")})
+
+
+@router.delete("/queries", status_code=204)
+async def reset_query_stats():
+    """Clear collected statement stats and the slow-query log"""
+    query_tracer.reset()
@@ -1,11 +1,13 @@
 """
 Channel API endpoints
 """
+from typing import Optional
 from fastapi import APIRouter, HTTPException
+from app.core.responses import ORJSONResponse
 from app.models.schemas import Channel, ChannelCreate, ChannelList
 from app.services.channel_service import channel_service
 
-router = APIRouter(prefix="/channels", tags=["channels"])
+router = APIRouter(prefix="/channels", tags=["channels"], default_response_class=ORJSONResponse)
 
 
 @router.post("/", response_model=Channel)
@@ -14,28 +16,31 @@ async def create_channel(request: ChannelCreate):
     Create a new channel
     
     Args:
-        request: Channel creation request with name
+        request: Channel creation request with name and user
     
     Returns:
         Created channel
     """
     try:
-        channel = channel_service.create_channel(request.name)
-        return channel
+        channel = channel_service.create_channel(request.name, request.user_id)
+        return ORJSONResponse(channel)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/", response_model=ChannelList)
-async def list_channels():
+async def list_channels(user_id: Optional[int] = None):
     """
     List all channels
     
+    Args:
+        user_id: Only list this user's channels
+    
     Returns:
-        List of all channels
+        List of channels
     """
-    channels = channel_service.list_channels()
-    return ChannelList(channels=channels)
+    channels = channel_service.list_channels(user_id)
+    return ORJSONResponse(ChannelList(channels=channels))
 
 
 @router.get("/{channel_id}", response_model=Channel)
@@ -51,7 +56,7 @@ async def get_channel(channel_id: str):
     """
     try:
         channel = channel_service.get_channel(channel_id)
-        return channel
+        return ORJSONResponse(channel)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -2,13 +2,20 @@
 Chat API endpoints
 """
 from fastapi import APIRouter, HTTPException
-from app.models.schemas import ChatRequest, ChatResponse, Message
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.core.responses import ORJSONResponse, dumps
+from app.models.schemas import BatchChatRequest, ChatRequest, ChatResponse, Message, MessageHistory
 from app.services.agent_service import agent_service
+from app.services.batch_service import batch_service
 from app.services.channel_service import channel_service
+from app.services.connection_service import connection_service
+from llm_gateway import AdmissionRejected
 import uuid
 from datetime import datetime
 
-router = APIRouter(prefix="/chat", tags=["chat"])
+router = APIRouter(prefix="/chat", tags=["chat"], default_response_class=ORJSONResponse)
 
 
 @router.post("/message", response_model=ChatResponse)
@@ -17,14 +24,14 @@ async def send_message(request: ChatRequest):
     Send a message and get AI response
     
     Args:
-        request: Chat request with message and channel_id
+        request: Chat request with message, channel_id and optional user_id
     
     Returns:
         ChatResponse with assistant message and tool calls
     """
     try:
-        # Verify channel exists
-        channel_service.get_channel(request.channel_id)
+        # Verify channel exists and belongs to the user
+        user_id = channel_service.resolve_user(request.channel_id, request.user_id)
         
         # Add user message to channel
         user_message = Message(
@@ -34,30 +41,72 @@ async def send_message(request: ChatRequest):
             timestamp=datetime.now()
         )
         channel_service.add_message(request.channel_id, user_message)
+        await connection_service.publish(request.channel_id, {
+            "type": "user_message",
+            "message": user_message.model_dump(mode="json")
+        })
         
-        # Get agent response
-        assistant_message, tool_calls = agent_service.chat(
+        # Get agent response (off the event loop so WebSocket clients keep flowing)
+        response = await run_in_threadpool(
+            agent_service.chat,
             request.channel_id,
-            request.message
+            request.message,
+            user_id,
+            request.timezone
         )
         
         # Add assistant message to channel
-        channel_service.add_message(request.channel_id, assistant_message)
+        channel_service.add_message(request.channel_id, response.message)
+        await connection_service.publish(request.channel_id, {
+            "type": "final",
+            **response.model_dump(mode="json")
+        })
         
-        return ChatResponse(
-            message=assistant_message,
-            tool_calls=tool_calls if tool_calls else None
-        )
+        return ORJSONResponse(response)
     
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.get("/history/{channel_id}")
+@router.post("/batch")
+async def send_batch(request: BatchChatRequest):
+    """
+    Run many questions concurrently and stream the results as NDJSON
+    
+    Each line is a JSON object: one {"type": "result", ...} per item in
+    completion order (with "index", "id", "status" and either "response" or
+    "code"/"error"), then a final {"type": "summary", ...} with wall time,
+    summed item time and tool cache hits. Items without a channel_id are
+    stateless; items on a channel continue its conversation in order.
+    
+    Args:
+        request: Batch of questions and an optional concurrency limit
+    
+    Returns:
+        application/x-ndjson stream
+    """
+    max_items = get_settings().BATCH_MAX_ITEMS
+    if not request.items:
+        raise HTTPException(status_code=422, detail="Batch has no items")
+    if len(request.items) > max_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_items} items per batch")
+    
+    async def lines():
+        async for result in batch_service.run(request.items, request.max_concurrency):
+            yield dumps(result) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/history/{channel_id}", response_model=MessageHistory)
 async def get_history(channel_id: str):
     """
     Get message history for a channel
@@ -70,7 +119,7 @@ async def get_history(channel_id: str):
     """
     try:
         messages = channel_service.get_messages(channel_id)
-        return {"channel_id": channel_id, "messages": messages}
+        return ORJSONResponse(MessageHistory(channel_id=channel_id, messages=messages))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -0,0 +1,71 @@
+"""
+Data export API endpoints
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.config import ensure_project_root_on_path, get_settings
+from app.core.responses import ORJSONResponse
+from app.models.schemas import ExportCatalog
+
+ensure_project_root_on_path()
+
+import exporter as export_formats
+from exporter import exporter
+
+router = APIRouter(prefix="/exports", tags=["exports"], default_response_class=ORJSONResponse)
+
+
+@router.get("/", response_model=ExportCatalog)
+async def list_exports():
+    """
+    List exportable tables and formats
+
+    Returns:
+        Tables with their date column, the formats this server can write,
+        and rows/s and bytes for recent exports
+    """
+    formats = [fmt for fmt in export_formats.FORMATS
+               if fmt not in export_formats.COLUMNAR_FORMATS or export_formats.HAS_PYARROW]
+    return ORJSONResponse(ExportCatalog(
+        tables=export_formats.TABLES,
+        formats=formats,
+        exports=exporter.metrics()
+    ))
+
+
+@router.get("/{table}")
+def export_table(table: str, format: str = "ndjson", user_id: int = 1,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    Stream a table as NDJSON, CSV, Parquet or Arrow
+
+    Rows are read and encoded EXPORT_CHUNK_ROWS at a time and sent as they
+    are produced, so any size of export uses the same memory. Throughput of
+    finished exports is reported by GET /exports/ and GET /metrics/.
+
+    Args:
+        table: Table or view to export
+        format: ndjson, csv, parquet or arrow (the last two need pyarrow)
+        user_id: User whose rows are exported
+        start_date: First day to include (YYYY-MM-DD), dated tables only
+        end_date: Last day to include (YYYY-MM-DD), dated tables only
+
+    Returns:
+        Chunked download of the export
+    """
+    try:
+        export_formats.validate(table, format, start_date, end_date)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    chunks = exporter.stream(table, format, user_id, start_date, end_date,
+                             chunk_rows=get_settings().EXPORT_CHUNK_ROWS)
+    filename = f"{table}.{export_formats.EXTENSIONS[format]}"
+    return StreamingResponse(
+        chunks,
+        media_type=export_formats.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
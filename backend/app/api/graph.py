@@ -2,18 +2,22 @@
 Graph visualization API endpoints
 """
 from fastapi import APIRouter
+from app.core.responses import ORJSONResponse
 from app.models.schemas import GraphResponse
 from app.services.graph_service import graph_service
 
-router = APIRouter(prefix="/graph", tags=["graph"])
+router = APIRouter(prefix="/graph", tags=["graph"], default_response_class=ORJSONResponse)
 
 
 @router.get("/", response_model=GraphResponse)
-async def get_graph():
+async def get_graph(stats: bool = False):
     """
     Get LangGraph workflow visualization
     
+    Args:
+        stats: Overlay runtime statistics from recent executions
+    
     Returns:
         Graph visualization as Mermaid diagram and optional PNG
     """
-    return graph_service.get_graph()
+    return ORJSONResponse(graph_service.get_graph(include_stats=stats))
@@ -0,0 +1,93 @@
+"""
+Data import API endpoints
+"""
+from typing import List
+from fastapi import APIRouter, HTTPException, Request
+from app.core.responses import ORJSONResponse
+from app.models.schemas import ImportJob
+from app.services.import_service import import_service
+
+router = APIRouter(prefix="/imports", tags=["imports"], default_response_class=ORJSONResponse)
+
+
+@router.post("/apple-health", response_model=ImportJob, status_code=202)
+async def import_apple_health(request: Request, filename: str = "export.zip", user_id: int = 1):
+    """
+    Upload an Apple Health export and import it in the background
+    
+    The request body is the raw export.zip or export.xml file. It is
+    streamed to disk chunk by chunk, so multi-GB exports never sit in memory.
+    
+    Args:
+        request: Request whose body is the export file
+        filename: Original file name (used to resume an interrupted import)
+        user_id: User the data belongs to
+    
+    Returns:
+        The started import job; poll GET /imports/{job_id} for progress
+    """
+    path = import_service.upload_path(filename)
+    size = 0
+    with open(path, "wb") as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+            size += len(chunk)
+    if size == 0:
+        import_service.discard_upload(path)
+        raise HTTPException(status_code=400, detail="Request body must contain the export file")
+    
+    job = import_service.start_apple_health(path, user_id)
+    return ORJSONResponse(job, status_code=202)
+
+
+@router.post("/workouts", response_model=ImportJob, status_code=202)
+async def import_workout_file(request: Request, filename: str, user_id: int = 1):
+    """
+    Upload a FIT, GPX or TCX workout file and import it in the background
+    
+    Args:
+        request: Request whose body is the workout file
+        filename: Original file name; its extension selects the parser
+        user_id: User the workout belongs to
+    
+    Returns:
+        The started import job; poll GET /imports/{job_id} for progress
+    """
+    path = import_service.upload_path(filename)
+    with open(path, "wb") as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+    try:
+        job = import_service.start_workout_file(path, user_id)
+    except ValueError as e:
+        import_service.discard_upload(path)
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(job, status_code=202)
+
+
+@router.get("/", response_model=List[ImportJob])
+async def list_imports():
+    """
+    List import jobs
+    
+    Returns:
+        All import jobs, newest first
+    """
+    return ORJSONResponse(import_service.list_jobs())
+
+
+@router.get("/{job_id}", response_model=ImportJob)
+async def get_import(job_id: str):
+    """
+    Get import job progress
+    
+    Args:
+        job_id: Import job ID
+    
+    Returns:
+        Job status, records processed, throughput and rows inserted
+    """
+    try:
+        return ORJSONResponse(import_service.get_job(job_id))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
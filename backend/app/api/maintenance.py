@@ -0,0 +1,38 @@
+"""
+Maintenance API endpoints
+"""
+from typing import Any, Dict
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.core.responses import ORJSONResponse
+from app.services.maintenance_service import maintenance_service
+
+router = APIRouter(prefix="/maintenance", tags=["maintenance"], default_response_class=ORJSONResponse)
+
+
+@router.post("/compact", response_model=Dict[str, Any])
+async def compact():
+    """
+    Run heart-rate compaction now
+    
+    Returns:
+        Compaction report (rows folded, batches, bytes reclaimed)
+    """
+    try:
+        return ORJSONResponse(await run_in_threadpool(maintenance_service.run_compaction))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/compaction", response_model=Dict[str, Any])
+async def compaction_status():
+    """
+    Get the last compaction report
+    
+    Returns:
+        Last compaction report, or 404 if compaction hasn't run yet
+    """
+    status = maintenance_service.status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="Compaction has not run yet")
+    return ORJSONResponse(status)
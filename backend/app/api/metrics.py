@@ -0,0 +1,56 @@
+"""
+Metrics API endpoints
+"""
+from datetime import datetime
+from fastapi import APIRouter
+from app.core.config import ensure_project_root_on_path
+from app.core.responses import ORJSONResponse
+from app.models.schemas import MetricsResponse
+from app.services.agent_service import agent_service
+from app.services.maintenance_service import maintenance_service
+
+ensure_project_root_on_path()
+
+from degraded import degraded_responder
+from llm_gateway import llm_gateway
+from model_router import tier_stats
+from offload import process_pool
+from prefetch import tool_prefetcher
+from rules import rule_engine
+from sharding import shard_router
+from temporal import temporal_stats
+from tool_selection import prompt_accounting
+
+router = APIRouter(prefix="/metrics", tags=["metrics"], default_response_class=ORJSONResponse)
+
+
+@router.get("/", response_model=MetricsResponse)
+async def get_metrics():
+    """
+    Get runtime metrics
+    
+    Returns:
+        LLM gateway queue depth, wait times, counters and circuit breaker
+        state, degraded-mode answers, per-tier model latency, date context
+        iteration savings, prompt token accounting, answer cache, tool
+        prefetch and analytics process pool stats, the last compaction
+        report, data export throughput, rule engine counters and database
+        connection pool stats
+    """
+    from exporter import exporter
+    
+    return ORJSONResponse(MetricsResponse(
+        timestamp=datetime.now(),
+        llm_gateway=llm_gateway.metrics(),
+        degraded=degraded_responder.metrics(),
+        model_tiers=tier_stats.metrics(),
+        temporal=temporal_stats.metrics(),
+        prompt_tokens=prompt_accounting.metrics(),
+        answer_cache=agent_service.answer_cache.stats(),
+        prefetch=tool_prefetcher.metrics(),
+        process_pool=process_pool.metrics(),
+        compaction=maintenance_service.status(),
+        exports=exporter.metrics(),
+        rules=rule_engine.metrics(),
+        database=shard_router.stats()
+    ))
@@ -0,0 +1,89 @@
+"""
+Goal and alert rule API endpoints
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.core.responses import ORJSONResponse
+from app.models.schemas import RuleCreate, RuleInfo, RuleList
+from app.services.channel_service import channel_service
+from app.services.rule_service import rule_service
+
+router = APIRouter(prefix="/rules", tags=["rules"], default_response_class=ORJSONResponse)
+
+
+@router.post("/", response_model=RuleInfo, status_code=201)
+async def create_rule(request: RuleCreate):
+    """
+    Create a goal or alert rule on a channel
+
+    The rule watches the channel user's data. It is evaluated as new data
+    is imported, and each time it starts to hold, an assistant message is
+    posted to the channel. Examples:
+
+        {"metric": "resting_heart_rate", "op": ">", "threshold": 70, "times": 3}
+        {"metric": "total_sleep_hours", "op": "<", "threshold": 6, "times": 2, "calendar_week": true}
+
+    Args:
+        request: Channel, metric, comparison and window
+
+    Returns:
+        The rule and the state of its current window
+    """
+    try:
+        channel_service.get_channel(request.channel_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        rule = await run_in_threadpool(rule_service.create, request)
+        return ORJSONResponse(rule, status_code=201)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/", response_model=RuleList)
+async def list_rules(user_id: Optional[int] = None, channel_id: Optional[str] = None):
+    """
+    List rules
+
+    Args:
+        user_id: Only list this user's rules
+        channel_id: Only list rules posting to this channel
+
+    Returns:
+        List of rules
+    """
+    return ORJSONResponse(RuleList(rules=rule_service.list_rules(user_id, channel_id)))
+
+
+@router.get("/{rule_id}", response_model=RuleInfo)
+async def get_rule(rule_id: str):
+    """
+    Get rule by ID
+
+    Args:
+        rule_id: Rule ID
+
+    Returns:
+        The rule and the state of its current window
+    """
+    try:
+        return ORJSONResponse(rule_service.get(rule_id))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.delete("/{rule_id}")
+async def delete_rule(rule_id: str):
+    """
+    Delete a rule
+
+    Args:
+        rule_id: Rule ID
+
+    Returns:
+        Success message
+    """
+    if not rule_service.delete(rule_id):
+        raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
+    return {"message": "Rule deleted successfully"}
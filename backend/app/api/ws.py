@@ -0,0 +1,178 @@
+"""
+WebSocket chat endpoint - many channels multiplexed over one connection
+
+Client -> server frames:
+    {"type": "subscribe", "channel_id": ...}
+    {"type": "unsubscribe", "channel_id": ...}
+    {"type": "message", "channel_id": ..., "message": ..., "turn_id": optional, "user_id": optional,
+     "timezone": optional}
+    {"type": "ack", "seq": N}
+    {"type": "ping"}
+
+Server -> client frames carry a per-connection "seq" that the client
+acknowledges; types are "subscribed", "unsubscribed", "user_message",
+"tool_start", "tool_end", "token", "final", "error" and "pong". A client
+that stops acknowledging until its send queue fills is closed with code 1013.
+"""
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.core.concurrency import iterate_in_thread
+from app.core.config import get_settings
+from app.models.schemas import Message
+from app.services.agent_service import agent_service
+from app.services.channel_service import channel_service
+from app.services.connection_service import ClientConnection, connection_service
+from llm_gateway import AdmissionRejected
+
+router = APIRouter(prefix="/ws", tags=["websocket"])
+
+# Turns on the same channel share one conversation history, so run them in order
+_channel_locks = defaultdict(asyncio.Lock)
+
+
+async def run_turn(connection: ClientConnection, channel_id: str, content: str, turn_id: str,
+                   user_id: Optional[int] = None, timezone: Optional[str] = None):
+    """
+    Run one chat turn and publish its events to the channel's subscribers
+
+    Args:
+        connection: Connection that submitted the turn
+        channel_id: Channel ID
+        content: User message
+        turn_id: Turn ID echoed on every event of this turn
+        user_id: User claimed by the client (defaults to the channel's user)
+        timezone: User's IANA timezone for resolving dates
+    """
+    try:
+        user_id = channel_service.resolve_user(channel_id, user_id)
+        connection_service.subscribe(connection, channel_id)
+
+        async with _channel_locks[channel_id]:
+            user_message = Message(
+                id=str(uuid.uuid4()),
+                role="user",
+                content=content,
+                timestamp=datetime.now()
+            )
+            channel_service.add_message(channel_id, user_message)
+            await connection_service.publish(channel_id, {
+                "type": "user_message",
+                "turn_id": turn_id,
+                "message": user_message.model_dump(mode="json")
+            })
+
+            async for event in iterate_in_thread(agent_service.stream_chat(channel_id, content, user_id, timezone)):
+                if event["type"] == "final":
+                    response = event["response"]
+                    channel_service.add_message(channel_id, response.message)
+                    event = {"type": "final", **response.model_dump(mode="json")}
+                await connection_service.publish(channel_id, {**event, "turn_id": turn_id})
+
+    except ValueError as e:
+        connection.push({"type": "error", "code": "not_found", "detail": str(e),
+                         "channel_id": channel_id, "turn_id": turn_id})
+    except PermissionError as e:
+        connection.push({"type": "error", "code": "forbidden", "detail": str(e),
+                         "channel_id": channel_id, "turn_id": turn_id})
+    except AdmissionRejected as e:
+        connection.push({"type": "error", "code": "overloaded", "detail": str(e),
+                         "channel_id": channel_id, "turn_id": turn_id})
+    except Exception as e:
+        connection.push({"type": "error", "code": "internal", "detail": str(e),
+                         "channel_id": channel_id, "turn_id": turn_id})
+    finally:
+        connection.finish_turn()
+
+
+@router.websocket("/chat")
+async def chat_socket(websocket: WebSocket):
+    """
+    Multiplexed chat over a single WebSocket
+
+    Each connection may have at most WS_MAX_INFLIGHT_TURNS turns running;
+    further messages are rejected with a "busy" error until one finishes.
+    """
+    settings = get_settings()
+    await websocket.accept()
+
+    connection = ClientConnection(
+        websocket,
+        max_unacked=settings.WS_MAX_UNACKED_EVENTS,
+        queue_size=settings.WS_SEND_QUEUE_SIZE,
+        max_inflight_turns=settings.WS_MAX_INFLIGHT_TURNS
+    )
+    connection.writer = asyncio.create_task(connection.run_writer())
+    turns = set()
+
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                connection.push({"type": "error", "code": "invalid", "detail": "Frames must be JSON objects"})
+                continue
+            kind = data.get("type")
+            channel_id = data.get("channel_id")
+
+            if kind == "ack":
+                try:
+                    seq = int(data.get("seq", 0))
+                except (TypeError, ValueError):
+                    connection.push({"type": "error", "code": "invalid", "detail": "Ack seq must be an integer"})
+                    continue
+                await connection.ack(seq)
+
+            elif kind == "subscribe":
+                try:
+                    channel_service.get_channel(channel_id)
+                    connection_service.subscribe(connection, channel_id)
+                    connection.push({"type": "subscribed", "channel_id": channel_id})
+                except ValueError as e:
+                    connection.push({"type": "error", "code": "not_found", "detail": str(e),
+                                     "channel_id": channel_id})
+
+            elif kind == "unsubscribe":
+                connection_service.unsubscribe(connection, channel_id)
+                connection.push({"type": "unsubscribed", "channel_id": channel_id})
+
+            elif kind == "message":
+                turn_id = data.get("turn_id") or str(uuid.uuid4())
+                content = data.get("message", "")
+                if not isinstance(content, str) or not content.strip():
+                    connection.push({"type": "error", "code": "invalid", "detail": "Empty message",
+                                     "channel_id": channel_id, "turn_id": turn_id})
+                elif not connection.try_start_turn():
+                    connection.push({
+                        "type": "error",
+                        "code": "busy",
+                        "detail": f"At most {connection.max_inflight_turns} turns may be in flight per connection",
+                        "channel_id": channel_id,
+                        "turn_id": turn_id
+                    })
+                else:
+                    task = asyncio.create_task(run_turn(connection, channel_id, content, turn_id,
+                                                        data.get("user_id"), data.get("timezone")))
+                    turns.add(task)
+                    task.add_done_callback(turns.discard)
+
+            elif kind == "ping":
+                connection.push({"type": "pong"})
+
+            else:
+                connection.push({"type": "error", "code": "invalid", "detail": f"Unknown frame type: {kind}"})
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Running turns finish in the background so their history is stored
+        connection_service.disconnect(connection)
+        connection.writer.cancel()
@@ -0,0 +1,45 @@
+"""
+Concurrency helpers for bridging blocking agent code into the event loop
+"""
+import asyncio
+import contextvars
+from typing import AsyncIterator, Iterator
+
+_DONE = object()
+
+
+async def iterate_in_thread(iterator: Iterator) -> AsyncIterator:
+    """
+    Drive a blocking iterator to completion in a single worker thread
+
+    Unlike starlette's iterate_in_threadpool, every step runs in the same
+    thread and context, so context variables set inside the iterator (e.g.
+    execution stats tracking) stay valid across yields.
+
+    Args:
+        iterator: Blocking iterator to consume
+
+    Yields:
+        Items produced by the iterator
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def drive():
+        try:
+            for item in iterator:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, None))
+
+    future = loop.run_in_executor(None, contextvars.copy_context().run, drive)
+    while True:
+        item, error = await queue.get()
+        if item is _DONE:
+            await future
+            if error is not None:
+                raise error
+            return
+        yield item
@@ -2,16 +2,27 @@
 Core configuration and settings
 """
 import os
+import sys
 from pathlib import Path
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from dotenv import load_dotenv
 
+# Project root holds the agent, tools and database modules
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+
 # Load .env from project root
-env_path = Path(__file__).resolve().parent.parent.parent.parent / ".env"
+env_path = PROJECT_ROOT / ".env"
 load_dotenv(dotenv_path=env_path)
 
 
+def ensure_project_root_on_path():
+    """Make the project root modules (agent, tools, ...) importable"""
+    root = str(PROJECT_ROOT)
+    if root not in sys.path:
+        sys.path.append(root)
+
+
 class Settings(BaseSettings):
     """Application settings"""
     
@@ -33,9 +44,91 @@ class Settings(BaseSettings):
     # Database
     DATABASE_PATH: str = "wearables.db"
     
+    # Sharding (single = everyone in wearables.db, hash = SHARD_COUNT files, per_user = one file per user)
+    SHARD_MODE: str = "single"
+    SHARD_COUNT: int = 16
+    SHARD_DIR: str = ""  # Where shard files live (empty = <project root>/shards)
+    SHARD_MAX_CONNECTIONS: int = 64  # Idle connections kept open across all shards
+    
     # Agent Settings
-    LLM_MODEL: str = "llama-3.3-70b-versatile"
+    LLM_MODEL: str = "llama-3.3-70b-versatile"  # Response tier: writes final answers
+    ROUTER_MODEL: str = ""  # Router tier for tool selection, e.g. "llama-3.1-8b-instant" (empty = LLM_MODEL does both)
     LLM_TEMPERATURE: float = 0.0
+    TOOL_SUBSETTING_ENABLED: bool = True  # Bind only the tools relevant to each question
+    
+    # LLM Admission Control
+    LLM_MAX_CONCURRENCY: int = 4  # Concurrent model calls across all channels
+    LLM_REQUESTS_PER_MINUTE: float = 30.0  # Token-bucket refill rate (0 disables rate limiting)
+    LLM_BURST: int = 5  # Token-bucket capacity
+    LLM_MAX_RETRIES: int = 3  # Retries on provider 429 responses
+    LLM_RETRY_BASE_DELAY: float = 0.5  # Seconds; backoff is jittered and doubles per attempt
+    LLM_RETRY_MAX_DELAY: float = 8.0
+    LLM_REQUEST_DEADLINE: float = 60.0  # Seconds a chat turn may wait for model calls to start
+    LLM_TIMEOUT: float = 20.0  # Seconds before a single model request is abandoned
+    
+    # Degraded Mode (answer from tool output when the model is slow or down)
+    DEGRADED_MODE_ENABLED: bool = True
+    DEGRADED_AFTER_SECONDS: float = 15.0  # Turn latency budget before a templated answer is returned
+    DEGRADED_MAX_TOOLS: int = 2  # Tools run for one templated answer
+    CIRCUIT_FAILURE_THRESHOLD: int = 3  # Consecutive failed or slow model calls that open the circuit
+    CIRCUIT_RESET_SECONDS: float = 30.0  # Open time before a probe call is let through
+    LLM_SLOW_CALL_SECONDS: float = 10.0  # Model calls slower than this count as failures (0 disables)
+    
+    # Date Context (date expressions resolved before the graph runs)
+    TEMPORAL_CONTEXT_ENABLED: bool = True
+    TEMPORAL_HOLDOUT: float = 0.0  # Share of dated turns run without context, to measure iterations saved
+    DEFAULT_TIMEZONE: str = ""  # IANA name used when the client sends none (empty = server local time)
+    
+    # Speculative Tool Prefetch (likely tools run during the first model call of a turn)
+    PREFETCH_ENABLED: bool = True
+    PREFETCH_MAX_TOOLS: int = 2  # Predicted calls per turn; bounds wasted work
+    
+    # Batch Chat (POST /chat/batch)
+    BATCH_MAX_ITEMS: int = 100
+    BATCH_MAX_CONCURRENCY: int = 8  # Items run at once; the LLM gateway limits still apply
+    
+    # Analytics Process Pool (CPU-heavy tools run outside the request threads)
+    OFFLOAD_WORKERS: int = 2  # Worker processes (0 runs CPU-heavy tools in the request thread)
+    OFFLOAD_MAX_QUEUE: int = 8  # Tasks waiting beyond the running ones; more are rejected
+    OFFLOAD_TIMEOUT: float = 30.0  # Seconds per task
+    
+    # Answer Cache (first-turn questions, keyed on question, date and data versions)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 256
+    ANSWER_CACHE_TTL: float = 300.0  # Seconds
+    
+    # Response Compression (brotli is used when installed, otherwise gzip)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller responses are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
+    # WebSocket Settings
+    WS_MAX_INFLIGHT_TURNS: int = 2  # Concurrent chat turns per connection
+    WS_MAX_UNACKED_EVENTS: int = 256  # Events sent ahead of client acknowledgements
+    WS_SEND_QUEUE_SIZE: int = 1024  # Outbound events buffered per connection
+    
+    # Data Imports
+    IMPORT_UPLOAD_DIR: str = ""  # Where uploaded exports are spooled (empty = system temp dir)
+    IMPORT_BATCH_SIZE: int = 5000  # Records per transaction/checkpoint
+    
+    # Data Exports (GET /exports/{table})
+    EXPORT_CHUNK_ROWS: int = 5000  # Rows fetched and encoded at a time; bounds memory per export
+    
+    # Heart-rate Retention (raw samples -> per-minute -> per-hour aggregates)
+    COMPACTION_ENABLED: bool = True
+    COMPACTION_INTERVAL_HOURS: float = 24.0
+    COMPACTION_BATCH_SIZE: int = 5000  # Rows per transaction
+    HR_RAW_RETENTION_DAYS: int = 30  # Days of full-resolution samples
+    HR_MINUTE_RETENTION_DAYS: int = 365  # Days of per-minute aggregates
+    
+    # Query Tracing (admin stats at /admin/queries; near-zero cost when disabled)
+    QUERY_TRACE_ENABLED: bool = False
+    SLOW_QUERY_MS: float = 100.0  # Statements slower than this are logged with EXPLAIN QUERY PLAN
+    QUERY_TRACE_SQL: bool = False  # Print every statement SQLite executes
+    QUERY_PROGRESS_STEPS: int = 0  # Count VM steps per statement in units of N instructions (0 = off)
+    
+    # Startup Settings
+    WARMUP_ON_STARTUP: bool = True  # Pre-open the database and prime caches after the agent is built
     
     class Config:
         env_file = "../../.env"  # .env file is in project root
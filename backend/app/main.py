@@ -1,23 +1,84 @@
 """
 Main FastAPI application
 """
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import get_settings
-from app.api import chat, channels, graph
-from app.models.schemas import HealthCheck
+from fastapi.responses import JSONResponse
+from app.core.compression import CompressionMiddleware
+from app.core.config import ensure_project_root_on_path, get_settings
+from app.api import admin, chat, channels, exports, graph, imports, maintenance, metrics, rules, ws
+from app.models.schemas import HealthCheck, ReadinessCheck
 from app.services.agent_service import agent_service
+from app.services.graph_service import graph_service
+from app.services.maintenance_service import maintenance_service
+from app.services.rule_service import rule_service
 from datetime import datetime
 
+ensure_project_root_on_path()
+
+from db_trace import query_tracer
+from llm_gateway import llm_gateway
+from offload import process_pool
+from sharding import shard_router
+
 # Load environment variables
 load_dotenv()
 
 # Get settings
 settings = get_settings()
 
+# Configure query tracing before the first connection is opened
+query_tracer.configure(
+    enabled=settings.QUERY_TRACE_ENABLED or query_tracer.enabled,
+    slow_query_ms=settings.SLOW_QUERY_MS,
+    trace_sql=settings.QUERY_TRACE_SQL,
+    progress_steps=settings.QUERY_PROGRESS_STEPS
+)
+
+# Route users to their database files
+shard_router.configure(
+    mode=settings.SHARD_MODE,
+    shard_count=settings.SHARD_COUNT,
+    directory=settings.SHARD_DIR,
+    max_connections=settings.SHARD_MAX_CONNECTIONS
+)
+
+
+
+def startup():
+    """Build the agent and warm up caches (runs in a worker thread)"""
+    if agent_service.initialize_agent() and settings.WARMUP_ON_STARTUP:
+        agent_service.warm_up()
+        graph_service.warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run startup in the background so the server accepts requests immediately"""
+    app.state.startup_complete = False
+    # Alerts fired by imports (in worker threads) are published on this loop
+    rule_service.bind_loop(asyncio.get_running_loop())
+    
+    async def run_startup():
+        await run_in_threadpool(startup)
+        app.state.startup_complete = True
+    
+    app.state.startup_task = asyncio.create_task(run_startup())
+    if settings.COMPACTION_ENABLED:
+        app.state.compaction_task = asyncio.create_task(maintenance_service.run_scheduler())
+    yield
+    if settings.COMPACTION_ENABLED:
+        app.state.compaction_task.cancel()
+    process_pool.shutdown()
+
+
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description=settings.DESCRIPTION,
@@ -35,10 +96,25 @@ app.add_middleware(
     allow_headers=settings.CORS_ALLOW_HEADERS,
 )
 
+# Compress large responses (history payloads with tool results)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # Include routers
+app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
 app.include_router(chat.router, prefix=settings.API_V1_PREFIX)
 app.include_router(channels.router, prefix=settings.API_V1_PREFIX)
+app.include_router(exports.router, prefix=settings.API_V1_PREFIX)
 app.include_router(graph.router, prefix=settings.API_V1_PREFIX)
+app.include_router(imports.router, prefix=settings.API_V1_PREFIX)
+app.include_router(maintenance.router, prefix=settings.API_V1_PREFIX)
+app.include_router(metrics.router, prefix=settings.API_V1_PREFIX)
+app.include_router(rules.router, prefix=settings.API_V1_PREFIX)
+app.include_router(ws.router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
@@ -53,12 +129,30 @@ async def root():
 
 @app.get(f"{settings.API_V1_PREFIX}/health", response_model=HealthCheck)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint - "degraded" while the LLM circuit breaker is not closed"""
+    circuit = llm_gateway.breaker.state
     return HealthCheck(
-        status="healthy",
+        status="healthy" if circuit == "closed" else "degraded",
+        timestamp=datetime.now(),
+        agent_initialized=agent_service.is_initialized(),
+        llm_circuit=circuit
+    )
+
+
+@app.get(f"{settings.API_V1_PREFIX}/ready", response_model=ReadinessCheck)
+async def readiness_check():
+    """Readiness endpoint - 503 until the agent is built and startup has finished"""
+    startup_complete = getattr(app.state, "startup_complete", False)
+    readiness = ReadinessCheck(
+        ready=agent_service.is_initialized() and startup_complete,
         timestamp=datetime.now(),
-        agent_initialized=agent_service.is_initialized()
+        agent_initialized=agent_service.is_initialized(),
+        warmed_up=agent_service.warmed_up,
+        startup_complete=startup_complete,
+        error=agent_service.init_error
     )
+    status_code = 200 if readiness.ready else 503
+    return JSONResponse(status_code=status_code, content=readiness.model_dump(mode="json"))
 
 
 if __name__ == "__main__":
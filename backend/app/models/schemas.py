@@ -30,12 +30,31 @@ class ChatRequest(BaseModel):
     """Chat message request"""
     message: str = Field(..., description="User message")
     channel_id: str = Field(..., description="Channel ID")
+    user_id: Optional[int] = Field(None, description="User sending the message (defaults to the channel's user)")
+    timezone: Optional[str] = Field(None, description="User's IANA timezone, e.g. 'Europe/Berlin', for resolving dates")
+
+
+class BatchChatItem(BaseModel):
+    """One question of a batch"""
+    id: Optional[str] = Field(None, description="Client reference echoed on the result")
+    message: str = Field(..., description="User message")
+    channel_id: Optional[str] = Field(None, description="Channel to continue (omit for a stateless question)")
+    user_id: Optional[int] = Field(None, description="User the question is about (defaults to the channel's user, or 1)")
+    timezone: Optional[str] = Field(None, description="User's IANA timezone for resolving dates")
+
+
+class BatchChatRequest(BaseModel):
+    """Batch of chat questions run concurrently"""
+    items: List[BatchChatItem] = Field(..., description="Questions; items on the same channel run in order")
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Items run at once (capped by BATCH_MAX_CONCURRENCY)")
 
 
 class ChatResponse(BaseModel):
     """Chat message response"""
     message: Message = Field(..., description="Assistant response message")
     tool_calls: Optional[List[ToolCall]] = Field(None, description="Tool calls made")
+    cached: bool = Field(False, description="Whether the answer was served from the answer cache")
+    degraded: bool = Field(False, description="Whether the answer was built from tool output without the model")
 
 
 class Channel(BaseModel):
@@ -44,11 +63,13 @@ class Channel(BaseModel):
     name: str = Field(..., description="Channel name")
     created_at: datetime = Field(default_factory=datetime.now, description="Creation timestamp")
     message_count: int = Field(default=0, description="Number of messages in channel")
+    user_id: int = Field(1, description="User whose data the channel's conversation is about")
 
 
 class ChannelCreate(BaseModel):
     """Channel creation request"""
     name: str = Field(..., description="Channel name", min_length=1, max_length=100)
+    user_id: int = Field(1, ge=1, description="User the channel belongs to")
 
 
 class ChannelList(BaseModel):
@@ -62,10 +83,41 @@ class MessageHistory(BaseModel):
     messages: List[Message] = Field(..., description="List of messages")
 
 
+class NodeStats(BaseModel):
+    """Runtime statistics for a graph node"""
+    count: int = Field(..., description="Number of invocations")
+    mean_ms: float = Field(..., description="Mean latency in milliseconds")
+    p95_ms: float = Field(..., description="95th percentile latency in milliseconds")
+    total_ms: float = Field(..., description="Total time spent in the node in milliseconds")
+
+
+class EdgeStats(BaseModel):
+    """Runtime statistics for a graph edge"""
+    source: str = Field(..., description="Source node")
+    target: str = Field(..., description="Target node")
+    count: int = Field(..., description="Number of traversals")
+
+
+class ToolUsage(BaseModel):
+    """Tool usage count"""
+    name: str = Field(..., description="Tool name")
+    count: int = Field(..., description="Number of calls")
+
+
+class GraphStats(BaseModel):
+    """Execution statistics over recent agent runs"""
+    executions: int = Field(..., description="Number of executions in the buffer")
+    nodes: Dict[str, NodeStats] = Field(default_factory=dict, description="Per-node statistics")
+    edges: List[EdgeStats] = Field(default_factory=list, description="Per-edge traversal counts")
+    avg_iterations: float = Field(0.0, description="Average agent loop iterations per execution")
+    top_tools: List[ToolUsage] = Field(default_factory=list, description="Most-used tools")
+
+
 class GraphResponse(BaseModel):
     """Graph visualization response"""
     mermaid: str = Field(..., description="Mermaid diagram code")
     png_base64: Optional[str] = Field(None, description="PNG image as base64")
+    stats: Optional[GraphStats] = Field(None, description="Runtime statistics, if requested")
 
 
 class HealthCheck(BaseModel):
@@ -73,3 +125,94 @@ class HealthCheck(BaseModel):
     status: str = Field(..., description="Service status")
     timestamp: datetime = Field(default_factory=datetime.now, description="Check timestamp")
     agent_initialized: bool = Field(..., description="Whether agent is initialized")
+    llm_circuit: str = Field("closed", description="LLM circuit breaker state (closed, open or half_open)")
+
+
+class ReadinessCheck(BaseModel):
+    """Readiness check response"""
+    ready: bool = Field(..., description="Whether the service can serve chat requests")
+    timestamp: datetime = Field(default_factory=datetime.now, description="Check timestamp")
+    agent_initialized: bool = Field(..., description="Whether agent is initialized")
+    warmed_up: bool = Field(False, description="Whether startup warmup has completed")
+    startup_complete: bool = Field(False, description="Whether the startup task has finished")
+    error: Optional[str] = Field(None, description="Agent initialization error, if any")
+
+
+class MetricsResponse(BaseModel):
+    """Runtime metrics"""
+    timestamp: datetime = Field(default_factory=datetime.now, description="Collection timestamp")
+    llm_gateway: Dict[str, Any] = Field(default_factory=dict, description="LLM admission control metrics")
+    answer_cache: Dict[str, Any] = Field(default_factory=dict, description="Answer cache metrics")
+    process_pool: Dict[str, Any] = Field(default_factory=dict, description="CPU-heavy tool offload queue and outcomes")
+    prefetch: Dict[str, Any] = Field(default_factory=dict, description="Speculative tool prefetch hit rate and wasted work")
+    model_tiers: Dict[str, Any] = Field(default_factory=dict, description="Per-tier model latency and router fallbacks")
+    degraded: Dict[str, Any] = Field(default_factory=dict, description="Templated answers served without the model")
+    temporal: Dict[str, Any] = Field(default_factory=dict, description="Date context and agent iterations saved")
+    prompt_tokens: Dict[str, Any] = Field(default_factory=dict, description="Fixed vs variable prompt tokens per model call")
+    compaction: Optional[Dict[str, Any]] = Field(None, description="Last heart-rate compaction report")
+    exports: Dict[str, Any] = Field(default_factory=dict, description="Data export totals and recent throughput")
+    rules: Dict[str, Any] = Field(default_factory=dict, description="Rule engine observations, events and update cost")
+    database: Dict[str, Any] = Field(default_factory=dict, description="Shard layout and connection pool metrics")
+
+
+class ImportJob(BaseModel):
+    """Background data import job"""
+    job_id: str = Field(..., description="Job ID")
+    source: str = Field(..., description="Uploaded file name")
+    status: str = Field(..., description="queued, running, completed or failed")
+    user_id: int = Field(1, description="User the data is imported for")
+    records: int = Field(0, description="Records processed so far")
+    resumed_from: int = Field(0, description="Records skipped thanks to an earlier checkpoint")
+    records_per_second: float = Field(0.0, description="Import throughput")
+    inserted: Dict[str, int] = Field(default_factory=dict, description="New rows per table")
+    error: Optional[str] = Field(None, description="Error message if the import failed")
+    started_at: datetime = Field(default_factory=datetime.now, description="Job start time")
+    finished_at: Optional[datetime] = Field(None, description="Job end time")
+
+
+class ExportCatalog(BaseModel):
+    """Exportable tables and formats"""
+    tables: Dict[str, Optional[str]] = Field(..., description="Table -> column the date range filters on (null = not dated)")
+    formats: List[str] = Field(..., description="Formats available on this server")
+    exports: Dict[str, Any] = Field(default_factory=dict, description="Export totals and recent throughput")
+
+
+class RuleCreate(BaseModel):
+    """Goal/alert rule creation request, e.g. resting_heart_rate > 70 on 3 days in a row"""
+    channel_id: str = Field(..., description="Channel alerts are posted to (its user's data is watched)")
+    metric: str = Field(..., description="Daily metric, e.g. steps, total_sleep_hours, resting_heart_rate")
+    op: str = Field(..., description="Comparison with the threshold: >, >=, < or <=")
+    threshold: float = Field(..., description="Compared with each day's total (or mean for heart rate)")
+    times: int = Field(1, ge=1, description="Days the condition must hold within the window")
+    window_days: Optional[int] = Field(None, ge=1, description="Rolling window length (default: times, i.e. consecutive days)")
+    calendar_week: bool = Field(False, description="Count days in the current Monday-Sunday week instead")
+
+
+class RuleInfo(BaseModel):
+    """Goal/alert rule and the state of its current window"""
+    rule_id: str = Field(..., description="Rule ID")
+    channel_id: str = Field(..., description="Channel alerts are posted to")
+    user_id: int = Field(..., description="User whose data is watched")
+    metric: str = Field(..., description="Daily metric")
+    op: str = Field(..., description="Comparison with the threshold")
+    threshold: float = Field(..., description="Threshold")
+    times: int = Field(..., description="Days the condition must hold within the window")
+    window_days: int = Field(..., description="Window length in days")
+    calendar_week: bool = Field(False, description="Window is the current calendar week")
+    description: str = Field(..., description="Readable condition")
+    qualifying_days: int = Field(0, description="Days in the current window that meet the condition")
+    newest_day: Optional[str] = Field(None, description="Newest day with data")
+    active: bool = Field(False, description="The condition currently holds (it fired, or held at creation)")
+
+
+class RuleList(BaseModel):
+    """List of rules"""
+    rules: List[RuleInfo] = Field(default_factory=list, description="Rules")
+
+
+class QueryTraceSettings(BaseModel):
+    """Query tracing settings (omitted fields are left unchanged)"""
+    enabled: Optional[bool] = Field(None, description="Time and aggregate every SQL statement")
+    slow_query_ms: Optional[float] = Field(None, ge=0, description="Slow-query log threshold in milliseconds")
+    trace_sql: Optional[bool] = Field(None, description="Print every statement SQLite executes")
+    progress_steps: Optional[int] = Field(None, ge=0, description="VM instructions per progress tick (0 disables)")
@@ -1,17 +1,34 @@
 """
 Agent service - manages LangGraph agent and conversations
 """
+import threading
+import time
+import traceback
 import uuid
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TurnTimeout
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
-import sys
-import os
 
-# Add parent directory to path to import existing modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+from app.core.config import ensure_project_root_on_path, get_settings
+from app.models.schemas import ChatResponse, Message, ToolCall
+from app.services.answer_cache import AnswerCache, CachedAnswer
 
-from agent import create_agent, chat as agent_chat
-from app.models.schemas import Message, ToolCall
+# The agent module (and langgraph/langchain with it) is imported lazily in
+# initialize_agent, so importing this module stays cheap
+ensure_project_root_on_path()
+
+from degraded import degraded_responder
+from llm_gateway import CircuitOpen, llm_gateway
+from offload import process_pool
+from prefetch import tool_prefetcher
+from temporal import build_context, temporal_stats
+
+# Turns run on their own threads so a slow model can be abandoned at the latency budget
+TURN_WORKERS = 32
+# LLM queue priority of non-interactive turns (batches); interactive chat uses 0 and goes first
+BACKGROUND_PRIORITY = 1
+# Fair-queuing channel for turns without a channel
+STATELESS_CHANNEL = "stateless"
 
 
 class AgentService:
@@ -19,24 +36,107 @@ class AgentService:
     
     def __init__(self):
         self.agent = None
+        self.init_error: Optional[str] = None
+        self.warmed_up = False
         self.conversation_histories: Dict[str, list] = {}  # channel_id -> conversation history
-        self.initialize_agent()
+        self._init_lock = threading.Lock()
+        settings = get_settings()
+        self.answer_cache = AnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL
+        )
+        degraded_responder.configure(
+            enabled=settings.DEGRADED_MODE_ENABLED,
+            max_tools=settings.DEGRADED_MAX_TOOLS
+        )
+        self._turn_executor = ThreadPoolExecutor(max_workers=TURN_WORKERS, thread_name_prefix="turn")
     
-    def initialize_agent(self):
-        """Initialize the LangGraph agent"""
+    def initialize_agent(self) -> bool:
+        """Initialize the LangGraph agent (idempotent)"""
+        with self._init_lock:
+            if self.agent is not None:
+                return True
+            try:
+                from agent import create_agent
+                settings = get_settings()
+                llm_gateway.configure(
+                    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+                    burst=settings.LLM_BURST,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+                    retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+                    breaker_failures=settings.CIRCUIT_FAILURE_THRESHOLD,
+                    breaker_reset_seconds=settings.CIRCUIT_RESET_SECONDS,
+                    slow_call_seconds=settings.LLM_SLOW_CALL_SECONDS
+                )
+                tool_prefetcher.configure(
+                    enabled=settings.PREFETCH_ENABLED,
+                    max_predictions=settings.PREFETCH_MAX_TOOLS
+                )
+                temporal_stats.configure(
+                    enabled=settings.TEMPORAL_CONTEXT_ENABLED,
+                    holdout=settings.TEMPORAL_HOLDOUT,
+                    default_timezone=settings.DEFAULT_TIMEZONE
+                )
+                process_pool.configure(
+                    workers=settings.OFFLOAD_WORKERS,
+                    max_queue=settings.OFFLOAD_MAX_QUEUE,
+                    timeout=settings.OFFLOAD_TIMEOUT
+                )
+                self.agent = create_agent(
+                    gateway=llm_gateway,
+                    prefetcher=tool_prefetcher,
+                    response_model=settings.LLM_MODEL,
+                    router_model=settings.ROUTER_MODEL or None,
+                    temperature=settings.LLM_TEMPERATURE,
+                    tool_subsetting=settings.TOOL_SUBSETTING_ENABLED,
+                    timeout=settings.LLM_TIMEOUT or None
+                )
+                self.init_error = None
+                return True
+            except Exception as e:
+                self.init_error = f"{type(e).__name__}: {e}"
+                print(f"Error initializing agent: {self.init_error}")
+                traceback.print_exc()
+                return False
+    
+    def warm_up(self):
+        """Pre-open the database so the first request does not pay for it"""
+        from tools import warm_up_database
         try:
-            self.agent = create_agent()
-            return True
+            warm_up_database()
+            self.warmed_up = True
         except Exception as e:
-            print(f"Error initializing agent: {e}")
-            return False
+            print(f"Error warming up database: {e}")
     
     def is_initialized(self) -> bool:
         """Check if agent is initialized"""
         return self.agent is not None
     
-    def get_or_create_conversation(self, channel_id: str) -> list:
-        """Get or create conversation history for a channel"""
+    def _deadline(self, interactive: bool = True) -> float:
+        """Deadline (time.monotonic) for LLM calls of a turn starting now"""
+        settings = get_settings()
+        budget = settings.LLM_REQUEST_DEADLINE
+        if degraded_responder.enabled and interactive:
+            # Past the latency budget the turn has been answered already; start no more calls
+            budget = min(budget, settings.DEGRADED_AFTER_SECONDS)
+        return time.monotonic() + budget
+    
+    def _degraded_reason(self) -> Optional[str]:
+        """Why the model should be skipped for a new turn, or None to call it"""
+        if not degraded_responder.enabled:
+            return None
+        if not self.initialize_agent():
+            return "agent_unavailable"
+        if llm_gateway.breaker.is_open():
+            return "circuit_open"
+        return None
+    
+    def get_or_create_conversation(self, channel_id: Optional[str]) -> list:
+        """Get or create conversation history for a channel (a fresh one if channel_id is None)"""
+        if channel_id is None:
+            return []
         if channel_id not in self.conversation_histories:
             self.conversation_histories[channel_id] = []
         return self.conversation_histories[channel_id]
@@ -66,32 +166,195 @@ class AgentService:
         
         return tool_calls
     
-    def chat(self, channel_id: str, user_message: str) -> Tuple[Message, List[ToolCall]]:
+    def _cache_key(self, user_message: str, conversation_history: list, user_id: int = 1,
+                   timezone: Optional[str] = None) -> Optional[str]:
+        """Cache key for context-free (first-turn) questions, None otherwise"""
+        settings = get_settings()
+        if not settings.ANSWER_CACHE_ENABLED or conversation_history:
+            return None
+        from tools import get_data_versions
+        # Today in the user's timezone plus every resolved date, so "yesterday" never goes stale
+        date_context, _ = build_context(user_message, timezone or settings.DEFAULT_TIMEZONE)
+        return self.answer_cache.make_key(user_message, date_context, get_data_versions(user_id), user_id=user_id)
+    
+    def _cached_turn(self, channel_id: str, user_message: str, cached: CachedAnswer) -> ChatResponse:
+        """Answer from the cache, recording the turn so follow-ups have context"""
+        from langchain_core.messages import AIMessage, HumanMessage
+        
+        conversation_history = self.get_or_create_conversation(channel_id)
+        conversation_history.append(HumanMessage(content=user_message))
+        conversation_history.append(AIMessage(content=cached.content))
+        
+        tool_calls = [tc.model_copy() for tc in cached.tool_calls]
+        response_message = Message(
+            id=str(uuid.uuid4()),
+            role="assistant",
+            content=cached.content,
+            timestamp=datetime.now(),
+            tool_calls=tool_calls if tool_calls else None
+        )
+        return ChatResponse(
+            message=response_message,
+            tool_calls=tool_calls if tool_calls else None,
+            cached=True
+        )
+    
+    def _degraded_turn(self, channel_id: str, user_message: str, user_id: int, reason: str,
+                       timezone: Optional[str] = None) -> ChatResponse:
+        """Answer from local tool output without the model, recording the turn"""
+        from langchain_core.messages import AIMessage, HumanMessage
+        
+        content, calls = degraded_responder.answer(user_message, reason, user_id=user_id,
+                                                   today=temporal_stats.today(timezone))
+        conversation_history = self.get_or_create_conversation(channel_id)
+        conversation_history.append(HumanMessage(content=user_message))
+        conversation_history.append(AIMessage(content=content))
+        
+        tool_calls = [ToolCall(tool_name=name, arguments=args, result=result[:500]) for name, args, result in calls]
+        response_message = Message(
+            id=str(uuid.uuid4()),
+            role="assistant",
+            content=content,
+            timestamp=datetime.now(),
+            tool_calls=tool_calls if tool_calls else None
+        )
+        return ChatResponse(
+            message=response_message,
+            tool_calls=tool_calls if tool_calls else None,
+            degraded=True
+        )
+    
+    @staticmethod
+    def _failure_reason(error: Exception) -> str:
+        """Degraded-answer reason for a failed turn"""
+        if isinstance(error, CircuitOpen):
+            return "circuit_open"
+        return "error"
+    
+    def chat(self, channel_id: Optional[str], user_message: str, user_id: int = 1,
+             timezone: Optional[str] = None, tool_cache=None, interactive: bool = True) -> ChatResponse:
         """
         Process user message and return response
         
         Args:
-            channel_id: Channel ID
+            channel_id: Channel ID (None for a stateless question without history)
             user_message: User's message
+            user_id: User whose data the tools query
+            timezone: User's IANA timezone for resolving dates
+            tool_cache: ToolResultCache shared with other turns (e.g. of a batch)
+            interactive: False for background turns (batches): they queue behind
+                interactive chat and wait for the model instead of degrading at
+                the latency budget
         
         Returns:
-            Tuple of (assistant message, tool calls)
+            ChatResponse with the assistant message and tool calls (marked
+            degraded when it was built from tool output without the model)
         """
-        if not self.is_initialized():
-            raise RuntimeError("Agent not initialized")
-        
         # Get conversation history for this channel
         conversation_history = self.get_or_create_conversation(channel_id)
         
-        # Call agent
-        response_text, updated_history = agent_chat(
+        # Repeated first-turn questions are answered from the cache
+        cache_key = self._cache_key(user_message, conversation_history, user_id, timezone)
+        if cache_key:
+            cached = self.answer_cache.get(cache_key)
+            if cached:
+                return self._cached_turn(channel_id, user_message, cached)
+        
+        # Known outage: answer from the data right away instead of waiting
+        reason = self._degraded_reason()
+        if reason:
+            return self._degraded_turn(channel_id, user_message, user_id, reason, timezone)
+        if not self.initialize_agent():
+            raise RuntimeError(f"Agent not initialized: {self.init_error}")
+        
+        from agent import chat as agent_chat
+        
+        # Call agent (on a copy of the history, so an abandoned turn can't touch it)
+        turn = self._turn_executor.submit(
+            agent_chat,
             self.agent,
             user_message,
-            conversation_history
+            list(conversation_history),
+            channel_id=channel_id or STATELESS_CHANNEL,
+            deadline=self._deadline(interactive),
+            user_id=user_id,
+            timezone=timezone,
+            priority=0 if interactive else BACKGROUND_PRIORITY,
+            tool_cache=tool_cache
         )
+        if not degraded_responder.enabled:
+            response_text, updated_history = turn.result()
+            return self._finish_turn(channel_id, response_text, updated_history, cache_key)
         
+        try:
+            response_text, updated_history = turn.result(
+                timeout=get_settings().DEGRADED_AFTER_SECONDS if interactive else None)
+        except TurnTimeout:
+            return self._degraded_turn(channel_id, user_message, user_id, "timeout", timezone)
+        except Exception as e:
+            print(f"Agent turn failed, answering in degraded mode: {type(e).__name__}: {e}")
+            return self._degraded_turn(channel_id, user_message, user_id, self._failure_reason(e), timezone)
+        
+        return self._finish_turn(channel_id, response_text, updated_history, cache_key)
+    
+    def stream_chat(self, channel_id: str, user_message: str, user_id: int = 1,
+                    timezone: Optional[str] = None) -> Iterator[dict]:
+        """
+        Process user message and stream incremental events
+        
+        Args:
+            channel_id: Channel ID
+            user_message: User's message
+            user_id: User whose data the tools query
+            timezone: User's IANA timezone for resolving dates
+        
+        Yields:
+            Event dicts ("token", "tool_start", "tool_end"), followed by a
+            "final" event carrying the ChatResponse
+        """
+        conversation_history = self.get_or_create_conversation(channel_id)
+        
+        cache_key = self._cache_key(user_message, conversation_history, user_id, timezone)
+        if cache_key:
+            cached = self.answer_cache.get(cache_key)
+            if cached:
+                yield {"type": "final", "response": self._cached_turn(channel_id, user_message, cached)}
+                return
+        
+        reason = self._degraded_reason()
+        if reason:
+            yield {"type": "final",
+                   "response": self._degraded_turn(channel_id, user_message, user_id, reason, timezone)}
+            return
+        if not self.initialize_agent():
+            raise RuntimeError(f"Agent not initialized: {self.init_error}")
+        
+        from agent import stream_chat as agent_stream_chat
+        
+        # Model calls stop starting at the latency budget and each is bounded by LLM_TIMEOUT
+        try:
+            for event in agent_stream_chat(self.agent, user_message, list(conversation_history),
+                                           channel_id=channel_id, deadline=self._deadline(),
+                                           user_id=user_id, timezone=timezone):
+                if event["type"] == "final":
+                    response = self._finish_turn(channel_id, event["content"], event["history"], cache_key)
+                    yield {"type": "final", "response": response}
+                else:
+                    yield event
+        except Exception as e:
+            if not degraded_responder.enabled:
+                raise
+            print(f"Agent turn failed, answering in degraded mode: {type(e).__name__}: {e}")
+            reason = self._failure_reason(e)
+            yield {"type": "final",
+                   "response": self._degraded_turn(channel_id, user_message, user_id, reason, timezone)}
+    
+    def _finish_turn(self, channel_id: str, response_text: str, updated_history: list,
+                     cache_key: Optional[str] = None) -> ChatResponse:
+        """Store the updated history, cache first-turn answers and build the response"""
         # Update stored history
-        self.conversation_histories[channel_id] = updated_history
+        if channel_id is not None:
+            self.conversation_histories[channel_id] = updated_history
         
         # Extract tool calls
         tool_calls = self.extract_tool_calls(updated_history)
@@ -105,7 +368,13 @@ class AgentService:
             tool_calls=tool_calls if tool_calls else None
         )
         
-        return response_message, tool_calls
+        if cache_key:
+            self.answer_cache.put(cache_key, response_text, tool_calls)
+        
+        return ChatResponse(
+            message=response_message,
+            tool_calls=tool_calls if tool_calls else None
+        )
     
     def clear_conversation(self, channel_id: str):
         """Clear conversation history for a channel"""
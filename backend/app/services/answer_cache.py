@@ -0,0 +1,93 @@
+"""
+Answer cache - reuses responses to repeated first-turn questions
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional
+
+from app.models.schemas import ToolCall
+
+# Words that do not change what is being asked
+FILLER_WORDS = {"please", "pls", "plz", "hey", "hi", "hello", "thanks", "thank", "thx"}
+
+
+class CachedAnswer(NamedTuple):
+    """A cached assistant answer"""
+    content: str
+    tool_calls: List[ToolCall]
+
+
+class AnswerCache:
+    """
+    TTL + LRU cache of assistant answers
+
+    Keys combine the user, a normalized question fingerprint, the date
+    context the question was resolved against and the data versions of the
+    underlying tables, so new data or a new day never serves a stale answer
+    and one user's answer is never served to another.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, CachedAnswer)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(question: str) -> str:
+        """Normalize case, punctuation, whitespace and filler words"""
+        words = re.findall(r"[a-z0-9]+", question.lower())
+        return " ".join(word for word in words if word not in FILLER_WORDS)
+
+    def make_key(self, question: str, date_context: Any, data_versions: dict, user_id: int = 1) -> str:
+        """Build the cache key for a question"""
+        payload = json.dumps(
+            [user_id, self.fingerprint(question), date_context, sorted(data_versions.items())],
+            default=str
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        """Look up a cached answer, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, content: str, tool_calls: List[ToolCall]):
+        """Store an answer, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, CachedAnswer(content, list(tool_calls)))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached answers"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,147 @@
+"""
+Batch service - runs many chat questions concurrently
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import ensure_project_root_on_path, get_settings
+from app.models.schemas import BatchChatItem, Message
+from app.services.agent_service import agent_service
+from app.services.channel_service import channel_service
+from app.services.connection_service import connection_service
+
+ensure_project_root_on_path()
+
+from llm_gateway import AdmissionRejected
+from tool_cache import ToolResultCache
+
+
+class BatchService:
+    """Service for running batches of chat questions"""
+
+    @staticmethod
+    def _error(error: Exception) -> tuple:
+        """HTTP-style status code and message for a failed item"""
+        if isinstance(error, ValueError):
+            return 404, str(error)
+        if isinstance(error, PermissionError):
+            return 403, str(error)
+        if isinstance(error, AdmissionRejected):
+            return 503, str(error)
+        return 500, f"{type(error).__name__}: {error}"
+
+    async def _run_item(self, index: int, item: BatchChatItem, tool_cache: ToolResultCache) -> dict:
+        """Run one question; errors are reported on the item instead of failing the batch"""
+        started = time.perf_counter()
+        result = {"type": "result", "index": index, "id": item.id, "channel_id": item.channel_id}
+        try:
+            if item.channel_id:
+                user_id = channel_service.resolve_user(item.channel_id, item.user_id)
+                user_message = Message(
+                    id=str(uuid.uuid4()),
+                    role="user",
+                    content=item.message,
+                    timestamp=datetime.now()
+                )
+                channel_service.add_message(item.channel_id, user_message)
+                await connection_service.publish(item.channel_id, {
+                    "type": "user_message",
+                    "message": user_message.model_dump(mode="json")
+                })
+            else:
+                user_id = item.user_id or 1
+
+            response = await run_in_threadpool(
+                agent_service.chat,
+                item.channel_id,
+                item.message,
+                user_id,
+                item.timezone,
+                tool_cache=tool_cache,
+                interactive=False
+            )
+
+            if item.channel_id:
+                channel_service.add_message(item.channel_id, response.message)
+                await connection_service.publish(item.channel_id, {
+                    "type": "final",
+                    **response.model_dump(mode="json")
+                })
+            result.update(status="ok", response=response)
+        except Exception as e:
+            code, detail = self._error(e)
+            result.update(status="error", code=code, error=detail)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def run(self, items: List[BatchChatItem], max_concurrency: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Run a batch, yielding each item's result as it completes
+
+        Items on the same channel share its history, so they run one after
+        another in request order; everything else runs concurrently, at most
+        `max_concurrency` at a time (the LLM gateway still enforces its own
+        limits). Identical tool calls across the batch run once.
+
+        Args:
+            items: Questions to run
+            max_concurrency: Items run at once (capped by BATCH_MAX_CONCURRENCY)
+
+        Yields:
+            One "result" dict per item in completion order, then a "summary"
+        """
+        settings = get_settings()
+        limit = min(max_concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+        semaphore = asyncio.Semaphore(max(1, limit))
+        tool_cache = ToolResultCache()
+        results: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+
+        # Channel items in order per channel; stateless items each on their own
+        groups: "OrderedDict[object, list]" = OrderedDict()
+        for index, item in enumerate(items):
+            groups.setdefault(item.channel_id or ("stateless", index), []).append((index, item))
+
+        async def run_group(group: list):
+            for index, item in group:
+                async with semaphore:
+                    result = await self._run_item(index, item, tool_cache)
+                await results.put(result)
+
+        tasks = [asyncio.create_task(run_group(group)) for group in groups.values()]
+        succeeded = degraded = 0
+        item_ms = 0.0
+        try:
+            for _ in range(len(items)):
+                result = await results.get()
+                if result["status"] == "ok":
+                    succeeded += 1
+                    degraded += result["response"].degraded
+                item_ms += result["elapsed_ms"]
+                yield result
+        finally:
+            # Client went away: stop starting new items
+            for task in tasks:
+                task.cancel()
+
+        yield {
+            "type": "summary",
+            "items": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "degraded": degraded,
+            "max_concurrency": limit,
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+            "sum_item_ms": round(item_ms, 1),
+            "tool_cache": tool_cache.stats(),
+        }
+
+
+# Global batch service instance
+batch_service = BatchService()
@@ -2,7 +2,7 @@
 Channel service - manages chat channels
 """
 import uuid
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.models.schemas import Channel, Message
 
@@ -17,14 +17,15 @@ class ChannelService:
         # Create default channel
         self.create_channel("General")
     
-    def create_channel(self, name: str) -> Channel:
-        """Create a new channel"""
+    def create_channel(self, name: str, user_id: int = 1) -> Channel:
+        """Create a new channel for a user"""
         channel_id = str(uuid.uuid4())
         channel = Channel(
             id=channel_id,
             name=name,
             created_at=datetime.now(),
-            message_count=0
+            message_count=0,
+            user_id=user_id
         )
         self.channels[channel_id] = channel
         self.channel_messages[channel_id] = []
@@ -36,9 +37,29 @@ class ChannelService:
             raise ValueError(f"Channel {channel_id} not found")
         return self.channels[channel_id]
     
-    def list_channels(self) -> List[Channel]:
-        """List all channels"""
-        return list(self.channels.values())
+    def list_channels(self, user_id: Optional[int] = None) -> List[Channel]:
+        """List all channels, or only a user's"""
+        return [c for c in self.channels.values() if user_id is None or c.user_id == user_id]
+    
+    def resolve_user(self, channel_id: str, user_id: Optional[int] = None) -> int:
+        """
+        User a chat turn on a channel runs for
+        
+        Args:
+            channel_id: Channel ID
+            user_id: User claimed by the request, if any
+        
+        Returns:
+            The channel's user
+        
+        Raises:
+            ValueError: If the channel doesn't exist
+            PermissionError: If the channel belongs to a different user
+        """
+        channel = self.get_channel(channel_id)
+        if user_id is not None and user_id != channel.user_id:
+            raise PermissionError(f"Channel {channel_id} belongs to another user")
+        return channel.user_id
     
     def delete_channel(self, channel_id: str) -> bool:
         """Delete a channel"""
@@ -0,0 +1,143 @@
+"""
+Connection service - tracks WebSocket clients and their channel subscriptions
+"""
+import asyncio
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from app.core.responses import dumps
+
+
+# Close code for a client that stopped reading (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """A WebSocket client with an outbound queue and ack-based flow control"""
+
+    def __init__(self, websocket: WebSocket, max_unacked: int, queue_size: int, max_inflight_turns: int):
+        self.websocket = websocket
+        self.subscriptions: Set[str] = set()
+        self.max_unacked = max_unacked
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.seq = 0  # sequence number of the last event sent
+        self.acked = 0  # highest sequence number acknowledged by the client
+        self.inflight_turns = 0
+        self.max_inflight_turns = max_inflight_turns
+        self._acked_changed = asyncio.Condition()
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None  # run_writer() task, cancelled on close
+        self._closing: Optional[asyncio.Task] = None
+
+    def try_start_turn(self) -> bool:
+        """Reserve an in-flight turn slot; False if the connection is at its limit"""
+        if self.inflight_turns >= self.max_inflight_turns:
+            return False
+        self.inflight_turns += 1
+        return True
+
+    def finish_turn(self):
+        """Release an in-flight turn slot"""
+        self.inflight_turns -= 1
+
+    def push(self, event: dict) -> bool:
+        """
+        Queue an event for sending without waiting
+
+        Token events are dropped when the queue is full; the final message
+        always carries the complete text. Any other event that does not fit
+        means the client stopped acknowledging, so the connection is closed
+        rather than letting it hold up the channel's other subscribers.
+
+        Returns:
+            Whether the event was queued
+        """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            if event.get("type") != "token":
+                self.close(SLOW_CONSUMER_CLOSE_CODE, "Send queue full")
+            return False
+
+    def close(self, code: int = 1000, reason: str = ""):
+        """Stop sending and close the socket (the receive loop then sees the disconnect)"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer is not None:
+            self.writer.cancel()
+        self._closing = asyncio.create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except RuntimeError:
+            pass  # Already closed by the client
+
+    async def ack(self, seq: int):
+        """Record a client acknowledgement"""
+        async with self._acked_changed:
+            self.acked = max(self.acked, min(seq, self.seq))
+            self._acked_changed.notify_all()
+
+    async def run_writer(self):
+        """Send queued events, pausing while too many are unacknowledged"""
+        while True:
+            event = await self.queue.get()
+            async with self._acked_changed:
+                await self._acked_changed.wait_for(lambda: self.seq - self.acked < self.max_unacked)
+                self.seq += 1
+                seq = self.seq
+            await self.websocket.send_text(dumps({**event, "seq": seq}).decode("utf-8"))
+
+
+class ConnectionService:
+    """Service for fanning out chat events to subscribed WebSocket clients"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[ClientConnection]] = {}  # channel_id -> connections
+
+    def subscribe(self, connection: ClientConnection, channel_id: str):
+        """Subscribe a connection to a channel (no-op once it has disconnected)"""
+        if connection.closed:
+            return
+        connection.subscriptions.add(channel_id)
+        self.subscribers.setdefault(channel_id, set()).add(connection)
+
+    def unsubscribe(self, connection: ClientConnection, channel_id: str):
+        """Unsubscribe a connection from a channel"""
+        connection.subscriptions.discard(channel_id)
+        if channel_id in self.subscribers:
+            self.subscribers[channel_id].discard(connection)
+            if not self.subscribers[channel_id]:
+                del self.subscribers[channel_id]
+
+    def disconnect(self, connection: ClientConnection):
+        """Remove a connection from all channels and stop sending to it"""
+        connection.closed = True
+        for channel_id in list(connection.subscriptions):
+            self.unsubscribe(connection, channel_id)
+
+    def subscriber_count(self, channel_id: str) -> int:
+        """Number of connections subscribed to a channel"""
+        return len(self.subscribers.get(channel_id, ()))
+
+    async def publish(self, channel_id: str, event: dict):
+        """
+        Send an event to every connection subscribed to a channel
+
+        Never waits on a subscriber: one whose queue is full is closed and
+        dropped from its channels.
+        """
+        for connection in list(self.subscribers.get(channel_id, ())):
+            connection.push({**event, "channel_id": channel_id})
+            if connection.closed:
+                self.disconnect(connection)
+
+
+# Global connection service instance
+connection_service = ConnectionService()
@@ -1,24 +1,58 @@
 """
 Graph service - manages graph visualization
 """
-import sys
-import os
 import base64
 import io
+from typing import Optional
 
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
-
-from graph_viz import get_graph_mermaid
+from app.core.config import ensure_project_root_on_path
 from app.services.agent_service import agent_service
 from app.models.schemas import GraphResponse
 
+ensure_project_root_on_path()
+
+from execution_stats import execution_stats
+
 
 class GraphService:
     """Service for graph visualization"""
     
-    def get_graph(self) -> GraphResponse:
-        """Get graph visualization"""
+    def __init__(self):
+        # The graph topology is static once the agent is built, so render it once
+        self._mermaid: Optional[str] = None
+        self._png_base64: Optional[str] = None
+    
+    def _render(self):
+        """Render and cache the Mermaid code and PNG for the agent graph"""
+        from graph_viz import get_graph_mermaid, get_graph_image
+        
+        self._mermaid = get_graph_mermaid(agent_service.agent)
+        
+        # Try to get PNG as base64
+        try:
+            img = get_graph_image(agent_service.agent)
+            if img:
+                buffered = io.BytesIO()
+                img.save(buffered, format="PNG")
+                self._png_base64 = base64.b64encode(buffered.getvalue()).decode()
+        except Exception as e:
+            print(f"Could not generate PNG: {e}")
+    
+    def warm_up(self):
+        """Prime the rendered graph cache"""
+        if agent_service.is_initialized() and self._mermaid is None:
+            self._render()
+    
+    def get_graph(self, include_stats: bool = False) -> GraphResponse:
+        """
+        Get graph visualization
+        
+        Args:
+            include_stats: Annotate the diagram with runtime statistics
+        
+        Returns:
+            GraphResponse with Mermaid code, optional PNG and optional stats
+        """
         if not agent_service.is_initialized():
             return GraphResponse(
                 mermaid="graph TD\n  A[Agent Not Initialized]",
@@ -26,24 +60,20 @@ class GraphService:
             )
         
         try:
-            # Get mermaid diagram
-            mermaid = get_graph_mermaid(agent_service.agent)
+            if self._mermaid is None:
+                self._render()
             
-            # Try to get PNG as base64
-            png_base64 = None
-            try:
-                from graph_viz import get_graph_image
-                img = get_graph_image(agent_service.agent)
-                if img:
-                    buffered = io.BytesIO()
-                    img.save(buffered, format="PNG")
-                    png_base64 = base64.b64encode(buffered.getvalue()).decode()
-            except Exception as e:
-                print(f"Could not generate PNG: {e}")
+            mermaid = self._mermaid
+            stats = None
+            if include_stats:
+                from graph_viz import annotate_mermaid
+                stats = execution_stats.snapshot()
+                mermaid = annotate_mermaid(mermaid, stats)
             
             return GraphResponse(
                 mermaid=mermaid,
-                png_base64=png_base64
+                png_base64=self._png_base64,
+                stats=stats
             )
         
         except Exception as e:
@@ -0,0 +1,154 @@
+"""
+Import service - runs device data imports as background jobs
+"""
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+from app.core.config import ensure_project_root_on_path, get_settings
+from app.models.schemas import ImportJob
+from app.services.rule_service import rule_service
+
+ensure_project_root_on_path()
+
+from importers.apple_health import import_apple_health
+
+# importers.workout_files (and numpy with it) is imported when a workout file is
+# first uploaded, so importing this module stays cheap
+
+
+class ImportService:
+    """Service for running imports in background threads and tracking their progress"""
+    
+    def __init__(self):
+        self.jobs: Dict[str, ImportJob] = {}
+        self._lock = threading.Lock()
+    
+    def upload_path(self, filename: str) -> Path:
+        """
+        Where to spool an uploaded file
+        
+        Each upload gets its own directory, so concurrent uploads with the
+        same name (usually export.zip) never share a file. The original file
+        name is kept because the import checkpoint is keyed on it, so
+        re-uploading the same export after a failure still resumes.
+        """
+        directory = Path(get_settings().IMPORT_UPLOAD_DIR or tempfile.gettempdir()) / "wearables-imports"
+        directory.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(dir=directory)) / Path(filename).name
+    
+    def discard_upload(self, path: Path):
+        """Delete a spooled upload and its directory"""
+        shutil.rmtree(path.parent, ignore_errors=True)
+    
+    def start_apple_health(self, path: Path, user_id: int = 1) -> ImportJob:
+        """
+        Start importing an Apple Health export in the background
+        
+        Args:
+            path: Spooled export.xml or export.zip (deleted when the job ends)
+            user_id: User the data belongs to
+        
+        Returns:
+            The queued job
+        """
+        job = ImportJob(job_id=str(uuid.uuid4()), source=path.name, status="queued", user_id=user_id)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        threading.Thread(target=self._run, args=(job, path), daemon=True).start()
+        return job
+    
+    def start_workout_file(self, path: Path, user_id: int = 1) -> ImportJob:
+        """
+        Start importing a FIT, GPX or TCX workout file in the background
+        
+        Args:
+            path: Spooled workout file (deleted when the job ends)
+            user_id: User the workout belongs to
+        
+        Returns:
+            The queued job
+        """
+        from importers.workout_files import SUPPORTED_SUFFIXES
+        
+        if path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            raise ValueError(f"Unsupported workout file type: {path.suffix or path.name}")
+        job = ImportJob(job_id=str(uuid.uuid4()), source=path.name, status="queued", user_id=user_id)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        threading.Thread(target=self._run_workout_file, args=(job, path), daemon=True).start()
+        return job
+    
+    def get_job(self, job_id: str) -> ImportJob:
+        """Get job by ID"""
+        if job_id not in self.jobs:
+            raise ValueError(f"Import job {job_id} not found")
+        return self.jobs[job_id]
+    
+    def list_jobs(self):
+        """List all jobs, newest first"""
+        return sorted(self.jobs.values(), key=lambda job: job.started_at, reverse=True)
+    
+    def _update(self, job: ImportJob, stats: dict):
+        job.records = stats["records"]
+        job.resumed_from = stats["resumed_from"]
+        job.records_per_second = stats["records_per_second"]
+        job.inserted = dict(stats["inserted"])
+    
+    def _run(self, job: ImportJob, path: Path):
+        """Run an import job to completion"""
+        job.status = "running"
+        try:
+            stats = import_apple_health(
+                str(path),
+                user_id=job.user_id,
+                batch_size=get_settings().IMPORT_BATCH_SIZE,
+                progress=lambda stats: self._update(job, stats),
+                observe=lambda observations: rule_service.ingest(job.user_id, observations)
+            )
+            self._update(job, stats)
+            rule_service.flush(job.user_id)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Error importing {job.source}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            self.discard_upload(path)
+
+    
+    def _run_workout_file(self, job: ImportJob, path: Path):
+        """Run a workout file import job to completion"""
+        from importers.workout_files import import_workout_files
+        
+        job.status = "running"
+        try:
+            stats = import_workout_files(
+                [str(path)],
+                user_id=job.user_id,
+                workers=1,
+                observe=lambda observations: rule_service.ingest(job.user_id, observations)
+            )
+            if stats["errors"]:
+                raise ValueError(stats["errors"][path.name])
+            job.records = stats["samples"]
+            job.records_per_second = round(stats["samples"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+            job.inserted = {"activities": stats["imported"], "track_points": stats["imported"]}
+            rule_service.flush(job.user_id)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Error importing {job.source}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            self.discard_upload(path)
+
+
+# Global import service instance
+import_service = ImportService()
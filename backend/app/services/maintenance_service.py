@@ -0,0 +1,80 @@
+"""
+Maintenance service - scheduled database compaction
+"""
+import asyncio
+import threading
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import ensure_project_root_on_path, get_settings
+
+ensure_project_root_on_path()
+
+from compaction import compact_heart_rate
+from sharding import shard_router
+
+# Report fields summed across database files
+SUMMED_FIELDS = ("raw_rows_folded", "minute_rows_folded", "batches", "bytes_reclaimed", "db_bytes", "seconds")
+
+
+class MaintenanceService:
+    """Service for running the heart-rate retention policy on a schedule"""
+    
+    def __init__(self):
+        self.last_report: Optional[dict] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def run_compaction(self) -> dict:
+        """
+        Run compaction now (blocking) on every database file; concurrent calls
+        wait for the running one
+        
+        Returns:
+            Compaction report (rows folded, batches, bytes reclaimed) summed over files
+        """
+        settings = get_settings()
+        with self._lock:
+            try:
+                report = {"files": 0}
+                for path in shard_router.all_paths():
+                    file_report = compact_heart_rate(
+                        raw_days=settings.HR_RAW_RETENTION_DAYS,
+                        minute_days=settings.HR_MINUTE_RETENTION_DAYS,
+                        batch_size=settings.COMPACTION_BATCH_SIZE,
+                        db_path=str(path)
+                    )
+                    for key, value in file_report.items():
+                        if key in SUMMED_FIELDS:
+                            report[key] = report.get(key, 0) + value
+                        else:
+                            report.setdefault(key, value)
+                    report["files"] += 1
+                self.last_report = report
+                self.last_error = None
+            except Exception as e:
+                print(f"Error compacting heart rate data: {e}")
+                self.last_error = str(e)
+                raise
+            return self.last_report
+    
+    async def run_scheduler(self):
+        """Run compaction every COMPACTION_INTERVAL_HOURS until cancelled"""
+        interval = get_settings().COMPACTION_INTERVAL_HOURS * 3600
+        while True:
+            try:
+                await run_in_threadpool(self.run_compaction)
+            except Exception:
+                pass  # Already logged; retry at the next interval
+            await asyncio.sleep(interval)
+    
+    def status(self) -> Optional[dict]:
+        """Last compaction report, with the error if the last run failed"""
+        if self.last_error:
+            return {**(self.last_report or {}), "error": self.last_error}
+        return self.last_report
+
+
+# Global maintenance service instance
+maintenance_service = MaintenanceService()
@@ -0,0 +1,117 @@
+"""
+Rule service - goal/alert rules evaluated on ingest and posted to channels
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import ensure_project_root_on_path
+from app.models.schemas import Message, RuleCreate, RuleInfo
+from app.services.channel_service import channel_service
+from app.services.connection_service import connection_service
+
+ensure_project_root_on_path()
+
+from rules import Rule, rule_engine
+
+
+class RuleService:
+    """Service for managing rules and delivering the events they fire"""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Event loop WebSocket events are published on (imports run in other threads)"""
+        self.loop = loop
+
+    def _info(self, rule: Rule) -> RuleInfo:
+        return RuleInfo(**rule._asdict(), description=rule.describe(), **rule_engine.status(rule.rule_id))
+
+    def create(self, request: RuleCreate) -> RuleInfo:
+        """
+        Create a rule on a channel's user
+
+        Raises:
+            ValueError: Unknown channel, metric or operator, or an invalid window
+        """
+        user_id = channel_service.resolve_user(request.channel_id)
+        rule = rule_engine.add_rule(
+            user_id,
+            request.channel_id,
+            request.metric,
+            request.op,
+            request.threshold,
+            times=request.times,
+            window_days=request.window_days,
+            calendar_week=request.calendar_week
+        )
+        return self._info(rule)
+
+    def get(self, rule_id: str) -> RuleInfo:
+        """Get rule by ID"""
+        if rule_id not in rule_engine.rules:
+            raise ValueError(f"Rule {rule_id} not found")
+        return self._info(rule_engine.rules[rule_id])
+
+    def list_rules(self, user_id: Optional[int] = None, channel_id: Optional[str] = None) -> List[RuleInfo]:
+        """List rules, optionally for one user or channel"""
+        return [self._info(rule) for rule in rule_engine.list_rules(user_id)
+                if channel_id is None or rule.channel_id == channel_id]
+
+    def delete(self, rule_id: str) -> bool:
+        """Delete a rule"""
+        return rule_engine.remove_rule(rule_id)
+
+    def ingest(self, user_id: int, observations: list):
+        """
+        Evaluate rules against newly imported samples and post fired alerts
+
+        Safe to call from import threads: each alert is stored as an
+        assistant message on the rule's channel and published to its
+        WebSocket subscribers on the server's event loop.
+
+        Args:
+            user_id: User the samples belong to
+            observations: (metric, day, amount) tuples from an importer
+        """
+        self._post(rule_engine.ingest(user_id, observations))
+
+    def flush(self, user_id: int):
+        """
+        Evaluate rules that wait for complete days and post fired alerts
+
+        Called when an import finishes, so "<" rules on daily totals see
+        whole days rather than the first batch of a day's samples.
+
+        Args:
+            user_id: User whose import finished
+        """
+        self._post(rule_engine.flush(user_id))
+
+    def _post(self, events: List[dict]):
+        """Store each event as an assistant message and publish it to the channel"""
+        for event in events:
+            message = Message(
+                id=str(uuid.uuid4()),
+                role="assistant",
+                content=event["message"],
+                timestamp=datetime.now()
+            )
+            try:
+                channel_service.add_message(event["channel_id"], message)
+            except ValueError as e:
+                print(f"Dropping alert for rule {event['rule_id']}: {e}")
+                continue
+            if self.loop is not None and not self.loop.is_closed():
+                asyncio.run_coroutine_threadsafe(connection_service.publish(event["channel_id"], {
+                    "type": "final",
+                    "message": message.model_dump(mode="json"),
+                    "tool_calls": [],
+                    "alert": event
+                }), self.loop)
+
+
+# Global rule service instance
+rule_service = RuleService()
@@ -0,0 +1,102 @@
+"""
+Import-time benchmark for the FastAPI application.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports the total import cost and the slowest modules, so that startup
+regressions (e.g. a heavy library imported at module level) are visible.
+
+Usage:
+    python benchmarks/bench_import_time.py [--top 15] [--repeat 3] [--json out.json]
+                                           [--baseline baseline.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def run_importtime(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Dotted module name to import
+
+    Returns:
+        Dict mapping module name to cumulative import time in microseconds
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative = {"__top_level__": []}
+    for line in proc.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        cumulative[name] = max(cumulative.get(name, 0), int(cumulative_us))
+        # Top-level imports have a single space of indentation
+        if not raw_name.startswith("  "):
+            cumulative["__top_level__"].append(name)
+    return cumulative
+
+
+def summarize(module: str, repeat: int, top: int) -> dict:
+    """Run the import benchmark several times and summarize the results"""
+    runs = [run_importtime(module) for _ in range(repeat)]
+    totals = [sum(run[name] for name in run["__top_level__"]) for run in runs]
+
+    # Slowest modules by median cumulative time across runs
+    names = set().union(*(run.keys() for run in runs)) - {"__top_level__"}
+    medians = {name: statistics.median(run.get(name, 0) for run in runs) for name in names}
+    slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "repeat": repeat,
+        "total_ms": round(statistics.median(totals) / 1000, 1),
+        "min_total_ms": round(min(totals) / 1000, 1),
+        "slowest": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of fresh-interpreter runs")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to show")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json result")
+    args = parser.parse_args()
+
+    result = summarize(args.module, args.repeat, args.top)
+
+    print(f"Import time for {result['module']}: {result['total_ms']} ms "
+          f"(median of {result['repeat']}, min {result['min_total_ms']} ms)\n")
+    print(f"{'cumulative ms':>14}  module")
+    for entry in result["slowest"]:
+        print(f"{entry['cumulative_ms']:>14.1f}  {entry['module']}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        delta = result["total_ms"] - baseline["total_ms"]
+        pct = delta / baseline["total_ms"] * 100 if baseline["total_ms"] else 0.0
+        print(f"\nBaseline: {baseline['total_ms']} ms -> {result['total_ms']} ms ({delta:+.1f} ms, {pct:+.1f}%)")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
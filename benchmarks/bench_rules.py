@@ -0,0 +1,150 @@
+"""
+Benchmark for incremental rule evaluation (rules.py) against history length.
+
+For each history length, a seeded database is built (shared with
+bench_tools.py) and three typical rules are created:
+
+  - resting_heart_rate > 70 for 3 days in a row
+  - total_sleep_hours < 6 on 2 days this week
+  - steps < 5000 on 3 of 7 days
+
+Then new days of samples (12 resting heart-rate readings, steps and sleep
+per day) are fed one observation at a time, and three costs are reported:
+
+  - prime:       creating the rules (one bounded read of the last 31 days)
+  - incremental: RuleEngine.ingest per observation, median and p95
+  - rescan:      re-aggregating the metric's full history and re-evaluating
+                 the rule, i.e. what polling the database per sample costs
+
+Incremental cost should stay flat as history grows; rescan grows with it.
+
+Usage:
+    python benchmarks/bench_rules.py [--days 30,365,1825,3650] [--new-days 30]
+                                     [--repeat 5] [--seed 42] [--json out.json]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_tools import HR_SAMPLES_PER_DAY, ensure_database, rows_per_user_day
+
+RULES = [
+    {"metric": "resting_heart_rate", "op": ">", "threshold": 70, "times": 3},
+    {"metric": "total_sleep_hours", "op": "<", "threshold": 6, "times": 2, "calendar_week": True},
+    {"metric": "steps", "op": "<", "threshold": 5000, "times": 3, "window_days": 7},
+]
+
+
+def new_observations(start: date, days: int, seed: int) -> list:
+    """Samples for `days` new days from `start`, in arrival order."""
+    rng = random.Random(seed)
+    observations = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        for hour in range(0, 24, 24 // HR_SAMPLES_PER_DAY):
+            observations.append(("resting_heart_rate", f"{day} {hour:02d}:00:00", rng.randint(55, 80)))
+        observations.append(("steps", day, rng.randint(3000, 15000)))
+        observations.append(("total_sleep_hours", day, round(rng.uniform(5.0, 9.0), 2)))
+    return observations
+
+
+def rescan(conn, rule) -> int:
+    """Evaluate a rule from scratch: aggregate the metric's whole history, count the latest window."""
+    from rules import METRICS, OPERATORS
+    aggregation, _, _, query = METRICS[rule.metric]
+    rows = conn.execute(query, (rule.user_id, "0000-00-00")).fetchall()
+    if not rows:
+        return 0
+    values = {date.fromisoformat(day): total / count if aggregation == "mean" else total
+              for day, total, count in rows}
+    start = rule.window_start(max(values))
+    compare = OPERATORS[rule.op][0]
+    return sum(compare(value, rule.threshold) for day, value in values.items() if day >= start)
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_history(days: int, new_days: int, repeat: int, seed: int, today: datetime) -> dict:
+    """Time priming, per-observation ingest and full rescans on `days` of history."""
+    from rules import RuleEngine
+    from sharding import shard_router
+
+    path = ensure_database(days, 1, seed, today)
+    shard_router.configure(mode="single", default_path=str(path))
+
+    engine = RuleEngine()
+    started = time.perf_counter()
+    rules = [engine.add_rule(1, "bench", **spec) for spec in RULES]
+    prime_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for observation in new_observations(today.date(), new_days, seed):
+        started = time.perf_counter_ns()
+        engine.ingest(1, [observation])
+        timings.append((time.perf_counter_ns() - started) / 1000)
+
+    conn = shard_router.connect(1)
+    rescan_ms = {}
+    try:
+        for rule in rules:
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rescan(conn, rule)
+                runs.append((time.perf_counter() - started) * 1000)
+            rescan_ms[rule.metric] = round(statistics.median(runs), 3)
+    finally:
+        conn.close()
+    shard_router.close_all()
+
+    return {
+        "days": days,
+        "history_rows": round(days * rows_per_user_day()),
+        "prime_ms": round(prime_ms, 2),
+        "observations": len(timings),
+        "fired": engine.metrics()["fired"],
+        "incremental_us_median": round(statistics.median(timings), 2),
+        "incremental_us_p95": round(percentile(timings, 0.95), 2),
+        "rescan_ms": rescan_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental rule evaluation vs history length")
+    parser.add_argument("--days", default="30,365,1825,3650", help="Comma-separated history lengths")
+    parser.add_argument("--new-days", type=int, default=30, help="Days of new samples fed to the rules")
+    parser.add_argument("--repeat", type=int, default=5, help="Rescans timed per rule")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    results = [bench_history(int(days), args.new_days, args.repeat, args.seed, today)
+               for days in args.days.split(",")]
+
+    print(f"\n{'history':>8} {'rows':>9} {'prime ms':>9} {'ingest us p50':>14} {'p95':>8}   rescan ms per rule")
+    for result in results:
+        rescans = "  ".join(f"{metric}={ms:.2f}" for metric, ms in result["rescan_ms"].items())
+        print(f"{result['days']:>7}d {result['history_rows']:>9,} {result['prime_ms']:>9.2f} "
+              f"{result['incremental_us_median']:>14.2f} {result['incremental_us_p95']:>8.2f}   {rescans}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Serialization benchmark for chat history responses.
+
+Builds a channel history of N messages (default 1000) where assistant
+messages carry tool calls with 500-character results, then compares:
+
+  - stdlib:   jsonable_encoder + json.dumps (FastAPI's classic path)
+  - pydantic: MessageHistory.model_dump_json()
+  - orjson:   app.core.responses.dumps (ORJSONResponse)
+
+and reports bytes on the wire uncompressed, gzip and brotli (if installed).
+
+Usage:
+    python benchmarks/bench_serialization.py [--messages 1000] [--repeat 20] [--json out.json]
+"""
+import argparse
+import gzip
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.responses import dumps
+from app.models.schemas import Message, MessageHistory, ToolCall
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_history(count: int) -> MessageHistory:
+    """Build a history alternating user questions and tool-heavy answers"""
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    result = ("- 2024-01-01: 10,234 steps, 8.19 km, 2,310 calories, 74 active min\n" * 10)[:500]
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append(Message(
+                id=str(uuid.uuid4()), role="user",
+                content="How did I sleep and how active was I last week?",
+                timestamp=start + timedelta(minutes=i)
+            ))
+        else:
+            messages.append(Message(
+                id=str(uuid.uuid4()), role="assistant",
+                content="Here is your summary for last week. " * 8,
+                timestamp=start + timedelta(minutes=i),
+                tool_calls=[
+                    ToolCall(tool_name="daily_steps_tool", arguments={"days": 7}, result=result),
+                    ToolCall(tool_name="sleep_data_tool", arguments={"days": 7}, result=result),
+                ]
+            ))
+    return MessageHistory(channel_id=str(uuid.uuid4()), messages=messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000, help="Messages in the history")
+    parser.add_argument("--repeat", type=int, default=20, help="Serializations per timing")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    history = build_history(args.messages)
+    serializers = {
+        "stdlib": lambda: json.dumps(jsonable_encoder(history)).encode("utf-8"),
+        "pydantic": lambda: history.model_dump_json().encode("utf-8"),
+        "orjson": lambda: dumps(history),
+    }
+
+    results = []
+    for name, serialize in serializers.items():
+        body = serialize()
+        seconds = min(timeit.repeat(serialize, number=args.repeat, repeat=3)) / args.repeat
+        entry = {
+            "serializer": name,
+            "ms": round(seconds * 1000, 2),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=6)),
+        }
+        if brotli is not None:
+            entry["brotli_bytes"] = len(brotli.compress(body, quality=4))
+        results.append(entry)
+
+    print(f"History of {args.messages} messages\n")
+    print(f"{'serializer':<10} {'ms':>9} {'bytes':>10} {'gzip':>10} {'brotli':>10}")
+    for entry in results:
+        brotli_bytes = entry.get("brotli_bytes", "n/a")
+        print(f"{entry['serializer']:<10} {entry['ms']:>9.2f} {entry['bytes']:>10} "
+              f"{entry['gzip_bytes']:>10} {brotli_bytes:>10}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({"messages": args.messages, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Benchmark for the query functions in tools.py at production data scales.
+
+Generates seeded databases for every (days, users) combination, then times
+each public tool function (those returning str, discovered automatically):
+
+  - cold: first call in a fresh process, with the database file evicted from
+          the OS page cache where posix_fadvise is available (the schema is
+          brought up to date beforehand, as a running server already has)
+  - warm: median and p95 of repeated calls in the same process
+
+and records peak Python memory (tracemalloc) per call. Results can be written
+as JSON and compared against a stored baseline; the exit code is 1 when a
+function got slower than the threshold, so the script can gate CI.
+
+Databases are cached in benchmarks/.data and rebuilt when the seed, scale or
+date changes. Combinations above --max-rows are skipped (the full 5 years x
+10k users grid is ~260M rows); raise it to run them.
+
+Usage:
+    python benchmarks/bench_tools.py [--days 30,365,1825] [--users 1,100,10000]
+                                     [--repeat 20] [--seed 42] [--max-rows 5000000]
+                                     [--json out.json] [--baseline baseline.json] [--threshold 1.25]
+"""
+import argparse
+import inspect
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+sys.path.insert(0, str(PROJECT_ROOT))
+
+HR_SAMPLES_PER_DAY = 12  # Matches the sample database
+ACTIVITY_TYPES = ['Running', 'Cycling', 'Swimming', 'Walking', 'Yoga', 'Gym Workout']
+# Noise floor for regressions, so sub-millisecond jitter isn't reported
+MIN_REGRESSION_MS = 1.0
+
+
+def rows_per_user_day() -> float:
+    """Approximate rows written per user per day (daily, sleep, heart rate, activities)."""
+    return 2 + HR_SAMPLES_PER_DAY + 0.4
+
+
+def bench_calls(today: datetime) -> dict:
+    """Arguments for each tool function; functions not listed are called without arguments."""
+    day = lambda offset: (today - timedelta(days=offset)).strftime('%Y-%m-%d')
+    return {
+        "get_daily_steps": [{"days": 7}, {"date": day(1)}],
+        "get_sleep_data": [{"days": 7}, {"date": day(1)}],
+        "get_heart_rate_data": [{"date": day(1)}],
+        "get_activity_history": [{"days": 14}, {"activity_type": "Running"}],
+        "compare_periods": [{"period_days": 7, "periods": 2}, {"period_days": 30, "periods": 6}],
+        "search_data_by_date_range": [{"start_date": day(30), "end_date": day(0), "metric_type": "steps"},
+                                      {"start_date": day(30), "end_date": day(0), "metric_type": "sleep"}],
+        "get_dashboard": [{"start_date": day(6), "end_date": day(0)},
+                          {"start_date": day(89), "end_date": day(0)}],
+    }
+
+
+def tool_functions() -> dict:
+    """Public functions in tools.py that return text for the agent."""
+    import tools
+    return {
+        name: func for name, func in inspect.getmembers(tools, inspect.isfunction)
+        if func.__module__ == "tools" and not name.startswith("_")
+        and inspect.signature(func).return_annotation is str
+    }
+
+
+def build_database(path: Path, days: int, users: int, seed: int, today: datetime):
+    """Generate a seeded database with `days` of data for `users` users ending today."""
+    from database import init_schema
+
+    rng = random.Random(seed)
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(str(path))
+    # Bulk load without durability; the file is disposable
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    init_schema(conn)
+
+    conn.executemany("INSERT INTO users (user_id, name, age, gender, height_cm, weight_kg) VALUES (?, ?, ?, ?, ?, ?)",
+                     [(u, f"User {u}", rng.randint(18, 80), rng.choice(["Male", "Female"]),
+                       rng.randint(150, 200), rng.randint(50, 110)) for u in range(1, users + 1)])
+    conn.executemany("INSERT INTO devices (device_id, user_id, device_type, brand, model, purchase_date) "
+                     "VALUES (?, ?, 'Smartwatch', 'Apple', 'Apple Watch Series 9', '2024-01-15')",
+                     [(u, u) for u in range(1, users + 1)])
+
+    start = today - timedelta(days=days)
+    # One day at a time across all users, inserted in date order like a live system
+    for i in range(days):
+        current = start + timedelta(days=i)
+        date_str = current.strftime('%Y-%m-%d')
+        daily, sleep, heart, activities = [], [], [], []
+        for u in range(1, users + 1):
+            steps = rng.randint(5000, 15000)
+            daily.append((u, date_str, steps, round(steps * 0.0008, 2), rng.randint(1800, 2800),
+                          rng.randint(30, 120), rng.randint(5, 25)))
+            total = round(rng.uniform(6.0, 9.0), 2)
+            deep, rem = round(total * rng.uniform(0.15, 0.25), 2), round(total * rng.uniform(0.2, 0.3), 2)
+            sleep.append((u, date_str, total, deep, round(total - deep - rem - 0.3, 2), rem,
+                          round(total * 0.07, 2), rng.randint(60, 95)))
+            for hour in range(0, 24, 24 // HR_SAMPLES_PER_DAY):
+                heart.append((u, current.replace(hour=hour, minute=rng.randint(0, 59)).strftime('%Y-%m-%d %H:%M:%S'),
+                              rng.randint(60, 120), rng.randint(55, 65)))
+            if rng.random() < 0.4:
+                activity = rng.choice(ACTIVITY_TYPES)
+                activities.append((u, date_str, activity, rng.randint(20, 90), rng.randint(200, 800),
+                                   rng.randint(110, 150), rng.randint(150, 180),
+                                   round(rng.uniform(2, 15), 2) if activity in ('Running', 'Cycling', 'Walking') else 0))
+        conn.executemany("INSERT INTO daily_metrics (user_id, date, steps, distance_km, calories_burned, "
+                         "active_minutes, floors_climbed) VALUES (?, ?, ?, ?, ?, ?, ?)", daily)
+        conn.executemany("INSERT INTO sleep_data (user_id, date, total_sleep_hours, deep_sleep_hours, "
+                         "light_sleep_hours, rem_sleep_hours, awake_hours, sleep_score) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", sleep)
+        conn.executemany("INSERT INTO heart_rate (user_id, timestamp, heart_rate, resting_heart_rate) "
+                         "VALUES (?, ?, ?, ?)", heart)
+        conn.executemany("INSERT INTO activities (user_id, date, activity_type, duration_minutes, calories, "
+                         "average_heart_rate, max_heart_rate, distance_km) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         activities)
+    conn.execute("CREATE TABLE bench_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT INTO bench_meta VALUES ('anchor', ?)", (today.strftime('%Y-%m-%d'),))
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def ensure_database(days: int, users: int, seed: int, today: datetime) -> Path:
+    """Return a cached database for this scale, rebuilding it if it's stale."""
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"tools_{days}d_{users}u_seed{seed}.db"
+    if path.exists():
+        try:
+            conn = sqlite3.connect(str(path))
+            anchor = conn.execute("SELECT value FROM bench_meta WHERE key = 'anchor'").fetchone()[0]
+            conn.close()
+            if anchor == today.strftime('%Y-%m-%d'):
+                return path
+        except sqlite3.Error:
+            pass
+    started = time.perf_counter()
+    print(f"Generating {days} days x {users} users ...", end=" ", flush=True)
+    build_database(path, days, users, seed, today)
+    print(f"{time.perf_counter() - started:.1f}s, {path.stat().st_size / 1024 / 1024:.1f} MB")
+    return path
+
+
+def evict_page_cache(path: Path):
+    """Drop the database file from the OS page cache (Linux; no-op elsewhere)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def run_worker(db_path: str, name: str, kwargs: dict, repeat: int) -> dict:
+    """Time one call configuration in this (fresh) process."""
+    import tools
+    from sharding import shard_router
+    shard_router.configure(mode="single", default_path=db_path)
+    func = getattr(tools, name)
+    # The first connect runs init_schema (DDL and triggers); keep that out of the cold timing
+    shard_router.connect().close()
+
+    # Cold: first call after eviction, in a process that hasn't queried the data
+    evict_page_cache(Path(db_path))
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(**kwargs)
+    cold = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    warm = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(**kwargs)
+        warm.append(time.perf_counter() - started)
+    warm.sort()
+    return {
+        "cold_ms": round(cold * 1000, 3),
+        "warm_ms_median": round(statistics.median(warm) * 1000, 3),
+        "warm_ms_p95": round(warm[math.ceil(len(warm) * 0.95) - 1] * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def call_label(name: str, kwargs: dict) -> str:
+    return f"{name}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})"
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Return results whose warm median regressed beyond the threshold."""
+    # Keyed by configuration index rather than the call text, whose dates move every day
+    previous = {(r["scale"], r["function"], r["variant"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scale"], result["function"], result["variant"]))
+        if before is None:
+            continue
+        ratio = result["warm_ms_median"] / before["warm_ms_median"] if before["warm_ms_median"] else 1.0
+        result["baseline_warm_ms_median"] = before["warm_ms_median"]
+        result["ratio"] = round(ratio, 2)
+        if ratio > threshold and result["warm_ms_median"] - before["warm_ms_median"] > MIN_REGRESSION_MS:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", default="30,365,1825", help="Comma-separated history lengths in days")
+    parser.add_argument("--users", default="1,100,10000", help="Comma-separated user counts")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for generated data")
+    parser.add_argument("--repeat", type=int, default=20, help="Warm calls per function")
+    parser.add_argument("--max-rows", type=int, default=5_000_000, help="Skip scales generating more rows")
+    parser.add_argument("--only", help="Comma-separated tool functions to run (default: all)")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json result")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Warm-time ratio that counts as a regression")
+    parser.add_argument("--worker", nargs=3, metavar=("DB", "FUNCTION", "KWARGS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        db_path, name, kwargs = args.worker
+        print(json.dumps(run_worker(db_path, name, json.loads(kwargs), args.repeat)))
+        return
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    functions = tool_functions()
+    if args.only:
+        functions = {name: func for name, func in functions.items() if name in args.only.split(",")}
+    calls = bench_calls(today)
+
+    results = []
+    for days in map(int, args.days.split(",")):
+        for users in map(int, args.users.split(",")):
+            rows = int(days * users * rows_per_user_day())
+            scale = f"{days}d x {users}u"
+            if rows > args.max_rows:
+                print(f"Skipping {scale} (~{rows:,} rows > --max-rows {args.max_rows:,})")
+                continue
+            db_path = ensure_database(days, users, args.seed, today)
+            print(f"\n{scale} (~{rows:,} rows, {db_path.stat().st_size / 1024 / 1024:.1f} MB)")
+            print(f"{'call':<78} {'cold ms':>9} {'warm ms':>9} {'p95 ms':>9} {'peak KiB':>9}")
+            for name, func in sorted(functions.items()):
+                required = [p for p in inspect.signature(func).parameters.values()
+                            if p.default is inspect.Parameter.empty]
+                configurations = calls.get(name, [{}])
+                if required and name not in calls:
+                    print(f"{name:<78} skipped (needs arguments; add it to bench_calls)")
+                    continue
+                for variant, kwargs in enumerate(configurations):
+                    proc = subprocess.run(
+                        [sys.executable, __file__, "--repeat", str(args.repeat),
+                         "--worker", str(db_path), name, json.dumps(kwargs)],
+                        capture_output=True, text=True, cwd=PROJECT_ROOT)
+                    if proc.returncode != 0:
+                        print(f"{call_label(name, kwargs):<78} failed: {proc.stderr.strip().splitlines()[-1]}")
+                        continue
+                    timing = json.loads(proc.stdout.strip().splitlines()[-1])
+                    result = {"scale": scale, "days": days, "users": users, "rows": rows,
+                              "function": name, "variant": variant, "call": call_label(name, kwargs), **timing}
+                    results.append(result)
+                    print(f"{result['call'][:78]:<78} {timing['cold_ms']:>9.2f} {timing['warm_ms_median']:>9.2f} "
+                          f"{timing['warm_ms_p95']:>9.2f} {timing['peak_kib']:>9.1f}")
+
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold)
+        compared = [r for r in results if "ratio" in r]
+        print(f"\nBaseline comparison ({len(compared)} calls, threshold x{args.threshold}):")
+        for result in sorted(compared, key=lambda r: r["ratio"], reverse=True)[:10]:
+            flag = "REGRESSION" if result in regressions else ""
+            print(f"  {result['scale']:<14} {result['call'][:60]:<60} {result['baseline_warm_ms_median']:>8.2f} -> "
+                  f"{result['warm_ms_median']:>8.2f} ms (x{result['ratio']}) {flag}")
+        print(f"{len(regressions)} regression(s)")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({
+            "meta": {
+                "date": today.strftime('%Y-%m-%d'),
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }, indent=2))
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
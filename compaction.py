@@ -0,0 +1,174 @@
+"""
+Heart-rate retention and downsampling.
+
+Raw samples older than `raw_days` are folded into per-minute aggregates, and
+minute aggregates older than `minute_days` into per-hour aggregates
+(min/max/avg/count, plus resting HR). Work is done in small transactions so
+readers are never blocked for long, then freed pages are returned to the OS.
+
+Usage:
+    python compaction.py [--raw-days 30] [--minute-days 365]
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from database import init_schema
+from db_trace import connect
+from tools import get_db_path
+
+DEFAULT_BATCH_SIZE = 5000
+BATCH_PAUSE = 0.01  # Seconds between batches, so other connections get the write lock
+VACUUM_STEP_PAGES = 1000
+
+# Merge an aggregate row into an existing bucket (counts add, averages are count-weighted)
+_UPSERT = '''
+    INSERT INTO {target} (user_id, timestamp, min_hr, max_hr, avg_hr, hr_count, avg_resting, resting_count)
+    {select}
+    ON CONFLICT (user_id, timestamp) DO UPDATE SET
+        min_hr = MIN(COALESCE(min_hr, excluded.min_hr), COALESCE(excluded.min_hr, min_hr)),
+        max_hr = MAX(COALESCE(max_hr, excluded.max_hr), COALESCE(excluded.max_hr, max_hr)),
+        avg_hr = (COALESCE(avg_hr * hr_count, 0) + COALESCE(excluded.avg_hr * excluded.hr_count, 0))
+                 / NULLIF(hr_count + excluded.hr_count, 0),
+        hr_count = hr_count + excluded.hr_count,
+        avg_resting = (COALESCE(avg_resting * resting_count, 0)
+                       + COALESCE(excluded.avg_resting * excluded.resting_count, 0))
+                      / NULLIF(resting_count + excluded.resting_count, 0),
+        resting_count = resting_count + excluded.resting_count
+'''
+
+_RAW_TO_MINUTE = '''
+    SELECT user_id, substr(timestamp, 1, 16) || ':00', MIN(heart_rate), MAX(heart_rate),
+           AVG(heart_rate), COUNT(heart_rate), AVG(resting_heart_rate), COUNT(resting_heart_rate)
+    FROM heart_rate
+    WHERE rowid <= :last AND timestamp < :cutoff
+    GROUP BY user_id, substr(timestamp, 1, 16)
+'''
+
+_MINUTE_TO_HOUR = '''
+    SELECT user_id, substr(timestamp, 1, 13) || ':00:00', MIN(min_hr), MAX(max_hr),
+           SUM(avg_hr * hr_count) / NULLIF(SUM(hr_count), 0), SUM(hr_count),
+           SUM(avg_resting * resting_count) / NULLIF(SUM(resting_count), 0), SUM(resting_count)
+    FROM heart_rate_minute
+    WHERE rowid <= :last AND timestamp < :cutoff
+    GROUP BY user_id, substr(timestamp, 1, 13)
+'''
+
+
+def _fold(conn: sqlite3.Connection, source: str, target: str, select: str, cutoff: str,
+          batch_size: int) -> tuple:
+    """
+    Move rows older than `cutoff` from `source` into aggregates in `target`.
+
+    Each batch (the next `batch_size` qualifying rows by rowid) is aggregated,
+    merged and deleted in one short IMMEDIATE transaction.
+
+    Returns:
+        Tuple of (source rows removed, batches run)
+    """
+    removed = batches = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            last = conn.execute(
+                f"SELECT MAX(id) FROM (SELECT rowid AS id FROM {source} WHERE timestamp < ? ORDER BY rowid LIMIT ?)",
+                (cutoff, batch_size)).fetchone()[0]
+            if last is None:
+                conn.execute("COMMIT")
+                return removed, batches
+            params = {"last": last, "cutoff": cutoff}
+            conn.execute(_UPSERT.format(target=target, select=select), params)
+            removed += conn.execute(f"DELETE FROM {source} WHERE rowid <= :last AND timestamp < :cutoff",
+                                    params).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        batches += 1
+        time.sleep(BATCH_PAUSE)
+
+
+def _reclaim(conn: sqlite3.Connection) -> dict:
+    """Return free pages to the OS and report how many bytes were reclaimed."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    before = conn.execute("PRAGMA page_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # One-time conversion of an existing file to incremental auto-vacuum (full rewrite)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        mode = "vacuum"
+    else:
+        # Release free pages a step at a time instead of one long exclusive VACUUM
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            # executescript steps the pragma to completion (execute() frees a single page)
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+            time.sleep(BATCH_PAUSE)
+        mode = "incremental_vacuum"
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    after = conn.execute("PRAGMA page_count").fetchone()[0]
+    return {"mode": mode, "bytes_reclaimed": (before - after) * page_size, "db_bytes": after * page_size}
+
+
+def compact_heart_rate(raw_days: int = 30, minute_days: int = 365, batch_size: int = DEFAULT_BATCH_SIZE,
+                       db_path: Optional[str] = None, now: Optional[datetime] = None) -> dict:
+    """
+    Apply the heart-rate retention policy.
+
+    Args:
+        raw_days: Days of full-resolution samples to keep
+        minute_days: Days of per-minute aggregates to keep (older ones become hourly)
+        batch_size: Source rows per transaction
+        db_path: Database to compact (defaults to the project database)
+        now: Reference time for the cutoffs (defaults to the current time)
+
+    Returns:
+        Dictionary with rows folded per stage, batches, bytes reclaimed and elapsed seconds
+    """
+    started = time.perf_counter()
+    now = now or datetime.now()
+    raw_cutoff = (now - timedelta(days=raw_days)).strftime('%Y-%m-%d 00:00:00')
+    minute_cutoff = (now - timedelta(days=max(minute_days, raw_days))).strftime('%Y-%m-%d 00:00:00')
+
+    conn = connect(str(db_path or get_db_path()), isolation_level=None)
+    init_schema(conn)
+    # WAL lets readers keep reading while a batch is being written
+    conn.execute("PRAGMA journal_mode = WAL").fetchall()
+
+    raw_rows, raw_batches = _fold(conn, "heart_rate", "heart_rate_minute", _RAW_TO_MINUTE,
+                                  raw_cutoff, batch_size)
+    minute_rows, minute_batches = _fold(conn, "heart_rate_minute", "heart_rate_hour", _MINUTE_TO_HOUR,
+                                        minute_cutoff, batch_size)
+    report = {
+        "started_at": now.isoformat(timespec='seconds'),
+        "raw_cutoff": raw_cutoff,
+        "minute_cutoff": minute_cutoff,
+        "raw_rows_folded": raw_rows,
+        "minute_rows_folded": minute_rows,
+        "batches": raw_batches + minute_batches,
+        "bytes_reclaimed": 0,
+    }
+    if raw_rows or minute_rows or conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        report.update(_reclaim(conn))
+    conn.close()
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Downsample old heart-rate data and reclaim space")
+    parser.add_argument("--raw-days", type=int, default=30, help="Days of full-resolution samples to keep")
+    parser.add_argument("--minute-days", type=int, default=365, help="Days of per-minute aggregates to keep")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--db", help="Database path (defaults to the project wearables.db)")
+    args = parser.parse_args()
+
+    report = compact_heart_rate(args.raw_days, args.minute_days, args.batch_size, args.db)
+    print(f"Folded {report['raw_rows_folded']:,} raw samples into minutes and "
+          f"{report['minute_rows_folded']:,} minutes into hours in {report['batches']} batches")
+    print(f"Reclaimed {report['bytes_reclaimed'] / 1024 / 1024:.1f} MB in {report['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
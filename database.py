@@ -3,13 +3,23 @@ import sqlite3
 from datetime import datetime, timedelta
 import random
 
+# Tables whose contents determine tool answers; each has a write counter in table_versions
+VERSIONED_TABLES = ("users", "devices", "daily_metrics", "heart_rate", "heart_rate_minute", "heart_rate_hour",
+                    "sleep_data", "activities")
 
-def create_database():
-    """Create and populate the wearables database with sample data."""
-    conn = sqlite3.connect('wearables.db')
+
+def init_schema(conn: sqlite3.Connection):
+    """
+    Create all tables and indexes if they don't exist.
+    
+    Args:
+        conn: Open database connection
+    """
     cursor = conn.cursor()
     
-    # Create tables
+    # Lets compaction return freed pages to the OS incrementally (only takes effect on new files)
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             user_id INTEGER PRIMARY KEY,
@@ -88,6 +98,120 @@ def create_database():
         )
     ''')
     
+    # Downsampled heart rate written by compaction; timestamp is the bucket start
+    for table in ('heart_rate_minute', 'heart_rate_hour'):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                user_id INTEGER,
+                timestamp TEXT NOT NULL,
+                min_hr INTEGER,
+                max_hr INTEGER,
+                avg_hr REAL,
+                hr_count INTEGER NOT NULL,
+                avg_resting REAL,
+                resting_count INTEGER NOT NULL,
+                UNIQUE (user_id, timestamp),
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        ''')
+    
+    # Heart rate at every resolution; compaction moves data between the tables, so the
+    # branches never overlap. Averages are SUM(sum_hr) / SUM(hr_count).
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS heart_rate_samples AS
+        SELECT user_id, timestamp, heart_rate AS min_hr, heart_rate AS max_hr,
+               heart_rate * 1.0 AS sum_hr, heart_rate IS NOT NULL AS hr_count,
+               resting_heart_rate * 1.0 AS sum_resting, resting_heart_rate IS NOT NULL AS resting_count,
+               'raw' AS resolution
+        FROM heart_rate
+        UNION ALL
+        SELECT user_id, timestamp, min_hr, max_hr, avg_hr * hr_count, hr_count,
+               avg_resting * resting_count, resting_count, 'minute'
+        FROM heart_rate_minute
+        UNION ALL
+        SELECT user_id, timestamp, min_hr, max_hr, avg_hr * hr_count, hr_count,
+               avg_resting * resting_count, resting_count, 'hour'
+        FROM heart_rate_hour
+    ''')
+    
+    # Indexes for per-user date-range scans
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_metrics_user_date ON daily_metrics (user_id, date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_heart_rate_user_timestamp ON heart_rate (user_id, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sleep_data_user_date ON sleep_data (user_id, date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activities_user_date ON activities (user_id, date)')
+    
+    # Per-sample workout tracks, one row per activity with each channel packed as an array
+    # (float32, or float64 for coordinates); NULL when the file has no such channel
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS track_points (
+            activity_id INTEGER PRIMARY KEY,
+            source TEXT UNIQUE,
+            start_time TEXT NOT NULL,
+            sample_count INTEGER NOT NULL,
+            offsets BLOB NOT NULL,
+            heart_rate BLOB,
+            distance_m BLOB,
+            latitude BLOB,
+            longitude BLOB,
+            altitude BLOB,
+            FOREIGN KEY (activity_id) REFERENCES activities(activity_id)
+        )
+    ''')
+    
+    # Resumable import progress, one row per source file
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            user_id INTEGER,
+            records_done INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+    ''')
+    
+    # Write counters per data table, bumped by triggers on every insert, update and
+    # delete from any connection; caches key on them to notice changed answers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in VERSIONED_TABLES:
+        cursor.execute('INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+    
+    # Running per-day totals of an unfinished import; the stored day is replaced by
+    # its total, so re-importing or resuming a source never adds the same records twice
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_day_totals (
+            source TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            table_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            amount REAL NOT NULL,
+            PRIMARY KEY (source, user_id, table_name, date, column_name)
+        )
+    ''')
+    
+    conn.commit()
+
+
+def create_database():
+    """Create and populate the wearables database with sample data."""
+    conn = sqlite3.connect('wearables.db')
+    cursor = conn.cursor()
+    
+    # Create tables
+    init_schema(conn)
+    
     # Insert sample user
     cursor.execute('''
         INSERT OR REPLACE INTO users (user_id, name, age, gender, height_cm, weight_kg)
@@ -0,0 +1,288 @@
+"""
+Query tracing for the database layer.
+
+`connect()` is the connection factory used by the tools. While tracing is
+disabled it returns a plain sqlite3 connection, so the only cost is one
+attribute check. When enabled, every statement is timed (execute plus
+fetches), its rows are counted and stats are aggregated per statement.
+Statements slower than the threshold are logged along with their
+EXPLAIN QUERY PLAN. Optionally, sqlite3's trace callback echoes every
+statement SQLite runs and a progress handler counts virtual-machine steps.
+
+Tracing can be switched on without the API via environment variables:
+    QUERY_TRACE=1 SLOW_QUERY_MS=50 python main.py
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_SLOW_QUERY_MS = 100.0
+SLOW_LOG_SIZE = 100
+MAX_STATEMENT_LENGTH = 500  # Characters of SQL kept in stats keys and the slow log
+
+
+def _normalize(sql: str) -> str:
+    """Collapse whitespace so the same statement always maps to the same key."""
+    return re.sub(r"\s+", " ", sql).strip()[:MAX_STATEMENT_LENGTH]
+
+
+class _TracedCursor(sqlite3.Cursor):
+    """Cursor that times execute and fetch calls and counts fetched rows."""
+
+    _record = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self.connection._progress_steps = 0
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record = [sql, parameters, time.perf_counter() - started, 0]
+            self.connection._open_cursors.add(self)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self.connection._progress_steps = 0
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record = [sql, None, time.perf_counter() - started, 0]
+            self._finish()
+
+    def _fetched(self, started: float, rows: int):
+        if self._record is not None:
+            self._record[2] += time.perf_counter() - started
+            self._record[3] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        self._fetched(started, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _finish(self):
+        """Report the statement this cursor last ran (once)."""
+        record, self._record = self._record, None
+        if record is None:
+            return
+        self.connection._open_cursors.discard(self)
+        sql, parameters, elapsed, rows = record
+        if rows == 0 and self.rowcount > 0:
+            rows = self.rowcount  # Rows changed by DML
+        query_tracer.record(self.connection, sql, parameters, elapsed, rows, self.connection._progress_steps)
+
+
+class _TracedConnection(sqlite3.Connection):
+    """Connection whose cursors are traced."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._open_cursors = set()
+        self._progress_steps = 0
+
+    def cursor(self, factory=_TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def finish_statements(self):
+        """Report statements whose results were only partly fetched."""
+        for cursor in list(self._open_cursors):
+            cursor._finish()
+
+    def close(self):
+        self.finish_statements()
+        super().close()
+
+
+class QueryTracer:
+    """
+    Per-statement timing, row counts and a slow-query log.
+
+    Stats are keyed on the normalized SQL text, so the parameterized queries
+    in tools.py aggregate across calls.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("QUERY_TRACE", "").lower() in ("1", "true", "yes")
+        self.slow_query_ms = float(os.getenv("SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS))
+        self.trace_sql = False
+        self.progress_steps = 0
+        self.generation = 0  # Bumped when connections must be reopened to follow the settings
+        self._stats = {}
+        self._plans = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: Optional[bool] = None, slow_query_ms: Optional[float] = None,
+                  trace_sql: Optional[bool] = None, progress_steps: Optional[int] = None):
+        """
+        Change tracing settings.
+
+        Connections opened afterwards pick them up; pools compare `generation`
+        to reopen connections they already hold.
+
+        Args:
+            enabled: Time and aggregate every statement
+            slow_query_ms: Statements slower than this are logged with their query plan
+            trace_sql: Print every statement SQLite executes (sqlite3 trace callback)
+            progress_steps: Count SQLite VM steps in units of this many instructions (0 disables)
+        """
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_query_ms is not None:
+            self.slow_query_ms = slow_query_ms
+        if trace_sql is not None:
+            self.trace_sql = trace_sql
+        if progress_steps is not None:
+            self.progress_steps = progress_steps
+        if (enabled, trace_sql, progress_steps) != (None, None, None):
+            self.generation += 1
+
+    def connect(self, database: str, **kwargs) -> sqlite3.Connection:
+        """Open a connection, traced if tracing is enabled."""
+        if not self.enabled:
+            return sqlite3.connect(database, **kwargs)
+        conn = sqlite3.connect(database, factory=_TracedConnection, **kwargs)
+        if self.trace_sql:
+            conn.set_trace_callback(lambda statement: print(f"[sql] {statement}"))
+        if self.progress_steps:
+            def count_steps():
+                conn._progress_steps += 1
+                return 0  # Non-zero would abort the statement
+            conn.set_progress_handler(count_steps, self.progress_steps)
+        return conn
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters, elapsed: float, rows: int, steps: int):
+        """Add one statement execution to the stats (and the slow log if it was slow)."""
+        key = _normalize(sql)
+        ms = elapsed * 1000
+        slow = ms >= self.slow_query_ms
+        plan = None
+        if slow and key not in self._plans:
+            plan = self._explain(conn, sql, parameters)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                            "slow_calls": 0, "vm_steps": 0}
+            stats["calls"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["rows"] += rows
+            stats["vm_steps"] += steps * self.progress_steps
+            if not slow:
+                return
+            stats["slow_calls"] += 1
+            if plan is not None:
+                self._plans[key] = plan
+            self._slow.append({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "sql": key,
+                "parameters": repr(parameters)[:200],
+                "ms": round(ms, 2),
+                "rows": rows,
+                "plan": self._plans.get(key),
+            })
+        print(f"Slow query ({ms:.1f} ms, {rows} rows): {key[:200]}")
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, parameters) -> Optional[list]:
+        """Capture EXPLAIN QUERY PLAN for a statement (None if it can't be explained)."""
+        if parameters is None or not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            return None
+        try:
+            # A plain cursor so explaining isn't itself traced
+            cursor = sqlite3.Cursor(conn)
+            rows = sqlite3.Cursor.execute(cursor, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            print(f"Error explaining slow query: {e}")
+            return None
+
+    def stats(self, limit: int = 50) -> dict:
+        """
+        Aggregated statement stats, slowest total time first.
+
+        Args:
+            limit: Maximum number of statements to return
+
+        Returns:
+            Dictionary with settings, per-statement stats and the slow-query log
+        """
+        with self._lock:
+            statements = [
+                {"sql": key, **stats, "total_ms": round(stats["total_ms"], 2), "max_ms": round(stats["max_ms"], 2),
+                 "avg_ms": round(stats["total_ms"] / stats["calls"], 3), "plan": self._plans.get(key)}
+                for key, stats in self._stats.items()
+            ]
+            slow = list(self._slow)
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "trace_sql": self.trace_sql,
+            "progress_steps": self.progress_steps,
+            "statements": statements[:limit],
+            "slow_queries": slow[::-1],
+        }
+
+    def reset(self):
+        """Clear collected stats and the slow-query log."""
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+            self._slow.clear()
+
+
+# Global tracer instance
+query_tracer = QueryTracer()
+
+
+def connect(database: str, **kwargs) -> sqlite3.Connection:
+    """Open a database connection through the global tracer."""
+    return query_tracer.connect(database, **kwargs)
+
+
+def finish_statements(conn: sqlite3.Connection):
+    """Report a traced connection's partly fetched statements (for pools, which don't close it)."""
+    if isinstance(conn, _TracedConnection):
+        conn.finish_statements()
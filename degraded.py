@@ -0,0 +1,122 @@
+"""
+Degraded mode: answer from local tool output when the model is slow or down.
+
+All the data lives in the local database, so a turn can still be answered
+without the LLM: the tools a question needs are predicted with the prefetch
+rules, run directly, and their output is wrapped in a per-tool template.
+The answers are plainer than the model's but arrive in milliseconds.
+"""
+import threading
+import time
+from datetime import date
+from typing import Optional
+
+from prefetch import predict_tool_calls
+from tools import (
+    compare_periods,
+    get_activity_history,
+    get_daily_steps,
+    get_device_info,
+    get_heart_rate_data,
+    get_sleep_data,
+    get_weekly_summary,
+)
+
+DEFAULT_MAX_TOOLS = 2
+# Used when the question matches no rule
+FALLBACK_TOOL = "weekly_summary_tool"
+
+
+def _detect_anomalies(**kwargs) -> str:
+    """detect_anomalies, importing analytics (and numpy) on first use rather than at startup."""
+    from analytics import detect_anomalies
+    return detect_anomalies(**kwargs)
+
+
+# Tool -> (function, template); the template gets the tool output as {result}
+TEMPLATES = {
+    "daily_steps_tool": (get_daily_steps, "Here are your step counts:\n\n{result}"),
+    "sleep_data_tool": (get_sleep_data, "Here is your sleep data:\n\n{result}"),
+    "heart_rate_tool": (get_heart_rate_data, "Here is your heart rate data:\n\n{result}"),
+    "activity_history_tool": (get_activity_history, "Here are your recent workouts:\n\n{result}"),
+    "weekly_summary_tool": (get_weekly_summary, "Here is your summary for the last 7 days:\n\n{result}"),
+    "period_comparison_tool": (compare_periods, "Here is how this period compares with the previous one:\n\n{result}"),
+    "device_info_tool": (get_device_info, "Here is your device and profile information:\n\n{result}"),
+    "anomaly_detection_tool": (_detect_anomalies, "Here is what stands out in your recent data:\n\n{result}"),
+}
+NOTICE = ("_The assistant is temporarily running in limited mode, so this answer comes straight "
+          "from your data without further analysis. Full answers will be back shortly._")
+
+
+class DegradedResponder:
+    """Builds templated answers from tool output and counts why they were needed"""
+
+    def __init__(self, max_tools: int = DEFAULT_MAX_TOOLS):
+        self.enabled = True
+        self.max_tools = max_tools
+        self._lock = threading.Lock()
+        self._reasons = {}
+        self.answers = 0
+        self.last_reason: Optional[str] = None
+        self._seconds = 0.0
+
+    def configure(self, enabled: Optional[bool] = None, max_tools: Optional[int] = None):
+        """Apply settings (e.g. from application settings)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if max_tools is not None:
+            self.max_tools = max(1, max_tools)
+
+    def answer(self, question: str, reason: str, user_id: int = 1, today: Optional[date] = None) -> tuple:
+        """
+        Answer a question from local tool output.
+
+        Args:
+            question: The user's message
+            reason: Why the model was skipped ("circuit_open", "timeout", "error", ...)
+            user_id: User whose data is read
+            today: The user's current date, for relative dates (defaults to server local)
+
+        Returns:
+            Tuple of (answer text, list of (tool name, arguments, tool output))
+        """
+        started = time.perf_counter()
+        predictions = [(name, args) for name, args in predict_tool_calls(question, today, len(TEMPLATES))
+                       if name in TEMPLATES][:self.max_tools] or [(FALLBACK_TOOL, {})]
+
+        sections, calls = [], []
+        for name, args in predictions:
+            function, template = TEMPLATES[name]
+            try:
+                result = function(**args, user_id=user_id)
+            except Exception as e:
+                print(f"Degraded answer: {name} failed: {e}")
+                continue
+            sections.append(template.format(result=result))
+            calls.append((name, args, result))
+
+        if not sections:
+            sections.append("Sorry, I can't reach your data right now. Please try again in a moment.")
+        text = "\n\n".join(sections + [NOTICE])
+
+        with self._lock:
+            self.answers += 1
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+            self.last_reason = reason
+            self._seconds += time.perf_counter() - started
+        return text, calls
+
+    def metrics(self) -> dict:
+        """Degraded answer counts by reason and their mean build time"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "answers": self.answers,
+                "by_reason": dict(self._reasons),
+                "last_reason": self.last_reason,
+                "build_ms_mean": round(self._seconds / self.answers * 1000, 1) if self.answers else 0.0,
+            }
+
+
+# Global degraded responder instance
+degraded_responder = DegradedResponder()
@@ -0,0 +1,130 @@
+"""In-process ring buffer of recent agent executions."""
+import math
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Number of recent executions kept in memory
+DEFAULT_BUFFER_SIZE = 500
+
+# Nodes that call a model
+LLM_NODES = ("agent", "respond")
+
+
+class ExecutionRecord:
+    """Timings collected while a single agent run is in flight."""
+
+    __slots__ = ("nodes", "tools")
+
+    def __init__(self):
+        self.nodes = []  # (node name, seconds) in execution order
+        self.tools = []  # tool names in call order
+
+    @property
+    def iterations(self) -> int:
+        """Number of agent (LLM) steps taken in this run."""
+        return sum(1 for name, _ in self.nodes if name in LLM_NODES)
+
+    def edges(self) -> list:
+        """Edges traversed in this run, including start and end."""
+        path = ["__start__"] + [name for name, _ in self.nodes] + ["__end__"]
+        return list(zip(path, path[1:]))
+
+
+_current_record: ContextVar[Optional[ExecutionRecord]] = ContextVar("current_execution_record", default=None)
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ExecutionStats:
+    """Collects per-node and per-edge statistics for recent agent runs."""
+
+    def __init__(self, maxlen: int = DEFAULT_BUFFER_SIZE):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        """Record the agent run executed inside this block."""
+        record = ExecutionRecord()
+        token = _current_record.set(record)
+        try:
+            yield record
+        finally:
+            _current_record.reset(token)
+            if record.nodes:
+                with self._lock:
+                    self._records.append(record)
+
+    def record_node(self, node: str, seconds: float):
+        """Record a node execution for the current run (no-op outside track())."""
+        record = _current_record.get()
+        if record is not None:
+            record.nodes.append((node, seconds))
+
+    def record_tool(self, tool_name: str):
+        """Record a tool call for the current run (no-op outside track())."""
+        record = _current_record.get()
+        if record is not None:
+            record.tools.append(tool_name)
+
+    def reset(self):
+        """Drop all recorded executions."""
+        with self._lock:
+            self._records.clear()
+
+    def snapshot(self, top_tools: int = 5) -> dict:
+        """
+        Aggregate the buffered executions.
+
+        Args:
+            top_tools: Number of most-used tools to include
+
+        Returns:
+            Dict with executions, nodes, edges, avg_iterations and top_tools
+        """
+        with self._lock:
+            records = list(self._records)
+
+        node_timings = {}
+        edge_counts = Counter()
+        tool_counts = Counter()
+        for record in records:
+            for name, seconds in record.nodes:
+                node_timings.setdefault(name, []).append(seconds)
+            edge_counts.update(record.edges())
+            tool_counts.update(record.tools)
+
+        nodes = {
+            name: {
+                "count": len(timings),
+                "mean_ms": round(sum(timings) / len(timings) * 1000, 1),
+                "p95_ms": round(percentile(timings, 95) * 1000, 1),
+                "total_ms": round(sum(timings) * 1000, 1),
+            }
+            for name, timings in node_timings.items()
+        }
+        edges = [
+            {"source": source, "target": target, "count": count}
+            for (source, target), count in edge_counts.most_common()
+        ]
+        avg_iterations = sum(r.iterations for r in records) / len(records) if records else 0.0
+
+        return {
+            "executions": len(records),
+            "nodes": nodes,
+            "edges": edges,
+            "avg_iterations": round(avg_iterations, 2),
+            "top_tools": [{"name": name, "count": count} for name, count in tool_counts.most_common(top_tools)],
+        }
+
+
+# Global execution stats instance
+execution_stats = ExecutionStats()
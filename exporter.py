@@ -0,0 +1,352 @@
+"""
+Streaming bulk export of wearables data.
+
+Any table (or the combined heart-rate view) can be exported for a user and an
+optional date range. Rows are read through one cursor in `fetchmany` chunks
+and each chunk is encoded and handed on before the next is read, so memory
+stays flat whatever the export size. Formats:
+
+    ndjson   one JSON object per row
+    csv      header line, then one line per row
+    parquet  columnar, one row group per chunk (needs pyarrow)
+    arrow    Arrow IPC stream, one record batch per chunk (needs pyarrow)
+
+Usage:
+    python exporter.py heart_rate [--format csv] [--start 2026-01-01] [--end 2026-03-31]
+                       [--user-id 1] [--output heart_rate.csv] [--db wearables.db]
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import sys
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is in requirements.txt; json is the fallback
+    orjson = None
+
+# pyarrow is optional and only parquet and arrow need it; it is imported by the
+# columnar encoder, so loading this module (and the server) does not pay for it
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+DEFAULT_CHUNK_ROWS = 5000
+RECENT_EXPORTS = 20
+
+# Exportable tables and views -> column the date range applies to (None = not dated).
+# Track points are left out: their channels are packed binary arrays.
+TABLES = {
+    "users": None,
+    "devices": None,
+    "daily_metrics": "date",
+    "sleep_data": "date",
+    "activities": "date",
+    "heart_rate": "timestamp",
+    "heart_rate_minute": "timestamp",
+    "heart_rate_hour": "timestamp",
+    "heart_rate_samples": "timestamp",
+}
+# Views are exported in storage order; sorting them would buffer the whole result
+VIEWS = {"heart_rate_samples"}
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+COLUMNAR_FORMATS = {"parquet", "arrow"}
+
+
+def validate(table: str, fmt: str, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    Check export parameters before anything is streamed.
+
+    Raises:
+        KeyError: Unknown table
+        ValueError: Unknown format, unparseable date or missing pyarrow
+    """
+    if table not in TABLES:
+        raise KeyError(f"Unknown table '{table}'; choose from {', '.join(TABLES)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; choose from {', '.join(FORMATS)}")
+    if fmt in COLUMNAR_FORMATS and not HAS_PYARROW:
+        raise ValueError(f"The {fmt} format needs pyarrow (pip install pyarrow)")
+    for value in (start_date, end_date):
+        if value:
+            date.fromisoformat(value)
+
+
+def build_query(table: str, user_id: int, start_date: Optional[str] = None,
+                end_date: Optional[str] = None) -> tuple:
+    """
+    SQL and parameters for one user's rows, optionally within an inclusive date range.
+
+    Dates and timestamps are ISO text, so the range is a plain comparison on
+    the (user_id, date) indexes: column >= start AND column < day after end.
+
+    Returns:
+        Tuple of (sql, params)
+    """
+    column = TABLES[table]
+    sql = f"SELECT * FROM {table} WHERE user_id = ?"
+    params = [user_id]
+    if column and start_date:
+        sql += f" AND {column} >= ?"
+        params.append(start_date)
+    if column and end_date:
+        sql += f" AND {column} < ?"
+        params.append((date.fromisoformat(end_date) + timedelta(days=1)).isoformat())
+    if column and table not in VIEWS:
+        sql += f" ORDER BY {column}"
+    return sql, params
+
+
+# --- encoders: (columns, column types, chunks of rows) -> bytes ----------------
+
+def _json_line(record: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _encode_ndjson(columns: list, types: list, chunks: Iterator[list]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(_json_line(dict(zip(columns, row))) for row in rows)
+
+
+def _encode_csv(columns: list, types: list, chunks: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # Header only (no rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _arrow_type(declared: str, values: list):
+    """Arrow type for a column from its declared SQLite type (SQLite affinity rules), else its values."""
+    import pyarrow as pa
+    declared = declared.upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(name in declared for name in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if "BLOB" in declared:
+        return pa.binary()
+    if any(name in declared for name in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    # Untyped (view expressions): the first chunk decides
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, int) for value in present):
+        return pa.int64()
+    if present and all(isinstance(value, (int, float)) for value in present):
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_column(values: list, type_):
+    import pyarrow as pa
+    try:
+        return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # SQLite columns are loosely typed (e.g. a fractional value in an INTEGER column)
+        return pa.array(values).cast(type_, safe=False)
+
+
+def _encode_columnar(fmt: str, columns: list, types: list, chunks: Iterator[list]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _Sink()
+    writer = schema = None
+    for rows in chunks:
+        values = [list(column) for column in zip(*rows)] or [[] for _ in columns]
+        if schema is None:
+            schema = pa.schema([(name, _arrow_type(declared, column))
+                                for name, declared, column in zip(columns, types, values)])
+            writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pa.ipc.new_stream(sink, schema)
+        batch = pa.record_batch([_arrow_column(column, field.type) for column, field in zip(values, schema)],
+                                schema=schema)
+        if fmt == "parquet":
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield sink.drain()
+    if writer is None:  # No rows: an empty file with the declared types
+        schema = pa.schema([(name, _arrow_type(declared, [])) for name, declared in zip(columns, types)])
+        writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pa.ipc.new_stream(sink, schema)
+    writer.close()
+    yield sink.drain()
+
+
+def _encoder(fmt: str):
+    if fmt == "ndjson":
+        return _encode_ndjson
+    if fmt == "csv":
+        return _encode_csv
+    return lambda columns, types, chunks: _encode_columnar(fmt, columns, types, chunks)
+
+
+class Exporter:
+    """Streams table exports and keeps throughput stats for recent ones"""
+
+    def __init__(self, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=RECENT_EXPORTS)
+        self._totals = {"exports": 0, "aborted": 0, "rows": 0, "bytes": 0}
+        self._active = 0
+
+    def stream(self, table: str, fmt: str = "ndjson", user_id: int = 1, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, chunk_rows: Optional[int] = None,
+               report: Optional[dict] = None) -> Iterator[bytes]:
+        """
+        Export rows as encoded chunks.
+
+        Args:
+            table: Table or view name (see TABLES)
+            fmt: Output format (see FORMATS)
+            user_id: User whose rows are exported
+            start_date: First day to include (YYYY-MM-DD), dated tables only
+            end_date: Last day to include (YYYY-MM-DD), dated tables only
+            chunk_rows: Rows fetched and encoded at a time
+            report: Optional dict filled with the export stats when it ends
+
+        Yields:
+            Encoded bytes, one piece per chunk of rows
+        """
+        validate(table, fmt, start_date, end_date)
+        from sharding import shard_router
+
+        sql, params = build_query(table, user_id, start_date, end_date)
+        chunk_rows = chunk_rows or self.chunk_rows
+        stats = {"table": table, "format": fmt, "user_id": user_id, "start_date": start_date,
+                 "end_date": end_date, "rows": 0, "bytes": 0, "completed": False}
+        started = time.perf_counter()
+        with self._lock:
+            self._active += 1
+
+        conn = shard_router.connect(user_id)
+        try:
+            types = [row[2] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+            cursor = conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+
+            def chunks():
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        return
+                    stats["rows"] += len(rows)
+                    yield rows
+
+            for data in _encoder(fmt)(columns, types, chunks()):
+                if data:
+                    stats["bytes"] += len(data)
+                    yield data
+            stats["completed"] = True
+        finally:
+            conn.close()
+            self._record(stats, time.perf_counter() - started)
+            if report is not None:
+                report.update(stats)
+
+    def _record(self, stats: dict, seconds: float):
+        stats["seconds"] = round(seconds, 3)
+        stats["rows_per_second"] = round(stats["rows"] / seconds) if seconds > 0 else 0
+        stats["mb_per_second"] = round(stats["bytes"] / seconds / 1024 / 1024, 2) if seconds > 0 else 0.0
+        with self._lock:
+            self._active -= 1
+            self._recent.append(dict(stats))
+            self._totals["exports"] += 1
+            self._totals["aborted"] += not stats["completed"]
+            self._totals["rows"] += stats["rows"]
+            self._totals["bytes"] += stats["bytes"]
+
+    def metrics(self) -> dict:
+        """Export totals, running exports and the most recent exports' throughput"""
+        with self._lock:
+            return {
+                "active": self._active,
+                **self._totals,
+                "recent": list(self._recent),
+            }
+
+
+# Global exporter instance
+exporter = Exporter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export wearables data as NDJSON, CSV, Parquet or Arrow")
+    parser.add_argument("table", choices=list(TABLES))
+    parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    parser.add_argument("--start", help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--output", help="Output file (defaults to stdout)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--db", help="Database path (defaults to the configured shard layout)")
+    args = parser.parse_args()
+
+    if args.db:
+        from sharding import shard_router
+        shard_router.configure(mode="single", default_path=args.db)
+
+    report = {}
+    try:
+        chunks = exporter.stream(args.table, args.format, args.user_id, args.start, args.end,
+                                 args.chunk_rows, report)
+        if args.output:
+            with open(args.output, "wb") as output:
+                for data in chunks:
+                    output.write(data)
+        else:
+            for data in chunks:
+                sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+    except (KeyError, ValueError) as e:
+        parser.error(str(e).strip("'\""))
+
+    print(f"{report['rows']:,} rows, {report['bytes'] / 1024 / 1024:.1f} MB in {report['seconds']}s "
+          f"({report['rows_per_second']:,} rows/s, {report['mb_per_second']} MB/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
  * GraphPanel Component - LangGraph visualization in sidebar
  */
 import { useEffect, useState } from 'react';
-import { X, RefreshCw } from 'lucide-react';
+import { X, RefreshCw, Activity } from 'lucide-react';
 import { graphAPI } from '../services/api';
 import mermaid from 'mermaid';
 import './GraphPanel.css';
@@ -26,13 +26,14 @@ function GraphPanel({ onClose }) {
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const [view, setView] = useState('diagram'); // 'diagram' or 'image'
+  const [showStats, setShowStats] = useState(false);
 
   const loadGraph = async () => {
     setIsLoading(true);
     setError(null);
     
     try {
-      const data = await graphAPI.getGraph();
+      const data = await graphAPI.getGraph(showStats);
       setGraphData(data);
       
       // Render mermaid diagram
@@ -64,7 +65,7 @@ function GraphPanel({ onClose }) {
 
   useEffect(() => {
     loadGraph();
-  }, []);
+  }, [showStats]);
 
   useEffect(() => {
     if (graphData?.mermaid && view === 'diagram') {
@@ -77,6 +78,13 @@ function GraphPanel({ onClose }) {
       <div className="graph-header">
         <h3>Workflow Graph</h3>
         <div className="graph-actions">
+          <button
+            className={`icon-btn ${showStats ? 'active' : ''}`}
+            onClick={() => setShowStats((prev) => !prev)}
+            title={showStats ? 'Hide runtime stats' : 'Show runtime stats'}
+          >
+            <Activity size={16} />
+          </button>
           <button
             className="icon-btn"
             onClick={loadGraph}
@@ -146,6 +154,43 @@ function GraphPanel({ onClose }) {
               </div>
             )}
 
+            {/* Runtime Stats */}
+            {graphData.stats && (
+              <div className="graph-stats">
+                <h4>Recent executions: {graphData.stats.executions}</h4>
+                <table>
+                  <thead>
+                    <tr>
+                      <th>Node</th>
+                      <th>Calls</th>
+                      <th>Mean</th>
+                      <th>p95</th>
+                    </tr>
+                  </thead>
+                  <tbody>
+                    {Object.entries(graphData.stats.nodes).map(([name, node]) => (
+                      <tr key={name}>
+                        <td>{name}</td>
+                        <td>{node.count}</td>
+                        <td>{Math.round(node.mean_ms)} ms</td>
+                        <td>{Math.round(node.p95_ms)} ms</td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+                <p>Avg. loop iterations: {graphData.stats.avg_iterations}</p>
+                {graphData.stats.top_tools.length > 0 && (
+                  <ul>
+                    {graphData.stats.top_tools.map((tool) => (
+                      <li key={tool.name}>
+                        <strong>{tool.name}</strong>: {tool.count} calls
+                      </li>
+                    ))}
+                  </ul>
+                )}
+              </div>
+            )}
+
             {/* Graph Info */}
             <div className="graph-info">
               <h4>How it works:</h4>
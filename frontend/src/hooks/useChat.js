@@ -1,13 +1,83 @@
 /**
  * Custom hooks for managing chat functionality
  */
-import { useState, useCallback } from 'react';
+import { useState, useCallback, useEffect, useRef } from 'react';
 import { chatAPI } from '../services/api';
+import { chatSocket } from '../services/socket';
+
+// Add a message unless one with the same id is already present
+const upsertMessage = (messages, message) => {
+  const index = messages.findIndex((msg) => msg.id === message.id);
+  if (index === -1) return [...messages, message];
+  const next = [...messages];
+  next[index] = message;
+  return next;
+};
 
 export const useChat = (channelId) => {
   const [messages, setMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
+  const pendingTurns = useRef(new Map()); // turn_id -> optimistic user message id
+
+  // Live updates for this channel, including turns started in other tabs
+  useEffect(() => {
+    if (!channelId) return undefined;
+
+    const handleEvent = (event) => {
+      const streamingId = `streaming-${event.turn_id}`;
+      const ownTurn = pendingTurns.current.has(event.turn_id);
+
+      switch (event.type) {
+        case 'user_message':
+          setMessages((prev) => {
+            // Replace our optimistic copy with the stored message
+            const optimisticId = pendingTurns.current.get(event.turn_id);
+            const withoutOptimistic = prev.filter((msg) => msg.id !== optimisticId);
+            return upsertMessage(withoutOptimistic, event.message);
+          });
+          break;
+
+        case 'token':
+          setMessages((prev) => {
+            const current = prev.find((msg) => msg.id === streamingId);
+            return upsertMessage(prev, {
+              id: streamingId,
+              role: 'assistant',
+              content: (current?.content || '') + event.content,
+              timestamp: new Date().toISOString(),
+            });
+          });
+          break;
+
+        case 'final':
+          setMessages((prev) => upsertMessage(
+            prev.filter((msg) => msg.id !== streamingId),
+            { ...event.message, tool_calls: event.tool_calls },
+          ));
+          if (ownTurn) {
+            pendingTurns.current.delete(event.turn_id);
+            setIsLoading(false);
+          }
+          break;
+
+        case 'error':
+          if (ownTurn) {
+            const optimisticId = pendingTurns.current.get(event.turn_id);
+            pendingTurns.current.delete(event.turn_id);
+            setMessages((prev) => prev.filter((msg) => msg.id !== optimisticId && msg.id !== streamingId));
+            setError(event.detail || 'Failed to send message');
+            setIsLoading(false);
+          }
+          break;
+
+        default:
+          break;
+      }
+    };
+
+    return chatSocket.subscribe(channelId, handleEvent);
+  }, [channelId]);
 
   const sendMessage = useCallback(async (content) => {
     if (!content.trim() || !channelId) return;
@@ -24,14 +94,20 @@ export const useChat = (channelId) => {
     };
     setMessages((prev) => [...prev, userMessage]);
 
+    // Prefer the WebSocket; the response arrives as events
+    const turnId = `turn-${userMessage.id}`;
+    pendingTurns.current.set(turnId, userMessage.id);
+    if (chatSocket.sendMessage(channelId, content, turnId)) return;
+    pendingTurns.current.delete(turnId);
+
     try {
       const response = await chatAPI.sendMessage(channelId, content);
-      
+
       // Add assistant message with tool calls
-      setMessages((prev) => [...prev, {
+      setMessages((prev) => upsertMessage(prev, {
         ...response.message,
         tool_calls: response.tool_calls,
-      }]);
+      }));
     } catch (err) {
       setError(err.message || 'Failed to send message');
       // Remove optimistic user message on error
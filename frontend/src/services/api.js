@@ -58,8 +58,8 @@ export const channelAPI = {
 
 // Graph API
 export const graphAPI = {
-  getGraph: async () => {
-    const response = await api.get('/graph/');
+  getGraph: async (stats = false) => {
+    const response = await api.get('/graph/', { params: { stats } });
     return response.data;
   },
 };
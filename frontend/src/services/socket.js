@@ -0,0 +1,93 @@
+/**
+ * Chat Socket - multiplexed WebSocket transport for chat channels
+ */
+
+const SOCKET_URL = `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}/api/v1/ws/chat`;
+const RECONNECT_DELAY_MS = 2000;
+
+class ChatSocket {
+  constructor() {
+    this.ws = null;
+    this.listeners = new Map(); // channelId -> Set of callbacks
+    this.reconnectTimer = null;
+  }
+
+  connect() {
+    if (this.ws && this.ws.readyState <= WebSocket.OPEN) return;
+
+    this.ws = new WebSocket(SOCKET_URL);
+
+    this.ws.onopen = () => {
+      // Re-subscribe to every channel someone is listening to
+      this.listeners.forEach((_, channelId) => {
+        this.send({ type: 'subscribe', channel_id: channelId });
+      });
+    };
+
+    this.ws.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+
+      // Acknowledge every event so the server keeps sending
+      if (data.seq) {
+        this.send({ type: 'ack', seq: data.seq });
+      }
+
+      const callbacks = this.listeners.get(data.channel_id);
+      if (callbacks) {
+        callbacks.forEach((callback) => callback(data));
+      }
+    };
+
+    this.ws.onclose = () => {
+      this.ws = null;
+      if (this.listeners.size > 0 && !this.reconnectTimer) {
+        this.reconnectTimer = setTimeout(() => {
+          this.reconnectTimer = null;
+          this.connect();
+        }, RECONNECT_DELAY_MS);
+      }
+    };
+  }
+
+  isOpen() {
+    return this.ws !== null && this.ws.readyState === WebSocket.OPEN;
+  }
+
+  send(frame) {
+    if (!this.isOpen()) return false;
+    this.ws.send(JSON.stringify(frame));
+    return true;
+  }
+
+  subscribe(channelId, callback) {
+    if (!this.listeners.has(channelId)) {
+      this.listeners.set(channelId, new Set());
+      this.send({ type: 'subscribe', channel_id: channelId });
+    }
+    this.listeners.get(channelId).add(callback);
+    this.connect();
+
+    return () => {
+      const callbacks = this.listeners.get(channelId);
+      if (!callbacks) return;
+      callbacks.delete(callback);
+      if (callbacks.size === 0) {
+        this.listeners.delete(channelId);
+        this.send({ type: 'unsubscribe', channel_id: channelId });
+      }
+    };
+  }
+
+  sendMessage(channelId, message, turnId) {
+    return this.send({
+      type: 'message',
+      channel_id: channelId,
+      message,
+      turn_id: turnId,
+    });
+  }
+}
+
+export const chatSocket = new ChatSocket();
+
+export default chatSocket;
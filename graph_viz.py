@@ -1,5 +1,6 @@
 """Utility functions for graph visualization."""
 import io
+import re
 from PIL import Image
 
 
@@ -41,3 +42,65 @@ def get_graph_mermaid(app):
         return app.get_graph().draw_mermaid()
     except Exception as e:
         return f"Error generating graph: {e}"
+
+
+# Heat classes applied to nodes by their share of total execution time
+HEAT_CLASSES = (
+    (0.5, "hot", "fill:#f87171,stroke:#b91c1c,color:#1f2937"),
+    (0.2, "warm", "fill:#fbbf24,stroke:#b45309,color:#1f2937"),
+    (0.0, "cool", "fill:#34d399,stroke:#047857,color:#1f2937"),
+)
+
+EDGE_PATTERN = re.compile(r"^(\s*)(\S+) (-->|-\.->|-\. (.*?) \.->) (\S+);$")
+
+
+def annotate_mermaid(mermaid, stats):
+    """
+    Overlay runtime statistics on a Mermaid diagram.
+    
+    Args:
+        mermaid: Mermaid diagram code as produced by get_graph_mermaid
+        stats: Execution statistics snapshot (see execution_stats.snapshot)
+    
+    Returns:
+        Mermaid code with per-node latency labels, heat styles and edge counts
+    """
+    nodes = stats.get("nodes", {})
+    if not nodes:
+        return mermaid
+    
+    edge_counts = {(e["source"], e["target"]): e["count"] for e in stats.get("edges", [])}
+    total_ms = sum(n["total_ms"] for n in nodes.values()) or 1.0
+    
+    # Label edges with traversal counts and scale their width
+    lines = []
+    link_styles = []
+    edge_index = 0
+    max_count = max(edge_counts.values(), default=1)
+    for line in mermaid.splitlines():
+        match = EDGE_PATTERN.match(line)
+        if match:
+            indent, source, arrow, label, target = match.groups()
+            count = edge_counts.get((source, target), 0)
+            label = label.replace("&nbsp;", "").strip() if label else ""
+            text = f"{label} · {count}x" if label else f"{count}x"
+            if arrow == "-->":
+                line = f'{indent}{source} -- "{text}" --> {target};'
+            else:
+                line = f'{indent}{source} -. "{text}" .-> {target};'
+            width = 1 + round(3 * count / max_count)
+            link_styles.append(f"\tlinkStyle {edge_index} stroke-width:{width}px")
+            edge_index += 1
+        lines.append(line)
+    
+    # Re-declare nodes with latency labels; the last declaration wins in Mermaid
+    for name, node in nodes.items():
+        lines.append(f'\t{name}("{name}<br/>{node["count"]} calls · '
+                     f'mean {node["mean_ms"]:.0f} ms · p95 {node["p95_ms"]:.0f} ms")')
+        share = node["total_ms"] / total_ms
+        heat = next(cls for threshold, cls, _ in HEAT_CLASSES if share >= threshold)
+        lines.append(f"\tclass {name} {heat}")
+    
+    lines.extend(f"\tclassDef {cls} {style}" for _, cls, style in HEAT_CLASSES)
+    lines.extend(link_styles)
+    return "\n".join(lines)
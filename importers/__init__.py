@@ -0,0 +1 @@
+"""Importers that load real device exports into the wearables database"""
@@ -0,0 +1,448 @@
+"""
+Streaming importer for Apple Health exports (export.xml or export.zip).
+
+The XML is parsed incrementally with iterparse and every top-level element
+is cleared once handled, so memory stays flat regardless of file size.
+Rows are written with executemany in batches; each batch commits together
+with a checkpoint, so an interrupted import resumes where it stopped.
+Importing an export again, or a newer export that overlaps it, adds nothing
+twice: stored samples and workouts are skipped and each day's totals replace
+the stored ones.
+
+Usage:
+    python -m importers.apple_health path/to/export.zip [--user-id 1] [--restart]
+"""
+import argparse
+import os
+import sqlite3
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from database import init_schema
+from db_trace import connect
+from sharding import shard_router
+
+HEART_RATE = "HKQuantityTypeIdentifierHeartRate"
+RESTING_HEART_RATE = "HKQuantityTypeIdentifierRestingHeartRate"
+SLEEP_ANALYSIS = "HKCategoryTypeIdentifierSleepAnalysis"
+
+# Quantity records summed per day into daily_metrics columns
+DAILY_QUANTITIES = {
+    "HKQuantityTypeIdentifierStepCount": "steps",
+    "HKQuantityTypeIdentifierDistanceWalkingRunning": "distance_km",
+    "HKQuantityTypeIdentifierActiveEnergyBurned": "calories_burned",
+    "HKQuantityTypeIdentifierAppleExerciseTime": "active_minutes",
+    "HKQuantityTypeIdentifierFlightsClimbed": "floors_climbed",
+}
+DAILY_COLUMNS = ("steps", "distance_km", "calories_burned", "active_minutes", "floors_climbed")
+
+# Sleep analysis values mapped to sleep_data columns (None = counted as asleep only)
+SLEEP_STAGES = {
+    "HKCategoryValueSleepAnalysisAsleepDeep": "deep_sleep_hours",
+    "HKCategoryValueSleepAnalysisAsleepCore": "light_sleep_hours",
+    "HKCategoryValueSleepAnalysisAsleepREM": "rem_sleep_hours",
+    "HKCategoryValueSleepAnalysisAsleepUnspecified": None,
+    "HKCategoryValueSleepAnalysisAsleep": None,
+    "HKCategoryValueSleepAnalysisAwake": "awake_hours",
+}
+SLEEP_COLUMNS = ("total_sleep_hours", "deep_sleep_hours", "light_sleep_hours", "rem_sleep_hours", "awake_hours")
+
+WORKOUT_TYPES = {
+    "Running": "Running",
+    "Cycling": "Cycling",
+    "Swimming": "Swimming",
+    "Walking": "Walking",
+    "Yoga": "Yoga",
+    "TraditionalStrengthTraining": "Gym Workout",
+    "FunctionalStrengthTraining": "Gym Workout",
+}
+
+# Unit conversions to the units stored in the database
+UNIT_FACTORS = {
+    "km": 1.0, "m": 0.001, "mi": 1.609344,
+    "kcal": 1.0, "Cal": 1.0, "kJ": 1 / 4.184,
+    "min": 1.0, "s": 1 / 60, "hr": 60.0,
+}
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _parse_time(value: str) -> datetime:
+    """Parse an Apple Health timestamp ('2024-01-01 08:00:00 -0800') as local wall-clock time."""
+    return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S')
+
+
+def _convert(value: Optional[str], unit: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    return float(value) * UNIT_FACTORS.get(unit, 1.0)
+
+
+def _workout_name(raw: str) -> str:
+    """'HKWorkoutActivityTypeHighIntensityIntervalTraining' -> 'High Intensity Interval Training'."""
+    name = raw.replace("HKWorkoutActivityType", "")
+    if name in WORKOUT_TYPES:
+        return WORKOUT_TYPES[name]
+    return "".join(f" {c}" if c.isupper() and i else c for i, c in enumerate(name)).strip() or "Workout"
+
+
+def _open_export(path: Path):
+    """Open export.xml directly or from inside an export.zip, streaming either way."""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        member = next((n for n in archive.namelist() if n.endswith("export.xml")), None)
+        if member is None:
+            raise ValueError(f"No export.xml found in {path}")
+        return archive.open(member)
+    return open(path, "rb")
+
+
+class _Batch:
+    """
+    Rows and per-day aggregates accumulated since the last flush.
+
+    After a flush, `heart_rate` and `activities` hold only the rows actually
+    inserted and `changes` the (column, day, delta) applied to daily rows.
+    """
+
+    def __init__(self):
+        self.heart_rate = []
+        self.activities = []
+        self.daily = {}  # date -> {column: sum}
+        self.sleep = {}  # date -> {column: hours}
+        self.changes = []
+        self.records = 0
+
+    def add_daily(self, day: str, column: str, amount: float):
+        totals = self.daily.setdefault(day, {})
+        totals[column] = totals.get(column, 0.0) + amount
+
+    def add_sleep(self, day: str, column: str, hours: float):
+        totals = self.sleep.setdefault(day, {})
+        totals[column] = totals.get(column, 0.0) + hours
+
+
+# Rows already stored are skipped, so importing an export again (or an export that
+# overlaps an earlier one) adds nothing. Heart rate inside a compacted bucket counts
+# as stored: compaction only folds in samples that were imported before.
+_NEW_ROWS = {
+    "heart_rate": (
+        "user_id, timestamp, heart_rate, resting_heart_rate",
+        '''EXISTS (SELECT 1 FROM main.heart_rate h
+                    WHERE h.user_id = i.user_id AND h.timestamp = i.timestamp
+                      AND h.heart_rate IS i.heart_rate AND h.resting_heart_rate IS i.resting_heart_rate)
+           OR EXISTS (SELECT 1 FROM heart_rate_minute m
+                      WHERE m.user_id = i.user_id AND m.timestamp = substr(i.timestamp, 1, 16) || ':00')
+           OR EXISTS (SELECT 1 FROM heart_rate_hour h
+                      WHERE h.user_id = i.user_id AND h.timestamp = substr(i.timestamp, 1, 13) || ':00:00')'''),
+    "activities": (
+        "user_id, date, activity_type, duration_minutes, calories, average_heart_rate, max_heart_rate, distance_km",
+        '''EXISTS (SELECT 1 FROM main.activities a
+                    WHERE a.user_id = i.user_id AND a.date = i.date AND a.activity_type = i.activity_type
+                      AND a.duration_minutes IS i.duration_minutes AND a.calories IS i.calories
+                      AND a.distance_km IS i.distance_km)'''),
+}
+
+
+def _insert_new(cursor, table: str, rows: list) -> list:
+    """
+    Insert the rows that are not stored yet, via a temp staging table.
+
+    Returns:
+        The rows inserted
+    """
+    if not rows:
+        return []
+    columns, stored = _NEW_ROWS[table]
+    staging = f"temp.incoming_{table}"
+    cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS incoming_{table} AS SELECT {columns} FROM main.{table} WHERE 0")
+    cursor.executemany(f"INSERT INTO {staging} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+    cursor.execute(f"DELETE FROM {staging} AS i WHERE {stored}")
+    new_rows = cursor.execute(f"SELECT * FROM {staging}").fetchall()
+    cursor.execute(f"INSERT INTO main.{table} ({columns}) SELECT * FROM {staging}")
+    cursor.execute(f"DELETE FROM {staging}")
+    return new_rows
+
+
+def _running_totals(cursor, source: str, user_id: int, table: str, totals: dict) -> dict:
+    """
+    Add a batch's per-day totals to the import's running totals.
+
+    Returns:
+        The running totals of the batch's days ({day: {column: total}})
+    """
+    cursor.executemany('''
+        INSERT INTO import_day_totals (source, user_id, table_name, date, column_name, amount)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source, user_id, table_name, date, column_name) DO UPDATE SET
+            amount = amount + excluded.amount
+    ''', [(source, user_id, table, day, column, amount)
+          for day, columns in totals.items() for column, amount in columns.items()])
+    running = {}
+    days = list(totals)
+    # Stay well under SQLite's bound-parameter limit
+    for i in range(0, len(days), 500):
+        chunk = days[i:i + 500]
+        cursor.execute(
+            "SELECT date, column_name, amount FROM import_day_totals "
+            f"WHERE source = ? AND user_id = ? AND table_name = ? AND date IN ({','.join('?' * len(chunk))})",
+            [source, user_id, table, *chunk])
+        for day, column, amount in cursor.fetchall():
+            running.setdefault(day, {})[column] = amount
+    return running
+
+
+def _merge_by_day(cursor, table: str, columns: tuple, user_id: int, totals: dict) -> tuple:
+    """
+    Set per-day totals on existing rows, inserting rows for new days.
+
+    Returns:
+        Tuple of (rows inserted, (column, day, delta) changes to the stored values)
+    """
+    if not totals:
+        return 0, []
+    days = list(totals)
+    existing = {}
+    for i in range(0, len(days), 500):
+        chunk = days[i:i + 500]
+        cursor.execute(
+            f"SELECT date, {', '.join(columns)} FROM {table} "
+            f"WHERE user_id = ? AND date IN ({','.join('?' * len(chunk))})",
+            [user_id, *chunk])
+        existing.update((row[0], dict(zip(columns, row[1:]))) for row in cursor.fetchall())
+
+    # Columns without new values (NULL parameter) keep their current value
+    assignments = ", ".join(f"{c} = COALESCE(?, {c})" for c in columns)
+    cursor.executemany(
+        f"UPDATE {table} SET {assignments} WHERE user_id = ? AND date = ?",
+        [(*(totals[d].get(c) for c in columns), user_id, d) for d in days if d in existing])
+    new_rows = [(user_id, d, *(totals[d].get(c) for c in columns)) for d in days if d not in existing]
+    cursor.executemany(
+        f"INSERT INTO {table} (user_id, date, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 2))})",
+        new_rows)
+    changes = [(column, day, amount - ((existing.get(day) or {}).get(column) or 0))
+               for day, values in totals.items() for column, amount in values.items()]
+    return len(new_rows), changes
+
+
+def _flush(conn: sqlite3.Connection, batch: _Batch, user_id: int, source: str,
+           records_done: int, inserted: dict, completed: bool = False):
+    """Write a batch and its checkpoint in a single transaction."""
+    cursor = conn.cursor()
+    with conn:
+        batch.heart_rate = _insert_new(cursor, "heart_rate", batch.heart_rate)
+        batch.activities = _insert_new(cursor, "activities", batch.activities)
+        for table, columns, totals in (("daily_metrics", DAILY_COLUMNS, batch.daily),
+                                       ("sleep_data", SLEEP_COLUMNS, batch.sleep)):
+            running = _running_totals(cursor, source, user_id, table, totals)
+            new_rows, changes = _merge_by_day(cursor, table, columns, user_id, running)
+            inserted[table] += new_rows
+            batch.changes.extend(changes)
+        if completed:
+            cursor.execute("DELETE FROM import_day_totals WHERE source = ? AND user_id = ?", (source, user_id))
+        cursor.execute('''
+            INSERT INTO import_checkpoints (source, user_id, records_done, completed, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET
+                records_done = excluded.records_done,
+                completed = excluded.completed,
+                updated_at = excluded.updated_at
+        ''', (source, user_id, records_done, int(completed), datetime.now().isoformat(timespec='seconds')))
+    inserted["heart_rate"] += len(batch.heart_rate)
+    inserted["activities"] += len(batch.activities)
+
+
+def _observations(batch: _Batch) -> list:
+    """(metric, day, amount) samples a flushed batch added, for rules evaluated on ingest."""
+    observations = []
+    for _, timestamp, heart_rate, resting in batch.heart_rate:
+        if heart_rate is not None:
+            observations.append(("heart_rate", timestamp, heart_rate))
+        if resting is not None:
+            observations.append(("resting_heart_rate", timestamp, resting))
+    observations.extend(change for change in batch.changes if change[2])
+    observations.extend(("workout_minutes", row[1], row[3]) for row in batch.activities)
+    return observations
+
+
+def _handle_record(elem: ET.Element, batch: _Batch, user_id: int):
+    """Map one <Record> onto the pending batch."""
+    record_type = elem.get("type")
+    if record_type == HEART_RATE or record_type == RESTING_HEART_RATE:
+        timestamp = elem.get("startDate", "")[:19]
+        value = round(float(elem.get("value")))
+        row = (user_id, timestamp, value, None) if record_type == HEART_RATE else (user_id, timestamp, None, value)
+        batch.heart_rate.append(row)
+    elif record_type in DAILY_QUANTITIES:
+        amount = _convert(elem.get("value"), elem.get("unit"))
+        batch.add_daily(elem.get("startDate", "")[:10], DAILY_QUANTITIES[record_type], amount)
+    elif record_type == SLEEP_ANALYSIS:
+        value = elem.get("value")
+        if value not in SLEEP_STAGES:
+            return  # InBed intervals overlap the stage intervals
+        start, end = _parse_time(elem.get("startDate")), _parse_time(elem.get("endDate"))
+        hours = (end - start).total_seconds() / 3600
+        night = end.strftime('%Y-%m-%d')  # Attribute sleep to the morning it ends
+        stage = SLEEP_STAGES[value]
+        if stage != "awake_hours":
+            batch.add_sleep(night, "total_sleep_hours", hours)
+        if stage:
+            batch.add_sleep(night, stage, hours)
+
+
+def _handle_workout(elem: ET.Element, batch: _Batch, user_id: int):
+    """Map one <Workout> (and its statistics children) onto the pending batch."""
+    duration = _convert(elem.get("duration"), elem.get("durationUnit"))
+    distance = _convert(elem.get("totalDistance"), elem.get("totalDistanceUnit"))
+    calories = _convert(elem.get("totalEnergyBurned"), elem.get("totalEnergyBurnedUnit"))
+    avg_hr = max_hr = None
+    # Newer exports carry totals and heart rate in WorkoutStatistics children
+    for stat in elem.iter("WorkoutStatistics"):
+        stat_type = stat.get("type")
+        if stat_type == HEART_RATE:
+            avg_hr = stat.get("average") and round(float(stat.get("average")))
+            max_hr = stat.get("maximum") and round(float(stat.get("maximum")))
+        elif stat_type == "HKQuantityTypeIdentifierActiveEnergyBurned" and calories is None:
+            calories = _convert(stat.get("sum"), stat.get("unit"))
+        elif stat_type in ("HKQuantityTypeIdentifierDistanceWalkingRunning",
+                           "HKQuantityTypeIdentifierDistanceCycling",
+                           "HKQuantityTypeIdentifierDistanceSwimming") and distance is None:
+            distance = _convert(stat.get("sum"), stat.get("unit"))
+    batch.activities.append((
+        user_id,
+        elem.get("startDate", "")[:10],
+        _workout_name(elem.get("workoutActivityType", "")),
+        round(duration) if duration is not None else None,
+        round(calories) if calories is not None else None,
+        avg_hr,
+        max_hr,
+        round(distance, 2) if distance is not None else 0,
+    ))
+
+
+def import_apple_health(path: str, user_id: int = 1, db_path: Optional[str] = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False,
+                        progress: Optional[Callable[[dict], None]] = None,
+                        observe: Optional[Callable[[list], None]] = None) -> dict:
+    """
+    Import an Apple Health export into the wearables database.
+
+    Args:
+        path: Path to export.xml or export.zip
+        user_id: User the data belongs to
+        db_path: Database to write to (defaults to the user's shard)
+        batch_size: Records per transaction/checkpoint
+        restart: Ignore any existing checkpoint and import from the start
+        progress: Called with the running stats after every batch
+        observe: Called with each committed batch's (metric, day, amount) samples
+
+    Returns:
+        Dictionary with records processed, rows inserted per table, elapsed
+        seconds and records/sec
+    """
+    path = Path(path)
+    # Identify the file by name and size so a different export doesn't reuse a checkpoint
+    source = f"apple_health:{path.name}:{os.path.getsize(path)}"
+    conn = connect(str(db_path or shard_router.path_for(user_id)))
+    init_schema(conn)
+
+    row = conn.execute("SELECT records_done, completed FROM import_checkpoints WHERE source = ?",
+                       (source,)).fetchone()
+    resume_from = 0 if restart or row is None else row[0]
+    if not resume_from:
+        # Totals left by an interrupted run would otherwise be counted again
+        with conn:
+            conn.execute("DELETE FROM import_day_totals WHERE source = ? AND user_id = ?", (source, user_id))
+    stats = {
+        "source": source,
+        "records": 0,
+        "resumed_from": resume_from,
+        "inserted": {"heart_rate": 0, "daily_metrics": 0, "sleep_data": 0, "activities": 0},
+        "seconds": 0.0,
+        "records_per_second": 0.0,
+        "completed": False,
+    }
+    if row is not None and row[1] and not restart:
+        conn.close()
+        stats.update(records=resume_from, completed=True)
+        return stats
+
+    started = time.perf_counter()
+    batch = _Batch()
+    seen = 0
+    depth = 0
+    root = None
+
+    def report():
+        stats["seconds"] = round(time.perf_counter() - started, 2)
+        stats["records_per_second"] = round(stats["records"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        if progress:
+            progress(stats)
+
+    with _open_export(path) as stream:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue  # Children are handled with their parent element
+
+            if elem.tag in ("Record", "Workout"):
+                seen += 1
+                if seen > resume_from:
+                    if elem.tag == "Record":
+                        _handle_record(elem, batch, user_id)
+                    else:
+                        _handle_workout(elem, batch, user_id)
+                    batch.records += 1
+                    if batch.records >= batch_size:
+                        _flush(conn, batch, user_id, source, seen, stats["inserted"])
+                        if observe:
+                            observe(_observations(batch))
+                        stats["records"] = seen
+                        batch = _Batch()
+                        report()
+            # Drop the handled element (and its children) from the tree
+            root.clear()
+
+    _flush(conn, batch, user_id, source, seen, stats["inserted"], completed=True)
+    if observe:
+        observe(_observations(batch))
+    conn.close()
+    stats["records"] = seen
+    stats["completed"] = True
+    report()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import an Apple Health export into wearables.db")
+    parser.add_argument("path", help="Path to export.xml or export.zip")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--db", help="Database path (defaults to the project wearables.db)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    def show(stats):
+        print(f"\r{stats['records']:,} records  {stats['records_per_second']:,.0f} rec/s", end="", flush=True)
+
+    stats = import_apple_health(args.path, args.user_id, args.db, args.batch_size, args.restart, progress=show)
+    print()
+    if stats["resumed_from"]:
+        print(f"Resumed after {stats['resumed_from']:,} records")
+    print(f"Imported {stats['records']:,} records in {stats['seconds']}s "
+          f"({stats['records_per_second']:,.0f} records/sec)")
+    for table, count in stats["inserted"].items():
+        print(f"  {table}: {count:,} new rows")
+
+
+if __name__ == "__main__":
+    main()
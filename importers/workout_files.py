@@ -0,0 +1,395 @@
+"""
+Importer for FIT, GPX and TCX workout files.
+
+Each file becomes one `activities` row (summary derived from the samples)
+plus one `track_points` row holding the per-sample series as packed arrays.
+Files are parsed in a process pool; the parent process is the only writer.
+
+Usage:
+    python -m importers.workout_files ride.fit run.gpx workouts/ [--user-id 1] [--workers 4]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from database import init_schema
+from db_trace import connect
+from sharding import shard_router
+
+try:
+    import fitparse
+except ImportError:
+    fitparse = None  # FIT support is optional; GPX and TCX need only the standard library
+
+SUPPORTED_SUFFIXES = (".fit", ".gpx", ".tcx")
+
+# Sport names from the file formats mapped onto the activity types used in the database
+SPORT_NAMES = {
+    "running": "Running",
+    "run": "Running",
+    "cycling": "Cycling",
+    "biking": "Cycling",
+    "ride": "Cycling",
+    "swimming": "Swimming",
+    "walking": "Walking",
+    "hiking": "Walking",
+    "yoga": "Yoga",
+    "training": "Gym Workout",
+}
+
+# Packed sample channels stored in track_points, with their array typecode
+CHANNELS = {
+    "offsets": "f",  # seconds since start
+    "heart_rate": "f",  # bpm
+    "distance_m": "f",  # cumulative metres
+    "latitude": "d",
+    "longitude": "d",
+    "altitude": "f",  # metres
+}
+
+FIT_SEMICIRCLES = 180.0 / 2 ** 31
+
+
+def _local_tag(elem: ET.Element) -> str:
+    """Tag name without its XML namespace."""
+    return elem.tag.rsplit("}", 1)[-1]
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp as naive local time (matching the rest of the database)."""
+    moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def _sport(name: Optional[str]) -> str:
+    if not name:
+        return "Workout"
+    return SPORT_NAMES.get(name.strip().lower(), name.strip().title())
+
+
+class _Samples:
+    """Per-sample channels collected into compact arrays while streaming."""
+
+    def __init__(self):
+        self.times = []
+        self.heart_rate = array("f")
+        self.distance_m = array("f")
+        self.latitude = array("d")
+        self.longitude = array("d")
+        self.altitude = array("f")
+
+    def add(self, moment: datetime, heart_rate=None, distance_m=None, latitude=None, longitude=None, altitude=None):
+        nan = float("nan")
+        self.times.append(moment)
+        self.heart_rate.append(nan if heart_rate is None else float(heart_rate))
+        self.distance_m.append(nan if distance_m is None else float(distance_m))
+        self.latitude.append(nan if latitude is None else float(latitude))
+        self.longitude.append(nan if longitude is None else float(longitude))
+        self.altitude.append(nan if altitude is None else float(altitude))
+
+
+def _parse_gpx(path: Path) -> dict:
+    samples, sport = _Samples(), None
+    point, segment = {}, None
+    for event, elem in ET.iterparse(str(path), events=("start", "end")):
+        tag = _local_tag(elem)
+        if event == "start":
+            if tag == "trkpt":
+                point = {"latitude": elem.get("lat"), "longitude": elem.get("lon")}
+            elif tag == "trkseg":
+                segment = elem
+            continue
+        if tag == "type" and sport is None:
+            sport = elem.text
+        elif tag == "ele":
+            point["altitude"] = elem.text
+        elif tag == "time":
+            point["time"] = elem.text
+        elif tag == "hr":
+            point["heart_rate"] = elem.text
+        elif tag == "trkpt":
+            if "time" in point:
+                samples.add(_parse_timestamp(point.pop("time")), **point)
+            # Drop handled points so memory doesn't grow with the track
+            segment.clear()
+    return {"sport": sport, "samples": samples, "calories": None}
+
+
+def _parse_tcx(path: Path) -> dict:
+    samples, sport, calories = _Samples(), None, 0
+    point, track = {}, None
+    for event, elem in ET.iterparse(str(path), events=("start", "end")):
+        tag = _local_tag(elem)
+        if event == "start":
+            if tag == "Activity":
+                sport = elem.get("Sport")
+            elif tag == "Trackpoint":
+                point = {}
+            elif tag == "Track":
+                track = elem
+            continue
+        if tag == "Time":
+            point["time"] = elem.text
+        elif tag == "LatitudeDegrees":
+            point["latitude"] = elem.text
+        elif tag == "LongitudeDegrees":
+            point["longitude"] = elem.text
+        elif tag == "AltitudeMeters":
+            point["altitude"] = elem.text
+        elif tag == "DistanceMeters" and "time" in point:
+            point["distance_m"] = elem.text
+        elif tag == "Value" and "time" in point:
+            point["heart_rate"] = elem.text  # HeartRateBpm/Value
+        elif tag == "Calories":
+            calories += int(float(elem.text))  # Per-lap totals
+        elif tag == "Trackpoint":
+            if "time" in point:
+                samples.add(_parse_timestamp(point.pop("time")), **point)
+            point = {}
+            # Drop handled points so memory doesn't grow with the track
+            track.clear()
+    return {"sport": sport, "samples": samples, "calories": calories or None}
+
+
+def _parse_fit(path: Path) -> dict:
+    if fitparse is None:
+        raise ImportError("FIT files need the optional 'fitparse' package (pip install fitparse)")
+    samples, sport, calories = _Samples(), None, None
+    fit = fitparse.FitFile(str(path))
+    for message in fit.get_messages(["record", "session", "sport"]):
+        values = message.get_values()
+        if message.name == "record":
+            if values.get("timestamp") is None:
+                continue
+            # FIT timestamps are UTC
+            moment = values["timestamp"].replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+            lat, lon = values.get("position_lat"), values.get("position_long")
+            samples.add(
+                moment,
+                heart_rate=values.get("heart_rate"),
+                distance_m=values.get("distance"),
+                latitude=lat * FIT_SEMICIRCLES if lat is not None else None,
+                longitude=lon * FIT_SEMICIRCLES if lon is not None else None,
+                altitude=values.get("enhanced_altitude", values.get("altitude")),
+            )
+        else:
+            sport = sport or values.get("sport")
+            calories = calories or values.get("total_calories")
+    return {"sport": sport, "samples": samples, "calories": calories}
+
+
+PARSERS = {".gpx": _parse_gpx, ".tcx": _parse_tcx, ".fit": _parse_fit}
+
+
+def _haversine_m(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Distances in metres between consecutive coordinates."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+    return 2 * 6371000.0 * np.arcsin(np.sqrt(a))
+
+
+def parse_workout_file(path: str) -> dict:
+    """
+    Parse one workout file into packed sample channels and a derived summary.
+
+    Runs in pool worker processes, so it only returns picklable data.
+
+    Args:
+        path: FIT, GPX or TCX file
+
+    Returns:
+        Dictionary with 'source' (content hash), 'start_time', 'summary'
+        (activities columns) and 'channels' (name -> packed bytes)
+    """
+    path = Path(path)
+    parsed = PARSERS[path.suffix.lower()](path)
+    samples = parsed["samples"]
+    if not samples.times:
+        raise ValueError(f"{path.name} contains no timestamped samples")
+
+    start = samples.times[0]
+    offsets = np.array([(t - start).total_seconds() for t in samples.times], dtype=np.float32)
+    heart_rate = np.frombuffer(samples.heart_rate, dtype=np.float32)
+    distance = np.frombuffer(samples.distance_m, dtype=np.float32).copy()
+    latitude = np.frombuffer(samples.latitude, dtype=np.float64)
+    longitude = np.frombuffer(samples.longitude, dtype=np.float64)
+    altitude = np.frombuffer(samples.altitude, dtype=np.float32)
+
+    # Derive cumulative distance from GPS when the file doesn't record it
+    has_gps = ~np.isnan(latitude) & ~np.isnan(longitude)
+    if np.isnan(distance).all() and has_gps.sum() > 1:
+        steps = np.zeros(len(distance), dtype=np.float64)
+        gps_index = np.flatnonzero(has_gps)
+        steps[gps_index[1:]] = _haversine_m(latitude[gps_index], longitude[gps_index])
+        distance = np.cumsum(steps).astype(np.float32)
+
+    has_hr = not np.isnan(heart_rate).all()
+    total_distance = float(np.nanmax(distance)) if not np.isnan(distance).all() else 0.0
+    summary = {
+        "date": start.strftime('%Y-%m-%d'),
+        "activity_type": _sport(parsed["sport"]),
+        "duration_minutes": int(round(float(offsets[-1]) / 60)),
+        "calories": parsed["calories"],
+        "average_heart_rate": int(round(float(np.nanmean(heart_rate)))) if has_hr else None,
+        "max_heart_rate": int(round(float(np.nanmax(heart_rate)))) if has_hr else None,
+        "distance_km": round(total_distance / 1000, 2),
+    }
+    channels = {
+        "offsets": offsets,
+        "heart_rate": heart_rate,
+        "distance_m": distance,
+        "latitude": latitude,
+        "longitude": longitude,
+        "altitude": altitude,
+    }
+    return {
+        "source": f"sha256:{hashlib.sha256(path.read_bytes()).hexdigest()}",
+        "start_time": start.strftime('%Y-%m-%d %H:%M:%S'),
+        "sample_count": len(offsets),
+        "summary": summary,
+        # Channels that are entirely missing are stored as NULL
+        "channels": {name: None if np.isnan(values).all() else values.astype(CHANNELS[name]).tobytes()
+                     for name, values in channels.items()},
+    }
+
+
+def load_track(conn: sqlite3.Connection, activity_id: int) -> Optional[dict]:
+    """
+    Load the packed sample channels of an activity as NumPy arrays.
+
+    Returns:
+        Dictionary of channel name -> array (None for missing channels) plus
+        'start_time', or None if the activity has no track
+    """
+    columns = ", ".join(CHANNELS)
+    row = conn.execute(f"SELECT start_time, {columns} FROM track_points WHERE activity_id = ?",
+                       (activity_id,)).fetchone()
+    if row is None:
+        return None
+    track = {"start_time": row[0]}
+    for (name, typecode), blob in zip(CHANNELS.items(), row[1:]):
+        dtype = np.float64 if typecode == "d" else np.float32
+        track[name] = np.frombuffer(blob, dtype=dtype) if blob is not None else None
+    return track
+
+
+def _store(conn: sqlite3.Connection, parsed: dict, user_id: int) -> Optional[int]:
+    """Insert a parsed workout; returns the new activity_id, or None if the user already imported it."""
+    # The same file under another name is a duplicate; the same file for another user is not
+    source = f"{user_id}:{parsed['source']}"
+    if conn.execute("SELECT 1 FROM track_points WHERE source = ?", (source,)).fetchone():
+        return None
+    summary = parsed["summary"]
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO activities (user_id, date, activity_type, duration_minutes, calories,
+                                    average_heart_rate, max_heart_rate, distance_km)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, summary["date"], summary["activity_type"], summary["duration_minutes"],
+              summary["calories"], summary["average_heart_rate"], summary["max_heart_rate"],
+              summary["distance_km"]))
+        activity_id = cursor.lastrowid
+        conn.execute(f'''
+            INSERT INTO track_points (activity_id, source, start_time, sample_count, {", ".join(CHANNELS)})
+            VALUES (?, ?, ?, ?, {", ".join("?" * len(CHANNELS))})
+        ''', (activity_id, source, parsed["start_time"], parsed["sample_count"],
+              *(parsed["channels"][name] for name in CHANNELS)))
+    return activity_id
+
+
+def _expand(paths: Iterable[str]) -> List[Path]:
+    """Expand directories into the supported workout files they contain."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in SUPPORTED_SUFFIXES))
+        else:
+            files.append(path)
+    return files
+
+
+def import_workout_files(paths: Iterable[str], user_id: int = 1, db_path: Optional[str] = None,
+                         workers: Optional[int] = None, observe: Optional[Callable[[list], None]] = None) -> dict:
+    """
+    Import workout files (or directories of them) in parallel.
+
+    Args:
+        paths: Files or directories
+        user_id: User the workouts belong to
+        db_path: Database to write to (defaults to the user's shard)
+        workers: Parser processes (defaults to the CPU count)
+        observe: Called with each stored workout's (metric, day, amount) samples
+
+    Returns:
+        Dictionary with imported/skipped/failed counts, samples stored,
+        elapsed seconds, files/sec and per-file errors
+    """
+    files = _expand(paths)
+    conn = connect(str(db_path or shard_router.path_for(user_id)))
+    init_schema(conn)
+    stats = {"files": len(files), "imported": 0, "skipped": 0, "failed": 0, "samples": 0,
+             "activity_ids": [], "errors": {}, "seconds": 0.0, "files_per_second": 0.0}
+    started = time.perf_counter()
+
+    # spawn: this also runs on server import threads, and forking a threaded process is unsafe
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [(path, pool.submit(parse_workout_file, str(path))) for path in files]
+        # Results are written in submission order by this process only
+        for path, future in futures:
+            try:
+                parsed = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                stats["errors"][path.name] = str(e)
+                continue
+            activity_id = _store(conn, parsed, user_id)
+            if activity_id is None:
+                stats["skipped"] += 1
+            else:
+                stats["imported"] += 1
+                stats["samples"] += parsed["sample_count"]
+                stats["activity_ids"].append(activity_id)
+                if observe:
+                    summary = parsed["summary"]
+                    observe([("workout_minutes", summary["date"], summary["duration_minutes"])])
+
+    conn.close()
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    stats["files_per_second"] = round(len(files) / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import FIT/GPX/TCX workout files into wearables.db")
+    parser.add_argument("paths", nargs="+", help="Workout files or directories")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--db", help="Database path (defaults to the project wearables.db)")
+    parser.add_argument("--workers", type=int, help="Parser processes (defaults to the CPU count)")
+    args = parser.parse_args()
+
+    stats = import_workout_files(args.paths, args.user_id, args.db, args.workers)
+    print(f"Imported {stats['imported']} of {stats['files']} files ({stats['samples']:,} samples) "
+          f"in {stats['seconds']}s ({stats['files_per_second']} files/sec)")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} already-imported files")
+    for name, error in stats["errors"].items():
+        print(f"Failed {name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
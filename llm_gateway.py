@@ -0,0 +1,381 @@
+"""Admission control for LLM calls: concurrency, rate limiting, fair queuing and retries."""
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from execution_stats import percentile
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when an LLM call cannot start before its deadline."""
+
+
+class CircuitOpen(AdmissionRejected):
+    """Raised when the circuit breaker is open and the provider is not being called."""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception is a provider rate-limit (HTTP 429) error."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError"
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read the Retry-After header from a rate-limit error, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket rate limiter; callers reserve a token and sleep until it is theirs."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve one token.
+
+        Args:
+            max_wait: Give up (without reserving) if the token is further away than this
+
+        Returns:
+            Seconds to wait before the token is available, or None if it exceeds max_wait
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def drain(self, seconds: float):
+        """Push all callers back by `seconds` (used after a provider 429)."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider.
+
+    After `failure_threshold` consecutive failures (errors, exhausted 429
+    retries, or calls slower than `slow_call_seconds`) the circuit opens and
+    calls fail fast. After `reset_seconds` one probe call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30.0,
+                 slow_call_seconds: Optional[float] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.short_circuited = 0
+        self.slow_calls = 0
+        self.last_failure: Optional[str] = None
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_seconds:
+                # One probe per reset window
+                self.state = self.HALF_OPEN
+                self._opened_at = now
+                return True
+            self.short_circuited += 1
+            return False
+
+    def is_open(self) -> bool:
+        """Whether calls would currently fail fast (does not claim the probe)."""
+        with self._lock:
+            return self.state != self.CLOSED and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def record_success(self, seconds: float):
+        """Record a completed call; slow calls count as failures."""
+        if self.slow_call_seconds and seconds > self.slow_call_seconds:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure(f"slow call ({seconds:.1f}s)")
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self, reason: str):
+        """Record a failed call, opening the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            self.last_failure = reason[:200]
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def metrics(self) -> dict:
+        """State, consecutive failures and trip counters."""
+        with self._lock:
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at)) \
+                if self.state != self.CLOSED else 0.0
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": round(retry_in, 1),
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+                "slow_calls": self.slow_calls,
+                "last_failure": self.last_failure,
+            }
+
+
+class _Ticket:
+    """A queued request for an LLM slot."""
+
+    __slots__ = ("key", "channel_id", "enqueued_at")
+
+    def __init__(self, key: tuple, channel_id: str):
+        self.key = key
+        self.channel_id = channel_id
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class LLMGateway:
+    """
+    Central gateway in front of the chat model.
+
+    - At most `max_concurrency` calls run at once.
+    - Calls start no faster than `requests_per_minute` (with `burst` headroom).
+    - Waiting calls are served by priority, then round-robin across channels,
+      so one busy channel cannot starve the others.
+    - Provider 429s are retried with full-jitter exponential backoff, and the
+      shared token bucket is drained so other callers back off too.
+    - A call whose expected queue wait exceeds its deadline is rejected
+      immediately with AdmissionRejected.
+    - A circuit breaker fails calls fast with CircuitOpen while the provider
+      keeps erroring or responding slowly.
+    """
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: float = 30, burst: int = 5,
+                 max_retries: int = 3, retry_base_delay: float = 0.5, retry_max_delay: float = 8.0):
+        self._cond = threading.Condition()
+        self._queue = []  # heap of _Ticket
+        self._seq = itertools.count()
+        self._channel_rounds = {}  # channel_id -> next virtual round
+        self._current_round = 0
+        self._in_flight = 0
+        self._wait_times = deque(maxlen=500)
+        self._service_times = deque(maxlen=100)
+        self._counters = {"admitted": 0, "rejected": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+        self.breaker = CircuitBreaker()
+        self.configure(max_concurrency, requests_per_minute, burst, max_retries, retry_base_delay, retry_max_delay)
+
+    def configure(self, max_concurrency: int = 4, requests_per_minute: float = 30, burst: int = 5,
+                  max_retries: int = 3, retry_base_delay: float = 0.5, retry_max_delay: float = 8.0,
+                  breaker_failures: Optional[int] = None, breaker_reset_seconds: Optional[float] = None,
+                  slow_call_seconds: Optional[float] = None):
+        """Apply limits (e.g. from application settings)."""
+        with self.breaker._lock:
+            if breaker_failures is not None:
+                self.breaker.failure_threshold = max(1, breaker_failures)
+            if breaker_reset_seconds is not None:
+                self.breaker.reset_seconds = breaker_reset_seconds
+            if slow_call_seconds is not None:
+                self.breaker.slow_call_seconds = slow_call_seconds or None
+        with self._cond:
+            self.max_concurrency = max(1, max_concurrency)
+            self.max_retries = max_retries
+            self.retry_base_delay = retry_base_delay
+            self.retry_max_delay = retry_max_delay
+            self.bucket = TokenBucket(requests_per_minute / 60.0, max(1, burst))
+            self._cond.notify_all()
+
+    def _estimated_wait(self) -> float:
+        """Rough queue wait for a new arrival, from recent service times."""
+        if self._in_flight < self.max_concurrency and not self._queue:
+            return 0.0
+        if not self._service_times:
+            return 0.0
+        mean_service = sum(self._service_times) / len(self._service_times)
+        return (len(self._queue) + 1) / self.max_concurrency * mean_service
+
+    def _acquire(self, channel_id: str, priority: int, deadline: Optional[float]):
+        """Wait for a concurrency slot in fair order."""
+        with self._cond:
+            now = time.monotonic()
+            if deadline is not None and now + self._estimated_wait() > deadline:
+                self._counters["rejected"] += 1
+                raise AdmissionRejected("LLM queue wait would exceed the request deadline")
+
+            # Start-time fair queuing: each channel's next request gets the next round
+            round_ = max(self._current_round, self._channel_rounds.get(channel_id, 0))
+            self._channel_rounds[channel_id] = round_ + 1
+            ticket = _Ticket((priority, round_, next(self._seq)), channel_id)
+            heapq.heappush(self._queue, ticket)
+
+            while not (self._queue[0] is ticket and self._in_flight < self.max_concurrency):
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._forget_if_idle(channel_id)
+                    self._counters["rejected"] += 1
+                    self._cond.notify_all()
+                    raise AdmissionRejected("Timed out waiting for an LLM slot")
+                self._cond.wait(timeout)
+
+            heapq.heappop(self._queue)
+            self._current_round = ticket.key[1]
+            self._forget_if_idle(channel_id)
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+            self._wait_times.append(time.monotonic() - ticket.enqueued_at)
+            self._cond.notify_all()
+
+    def _forget_if_idle(self, channel_id: str):
+        """Drop a channel's round once nothing of it is queued (it restarts at the current round)."""
+        if not any(waiting.channel_id == channel_id for waiting in self._queue):
+            self._channel_rounds.pop(channel_id, None)
+
+    def _release(self, service_time: float):
+        with self._cond:
+            self._in_flight -= 1
+            self._service_times.append(service_time)
+            self._cond.notify_all()
+
+    def _sleep(self, seconds: float, deadline: Optional[float], reason: str):
+        """Sleep, rejecting instead if the deadline would pass first."""
+        if deadline is not None and time.monotonic() + seconds > deadline:
+            with self._cond:
+                self._counters["rejected"] += 1
+            raise AdmissionRejected(reason)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def invoke(self, runnable, messages, channel_id: str = "default", priority: int = 0,
+               deadline: Optional[float] = None, **kwargs):
+        """
+        Invoke a LangChain runnable (e.g. llm_with_tools) under admission control.
+
+        Args:
+            runnable: Object with an invoke(messages) method
+            messages: Messages to send
+            channel_id: Channel the call belongs to, for fair queuing
+            priority: Lower values are served first
+            deadline: time.monotonic() value by which the call must start
+
+        Returns:
+            The runnable's response
+        
+        Raises:
+            CircuitOpen: The provider is failing and is not being called
+            AdmissionRejected: The call could not start before its deadline
+        """
+        if not self.breaker.allow():
+            with self._cond:
+                self._counters["rejected"] += 1
+            raise CircuitOpen("LLM provider is unavailable (circuit breaker open)")
+        self._acquire(channel_id, priority, deadline)
+        started = time.monotonic()
+        try:
+            for attempt in range(self.max_retries + 1):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                wait = self.bucket.reserve(max_wait=remaining)
+                if wait is None:
+                    with self._cond:
+                        self._counters["rejected"] += 1
+                    raise AdmissionRejected("LLM rate limit wait would exceed the request deadline")
+                self._sleep(wait, deadline, "LLM rate limit wait would exceed the request deadline")
+
+                call_started = time.monotonic()
+                try:
+                    response = runnable.invoke(messages, **kwargs)
+                except Exception as e:
+                    if not is_rate_limit_error(e):
+                        with self._cond:
+                            self._counters["failed"] += 1
+                        self.breaker.record_failure(f"{type(e).__name__}: {e}")
+                        raise
+                    with self._cond:
+                        self._counters["rate_limited"] += 1
+                    if attempt == self.max_retries:
+                        with self._cond:
+                            self._counters["failed"] += 1
+                        self.breaker.record_failure("rate limited after retries")
+                        raise
+                    backoff = _retry_after(e) or random.uniform(
+                        0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                    self.bucket.drain(backoff)
+                    with self._cond:
+                        self._counters["retries"] += 1
+                    self._sleep(backoff, deadline, "LLM retry backoff would exceed the request deadline")
+                else:
+                    self.breaker.record_success(time.monotonic() - call_started)
+                    return response
+        finally:
+            self._release(time.monotonic() - started)
+
+    def metrics(self) -> dict:
+        """Queue depth, in-flight calls, counters and queue wait times."""
+        with self._cond:
+            waits = list(self._wait_times)
+            per_channel = {}
+            for ticket in self._queue:
+                per_channel[ticket.channel_id] = per_channel.get(ticket.channel_id, 0) + 1
+            return {
+                "queue_depth": len(self._queue),
+                "queue_depth_by_channel": per_channel,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "requests_per_minute": round(self.bucket.rate * 60, 2),
+                **self._counters,
+                "wait_ms_mean": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "wait_ms_p95": round(percentile(waits, 95) * 1000, 1) if waits else 0.0,
+                "circuit": self.breaker.metrics(),
+            }
+
+
+# Global LLM gateway instance
+llm_gateway = LLMGateway()
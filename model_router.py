@@ -0,0 +1,109 @@
+"""
+Model tiers for the agent: a small fast model picks tools, a large model writes answers.
+
+The router tier runs every agent step. If it asks for tools, the calls are
+validated against the tool schemas before they run; invalid calls fall back
+to the response tier for that step. When the router decides no (more) tools
+are needed, its text is discarded and the response tier writes the answer.
+"""
+import threading
+import time
+from collections import deque
+from typing import List
+
+from pydantic import ValidationError
+
+from execution_stats import percentile
+
+ROUTER = "router"
+RESPONSE = "response"
+
+
+def validate_tool_calls(message, tool_map: dict) -> List[str]:
+    """
+    Check a model message's tool calls against the tool schemas.
+
+    Args:
+        message: AI message with tool_calls
+        tool_map: Tool name -> LangChain tool
+
+    Returns:
+        List of problems (empty if every call is valid)
+    """
+    errors = []
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        name = tool_call.get("name")
+        tool = tool_map.get(name)
+        if tool is None:
+            errors.append(f"unknown tool '{name}'")
+            continue
+        args = tool_call.get("args")
+        if not isinstance(args, dict):
+            errors.append(f"{name}: arguments are not an object")
+            continue
+        schema = getattr(tool, "tool_call_schema", None)
+        if schema is None or not hasattr(schema, "model_validate"):
+            continue
+        try:
+            schema.model_validate(args)
+        except ValidationError as e:
+            errors.append(f"{name}: {e.error_count()} invalid argument(s)")
+    for invalid in getattr(message, "invalid_tool_calls", None) or []:
+        errors.append(f"{invalid.get('name')}: unparseable arguments")
+    return errors
+
+
+class TierStats:
+    """Per-tier call counts and latencies, plus router fallbacks"""
+
+    def __init__(self, maxlen: int = 500):
+        self._latencies = {ROUTER: deque(maxlen=maxlen), RESPONSE: deque(maxlen=maxlen)}
+        self._calls = {ROUTER: 0, RESPONSE: 0}
+        self._errors = {ROUTER: 0, RESPONSE: 0}
+        self.models = {ROUTER: None, RESPONSE: None}
+        self.fallbacks = 0
+        self.last_fallback_reason = None
+        self._lock = threading.Lock()
+
+    def timed(self, tier: str, call):
+        """Run call() and record its latency under a tier"""
+        started = time.perf_counter()
+        try:
+            return call()
+        except Exception:
+            with self._lock:
+                self._errors[tier] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls[tier] += 1
+                self._latencies[tier].append(time.perf_counter() - started)
+
+    def record_fallback(self, reasons: List[str]):
+        """Record a router step redone by the response tier"""
+        with self._lock:
+            self.fallbacks += 1
+            self.last_fallback_reason = "; ".join(reasons)[:300]
+
+    def metrics(self) -> dict:
+        """Calls, errors and latency (mean/p95) per tier"""
+        with self._lock:
+            tiers = {}
+            for tier, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                tiers[tier] = {
+                    "model": self.models[tier],
+                    "calls": self._calls[tier],
+                    "errors": self._errors[tier],
+                    "latency_ms_mean": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+                    "latency_ms_p95": round(percentile(ordered, 95) * 1000, 1) if ordered else 0.0,
+                }
+            return {
+                **tiers,
+                "fallbacks": self.fallbacks,
+                "last_fallback_reason": self.last_fallback_reason,
+            }
+
+
+# Global tier stats instance
+tier_stats = TierStats()
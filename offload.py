@@ -0,0 +1,195 @@
+"""
+Process pool for CPU-heavy tool functions.
+
+Correlations, anomaly scoring and workout analysis are numpy work over long
+histories. Run in a request thread, they hold the GIL and slow every other
+request. Tools marked CPU-heavy hand their function to this pool instead.
+
+Workers read the data themselves: the caller sends the user's database file
+path (not rows or arrays), and each worker keeps a pooled connection to that
+file with SQLite memory-mapped I/O, so pages are shared with other processes
+through the OS page cache. Only the arguments and the result text are pickled.
+
+The pool has a bounded queue (calls beyond it are rejected immediately) and a
+per-task timeout enforced inside the worker, so a runaway analysis can't hold
+a worker forever.
+"""
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_TIMEOUT = 30.0
+# Extra time the caller waits beyond the worker-side timeout before giving up
+TIMEOUT_GRACE = 2.0
+MMAP_BYTES = 256 * 1024 * 1024
+
+
+class OffloadRejected(RuntimeError):
+    """Raised when the process pool queue is full."""
+
+
+# --- worker side -----------------------------------------------------------
+
+_worker_path: Optional[str] = None
+
+
+def _use_database(path: str):
+    """Point this worker's shard router at a database file (memory-mapped reads)."""
+    global _worker_path
+    if path == _worker_path:
+        return
+    from sharding import shard_router
+    shard_router.configure(mode="single", default_path=path, max_connections=1)
+    conn = shard_router.connect()
+    conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+    conn.close()
+    _worker_path = path
+
+
+def _on_alarm(signum, frame):
+    raise TimeoutError("analysis took too long")
+
+
+def _execute(function, path: str, args: tuple, kwargs: dict, timeout: float):
+    """Run one task in a worker process, interrupted after `timeout` seconds."""
+    _use_database(path)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# --- caller side -----------------------------------------------------------
+
+class ProcessOffloader:
+    """Bounded process pool running tool functions against the user's database file"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max(1, workers + max_queue))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {"submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "failed": 0}
+        self._seconds = 0.0
+
+    def configure(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                  timeout: Optional[float] = None):
+        """Apply settings (e.g. from application settings); a running pool is replaced."""
+        if workers is not None:
+            self.workers = max(0, workers)
+        if max_queue is not None:
+            self.max_queue = max(0, max_queue)
+        if timeout is not None:
+            self.timeout = timeout
+        self.shutdown()
+        self._slots = threading.BoundedSemaphore(max(1, self.workers + self.max_queue))
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded server process is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def run(self, function, *args, user_id: int = 1, **kwargs):
+        """
+        Call function(*args, user_id=user_id, **kwargs) in the process pool.
+
+        Args:
+            function: Module-level tool function (pickled by reference)
+            user_id: User whose database file the worker reads
+
+        Returns:
+            The function's result
+
+        Raises:
+            OffloadRejected: The pool queue is full
+            TimeoutError: The task ran longer than the timeout
+        """
+        if self.workers == 0:
+            return function(*args, user_id=user_id, **kwargs)
+
+        from sharding import shard_router
+        path = str(shard_router.path_for(user_id))
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise OffloadRejected("Analytics workers are busy, try again shortly")
+
+        started = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+            self._counters["submitted"] += 1
+        try:
+            future = self._pool().submit(_execute, function, path, args, {**kwargs, "user_id": user_id},
+                                         self.timeout)
+        except Exception:
+            self._done(slots)
+            raise
+        future.add_done_callback(lambda _: self._done(slots))
+
+        try:
+            result = future.result(timeout=self.timeout + TIMEOUT_GRACE)
+        except (TimeoutError, FutureTimeout):
+            self._count("timeouts")
+            raise TimeoutError(f"Analysis exceeded {self.timeout:g}s")
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            self._count("failed")
+            self.shutdown()
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        with self._lock:
+            self._counters["completed"] += 1
+            self._seconds += time.perf_counter() - started
+        return result
+
+    def _done(self, slots: threading.BoundedSemaphore):
+        with self._lock:
+            self._pending -= 1
+        slots.release()
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def shutdown(self):
+        """Stop the worker processes (a new pool starts on the next call)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        """Pool size, queued/running tasks and outcome counters"""
+        with self._lock:
+            completed = self._counters["completed"]
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout,
+                "pending": self._pending,
+                **self._counters,
+                "task_ms_mean": round(self._seconds / completed * 1000, 1) if completed else 0.0,
+            }
+
+
+# Global process offloader instance
+process_pool = ProcessOffloader()
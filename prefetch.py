@@ -0,0 +1,225 @@
+"""
+Speculative tool prefetch.
+
+The first model call of a turn mostly decides which tool to call. While it
+runs, the tools the question most likely needs are predicted from keywords
+and date expressions and executed in a thread pool. If the model then asks
+for a predicted call (same tool, same arguments after filling defaults), the
+precomputed result is used and the tool latency is off the critical path.
+Predictions the model doesn't use are counted as wasted work.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Optional
+
+from temporal import resolve
+
+DEFAULT_MAX_PREDICTIONS = 2
+DEFAULT_WORKERS = 4
+
+# (pattern, tool name, whether a single-day date expression becomes the 'date' argument)
+RULES = [
+    (r"\b(weekly|week summary|this week|overview|summary)\b", "weekly_summary_tool", False),
+    (r"\b(compare|comparison|vs|versus|last week)\b", "period_comparison_tool", False),
+    (r"\b(unusual|anomal\w*|weird|abnormal|outliers?)\b", "anomaly_detection_tool", False),
+    (r"\b(steps?|walk(ed|ing)?)\b", "daily_steps_tool", True),
+    (r"\b(sleep\w*|slept|rem|deep sleep)\b", "sleep_data_tool", True),
+    (r"\b(heart ?rate|hr|bpm|pulse|resting)\b", "heart_rate_tool", True),
+    (r"\b(workouts?|activit(y|ies)|exercis\w*|runs?|running|cycling|swim\w*|gym)\b", "activity_history_tool", False),
+    (r"\b(device|watch|tracker|profile)\b", "device_info_tool", False),
+]
+_RULES = [(re.compile(pattern, re.IGNORECASE), tool, dated) for pattern, tool, dated in RULES]
+
+_ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+
+
+def resolve_day(message: str, today: Optional[date] = None) -> Optional[str]:
+    """Single day a message refers to (YYYY-MM-DD), or None."""
+    match = _ISO_DATE.search(message)
+    if match:
+        return match.group(1)
+    for found in resolve(message, today or date.today()):
+        if found.day:
+            return found.start.isoformat()
+    return None
+
+
+def predict_tool_calls(message: str, today: Optional[date] = None,
+                       max_predictions: int = DEFAULT_MAX_PREDICTIONS) -> list:
+    """
+    Predict the tool calls a question will need.
+
+    Args:
+        message: User message
+        today: Reference date for relative expressions (defaults to today)
+        max_predictions: Upper bound on predicted calls (bounds wasted work)
+
+    Returns:
+        List of (tool name, arguments) in rule order
+    """
+    day = resolve_day(message, today)
+    predictions = []
+    for pattern, tool, dated in _RULES:
+        if len(predictions) >= max_predictions:
+            break
+        if pattern.search(message):
+            predictions.append((tool, {"date": day} if dated and day else {}))
+    return predictions
+
+
+def _normalize(tool, args: dict) -> tuple:
+    """Arguments with schema defaults filled in, as a hashable value."""
+    schema = getattr(tool, "args", None) or {}
+    return tuple(sorted((name, args.get(name, spec.get("default"))) for name, spec in schema.items()))
+
+
+class _Prediction:
+    __slots__ = ("tool_name", "key", "future", "seconds", "used")
+
+    def __init__(self, tool_name: str, key: tuple, future):
+        self.tool_name = tool_name
+        self.key = key
+        self.future = future
+        self.seconds = 0.0
+        self.used = False
+
+
+class PrefetchHandle:
+    """Predicted calls for one turn"""
+
+    def __init__(self, prefetcher: "ToolPrefetcher", predictions: list, tool_map: dict):
+        self._prefetcher = prefetcher
+        self._predictions = predictions
+        self._tool_map = tool_map
+
+    def take(self, tool_name: str, args: dict) -> Optional[str]:
+        """
+        Result of a matching prediction (waiting for it if still running), or None
+
+        A prediction is used at most once, and a prediction that raised is
+        treated as a miss so the caller runs the tool itself.
+        """
+        tool = self._tool_map.get(tool_name)
+        key = _normalize(tool, args) if tool is not None else None
+        for prediction in self._predictions:
+            if not prediction.used and prediction.tool_name == tool_name and prediction.key == key:
+                prediction.used = True
+                try:
+                    result = prediction.future.result()
+                except Exception:
+                    self._prefetcher._count("failed")
+                    return None
+                self._prefetcher._count("hits", saved=prediction.seconds)
+                return result
+        self._prefetcher._count("misses")
+        return None
+
+    def finish(self):
+        """Account for predictions the model never asked for"""
+        for prediction in self._predictions:
+            if prediction.used:
+                continue
+            if prediction.future.cancel():
+                self._prefetcher._count("cancelled")
+            else:
+                prediction.future.add_done_callback(
+                    lambda _, p=prediction: self._prefetcher._count("wasted", wasted=p.seconds))
+
+
+class ToolPrefetcher:
+    """
+    Runs predicted tool calls concurrently with the first model call.
+
+    Handles are keyed by the turn ID from the run config, so the agent node
+    that starts a prefetch and the tool node that consumes it don't need to
+    share any other state.
+    """
+
+    def __init__(self, max_predictions: int = DEFAULT_MAX_PREDICTIONS, workers: int = DEFAULT_WORKERS):
+        self.enabled = True
+        self.max_predictions = max_predictions
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._counters = {"turns": 0, "predictions": 0, "hits": 0, "misses": 0, "wasted": 0,
+                          "cancelled": 0, "failed": 0}
+        self._saved_seconds = 0.0
+        self._wasted_seconds = 0.0
+
+    def configure(self, enabled: Optional[bool] = None, max_predictions: Optional[int] = None):
+        """Apply settings (e.g. from application settings)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if max_predictions is not None:
+            self.max_predictions = max(0, max_predictions)
+
+    def start(self, turn_id: str, message: str, tool_map: dict, config: dict, today: Optional[date] = None):
+        """
+        Predict and start tool calls for a turn.
+
+        Args:
+            turn_id: Turn the predictions belong to
+            message: User message
+            tool_map: Tool name -> LangChain tool
+            config: Run config passed to the tools (carries the user)
+            today: The user's current date, for relative dates (defaults to server local)
+        """
+        if not self.enabled or not turn_id:
+            return
+        predictions = []
+        for tool_name, args in predict_tool_calls(message, today, max_predictions=self.max_predictions):
+            tool = tool_map.get(tool_name)
+            if tool is None:
+                continue
+            prediction = _Prediction(tool_name, _normalize(tool, args), None)
+            prediction.future = self._executor.submit(self._run, prediction, tool, args, config)
+            predictions.append(prediction)
+        with self._lock:
+            self._handles[turn_id] = PrefetchHandle(self, predictions, tool_map)
+            self._counters["turns"] += 1
+            self._counters["predictions"] += len(predictions)
+
+    @staticmethod
+    def _run(prediction: _Prediction, tool, args: dict, config: dict) -> str:
+        started = time.perf_counter()
+        try:
+            return str(tool.invoke(args, config))
+        finally:
+            prediction.seconds = time.perf_counter() - started
+
+    def handle(self, turn_id: str) -> Optional[PrefetchHandle]:
+        """Predictions for a turn, if any were started"""
+        with self._lock:
+            return self._handles.get(turn_id)
+
+    def finish(self, turn_id: str):
+        """End a turn: unused predictions are cancelled or counted as wasted."""
+        with self._lock:
+            handle = self._handles.pop(turn_id, None)
+        if handle is not None:
+            handle.finish()
+
+    def _count(self, counter: str, saved: float = 0.0, wasted: float = 0.0):
+        with self._lock:
+            self._counters[counter] += 1
+            self._saved_seconds += saved
+            self._wasted_seconds += wasted
+
+    def metrics(self) -> dict:
+        """Prediction counts, hit rate and time saved vs wasted"""
+        with self._lock:
+            predictions = self._counters["predictions"]
+            return {
+                "enabled": self.enabled,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / predictions, 3) if predictions else 0.0,
+                "saved_ms": round(self._saved_seconds * 1000, 1),
+                "wasted_ms": round(self._wasted_seconds * 1000, 1),
+            }
+
+
+# Global tool prefetcher instance
+tool_prefetcher = ToolPrefetcher()
@@ -0,0 +1,374 @@
+"""
+Goal and alert rules evaluated incrementally as data is ingested.
+
+A rule is a per-day condition on one metric and how often it must hold within
+a window, e.g.
+
+    resting_heart_rate > 70 on 3 of 3 days     ("above 70 for three days")
+    total_sleep_hours < 6 twice in the week    ("under 6h sleep twice this week")
+
+Instead of re-querying history for every rule and user, each rule keeps a
+small running aggregate. It is primed once from the database when the rule
+is created, then updated from the importers' observations:
+
+  - per metric, a running (sum, count) per day for the last MAX_WINDOW_DAYS
+    days gives the day's value (total or mean) in O(1) per sample;
+  - per rule, the set of qualifying days in the current window and their
+    count; a sample changes at most one day's flag, so the count moves by
+    at most one, and days leaving the window are dropped as it slides.
+
+Work per sample therefore depends on the window size, never on the length of
+history. A rule fires when its count reaches the required number of days and
+re-arms once it drops below again. Samples older than the current window are
+ignored, since they cannot change it.
+
+A day's total only grows while its samples arrive, so "<" and "<=" rules on
+totals would hold after the first few hundred steps of any day. Those rules
+are evaluated by flush() instead, once an import is complete, and only for
+days that are over; until then their days wait as pending.
+"""
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+MAX_WINDOW_DAYS = 31
+OPERATORS = {
+    ">": (lambda value, threshold: value > threshold, "above"),
+    ">=": (lambda value, threshold: value >= threshold, "at least"),
+    "<": (lambda value, threshold: value < threshold, "under"),
+    "<=": (lambda value, threshold: value <= threshold, "at most"),
+}
+
+# Metric -> (daily aggregation, label, unit, query for (day, sum, count) since a date).
+# Daily tables hold one row per day; heart rate is averaged over every resolution.
+METRICS = {
+    "steps": ("sum", "steps", "",
+              "SELECT date, steps, 1 FROM daily_metrics WHERE user_id = ? AND date >= ? AND steps IS NOT NULL"),
+    "distance_km": ("sum", "distance", " km",
+                    "SELECT date, distance_km, 1 FROM daily_metrics "
+                    "WHERE user_id = ? AND date >= ? AND distance_km IS NOT NULL"),
+    "calories_burned": ("sum", "calories burned", " kcal",
+                        "SELECT date, calories_burned, 1 FROM daily_metrics "
+                        "WHERE user_id = ? AND date >= ? AND calories_burned IS NOT NULL"),
+    "active_minutes": ("sum", "active minutes", " min",
+                       "SELECT date, active_minutes, 1 FROM daily_metrics "
+                       "WHERE user_id = ? AND date >= ? AND active_minutes IS NOT NULL"),
+    "floors_climbed": ("sum", "floors climbed", "",
+                       "SELECT date, floors_climbed, 1 FROM daily_metrics "
+                       "WHERE user_id = ? AND date >= ? AND floors_climbed IS NOT NULL"),
+    "total_sleep_hours": ("sum", "sleep", "h",
+                          "SELECT date, total_sleep_hours, 1 FROM sleep_data "
+                          "WHERE user_id = ? AND date >= ? AND total_sleep_hours IS NOT NULL"),
+    "deep_sleep_hours": ("sum", "deep sleep", "h",
+                         "SELECT date, deep_sleep_hours, 1 FROM sleep_data "
+                         "WHERE user_id = ? AND date >= ? AND deep_sleep_hours IS NOT NULL"),
+    "rem_sleep_hours": ("sum", "REM sleep", "h",
+                        "SELECT date, rem_sleep_hours, 1 FROM sleep_data "
+                        "WHERE user_id = ? AND date >= ? AND rem_sleep_hours IS NOT NULL"),
+    "heart_rate": ("mean", "average heart rate", " bpm",
+                   "SELECT substr(timestamp, 1, 10), SUM(sum_hr), SUM(hr_count) FROM heart_rate_samples "
+                   "WHERE user_id = ? AND timestamp >= ? GROUP BY 1 HAVING SUM(hr_count) > 0"),
+    "resting_heart_rate": ("mean", "resting heart rate", " bpm",
+                           "SELECT substr(timestamp, 1, 10), SUM(sum_resting), SUM(resting_count) "
+                           "FROM heart_rate_samples WHERE user_id = ? AND timestamp >= ? "
+                           "GROUP BY 1 HAVING SUM(resting_count) > 0"),
+    "workout_minutes": ("sum", "workout time", " min",
+                        "SELECT date, SUM(duration_minutes), COUNT(*) FROM activities "
+                        "WHERE user_id = ? AND date >= ? AND duration_minutes IS NOT NULL GROUP BY date"),
+}
+
+
+class Rule(NamedTuple):
+    """A condition on a metric's daily value that must hold on `times` days of a window"""
+    rule_id: str
+    user_id: int
+    channel_id: str  # Where events are posted
+    metric: str
+    op: str
+    threshold: float
+    times: int
+    window_days: int  # Rolling window ending at the newest day (ignored for calendar weeks)
+    calendar_week: bool = False  # Window is the newest day's Monday-Sunday week
+
+    def window_start(self, day: date) -> date:
+        if self.calendar_week:
+            return day - timedelta(days=day.weekday())
+        return day - timedelta(days=self.window_days - 1)
+
+    def describe(self) -> str:
+        """Human-readable condition, e.g. 'resting heart rate above 70 bpm for 3 days in a row'"""
+        _, label, unit, _ = METRICS[self.metric]
+        condition = f"{label} {OPERATORS[self.op][1]} {self.threshold:g}{unit}"
+        if self.calendar_week:
+            return f"{condition} on {self.times} days this week"
+        if self.times == self.window_days:
+            return f"{condition} for {self.times} days in a row" if self.times > 1 else f"{condition} for a day"
+        return f"{condition} on {self.times} of {self.window_days} days"
+
+
+class _Window:
+    """Qualifying days of one rule's current window"""
+    __slots__ = ("newest", "start", "flags", "count", "active")
+
+    def __init__(self):
+        self.newest: Optional[date] = None
+        self.start: Optional[date] = None
+        self.flags: Dict[date, bool] = {}
+        self.count = 0
+        self.active = False
+
+    def update(self, rule: Rule, day: date, value: float) -> bool:
+        """Apply a day's new value; returns whether the day is inside the window."""
+        if self.newest is None or day > self.newest:
+            self.newest = day
+            self.start = rule.window_start(day)
+            # Slide: drop days that left the window (at most the window size)
+            for old in [d for d in self.flags if d < self.start]:
+                self.count -= self.flags.pop(old)
+        elif day < self.start:
+            return False
+        qualifies = OPERATORS[rule.op][0](value, rule.threshold)
+        self.count += qualifies - self.flags.get(day, False)
+        self.flags[day] = qualifies
+        return True
+
+
+def _deferred(rule: Rule) -> bool:
+    """Whether a rule can only be judged on a complete day (an upper bound on a total)"""
+    return rule.op in ("<", "<=") and METRICS[rule.metric][0] == "sum"
+
+
+class RuleEngine:
+    """Rules, their incremental state and the events they fire"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rules: Dict[str, Rule] = {}
+        self._windows: Dict[str, _Window] = {}
+        self._days: Dict[tuple, Dict[date, list]] = {}  # (user_id, metric) -> day -> [sum, count]
+        self._by_metric: Dict[tuple, List[str]] = {}  # (user_id, metric) -> rule ids
+        self._pending: Dict[tuple, set] = {}  # (user_id, metric) -> days not yet given to deferred rules
+        self._counters = {"observations": 0, "ignored": 0, "late": 0, "fired": 0}
+        self._update_seconds = 0.0
+
+    def add_rule(self, user_id: int, channel_id: str, metric: str, op: str, threshold: float,
+                 times: int = 1, window_days: Optional[int] = None, calendar_week: bool = False) -> Rule:
+        """
+        Create a rule and prime it from the user's recent data.
+
+        Priming reads at most MAX_WINDOW_DAYS days once; a condition that
+        already holds does not fire until new data arrives after it lapses.
+
+        Args:
+            user_id: User whose data is watched
+            channel_id: Channel events are posted to
+            metric: Metric name (see METRICS)
+            op: Comparison with the threshold (>, >=, <, <=)
+            threshold: Value compared with each day's total or mean
+            times: Days the condition must hold within the window
+            window_days: Rolling window length (defaults to `times`, i.e. consecutive days)
+            calendar_week: Count days in the current Monday-Sunday week instead
+
+        Returns:
+            The new rule
+
+        Raises:
+            ValueError: Unknown metric or operator, or an impossible window
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'; choose from {', '.join(METRICS)}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}'; choose from {', '.join(OPERATORS)}")
+        window_days = 7 if calendar_week else (window_days or times)
+        if not 1 <= times <= window_days <= MAX_WINDOW_DAYS:
+            raise ValueError(f"Need 1 <= times <= window_days <= {MAX_WINDOW_DAYS}")
+
+        rule = Rule(str(uuid.uuid4()), user_id, channel_id, metric, op, float(threshold), times,
+                    window_days, calendar_week)
+        key = (user_id, metric)
+        with self._lock:
+            if key not in self._days:
+                self._days[key] = self._load_days(user_id, metric)
+            window = _Window()
+            aggregation = METRICS[metric][0]
+            today = date.today()
+            for day in sorted(self._days[key]):
+                if _deferred(rule) and day >= today:
+                    self._pending.setdefault(key, set()).add(day)
+                    continue
+                window.update(rule, day, self._value(aggregation, self._days[key][day]))
+            window.active = window.count >= rule.times
+            self.rules[rule.rule_id] = rule
+            self._windows[rule.rule_id] = window
+            self._by_metric.setdefault(key, []).append(rule.rule_id)
+        return rule
+
+    @staticmethod
+    def _load_days(user_id: int, metric: str) -> Dict[date, list]:
+        """Daily (sum, count) for the last MAX_WINDOW_DAYS days, from the user's database."""
+        from sharding import shard_router
+        since = (date.today() - timedelta(days=MAX_WINDOW_DAYS)).isoformat()
+        conn = shard_router.connect(user_id)
+        try:
+            rows = conn.execute(METRICS[metric][3], (user_id, since)).fetchall()
+        finally:
+            conn.close()
+        return {date.fromisoformat(day): [total, count] for day, total, count in rows}
+
+    @staticmethod
+    def _value(aggregation: str, totals: list) -> float:
+        return totals[0] / totals[1] if aggregation == "mean" else totals[0]
+
+    def remove_rule(self, rule_id: str) -> bool:
+        """Delete a rule (its metric's daily sums go once no rule uses them)."""
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            del self._windows[rule_id]
+            key = (rule.user_id, rule.metric)
+            self._by_metric[key].remove(rule_id)
+            if not self._by_metric[key]:
+                del self._by_metric[key]
+                del self._days[key]
+                self._pending.pop(key, None)
+            return True
+
+    def list_rules(self, user_id: Optional[int] = None) -> List[Rule]:
+        """All rules, or only a user's"""
+        with self._lock:
+            return [rule for rule in self.rules.values() if user_id is None or rule.user_id == user_id]
+
+    def status(self, rule_id: str) -> dict:
+        """Current window of a rule: qualifying days, newest day and whether it holds"""
+        with self._lock:
+            window = self._windows[rule_id]
+            return {
+                "qualifying_days": window.count,
+                "newest_day": window.newest.isoformat() if window.newest else None,
+                "active": window.active,
+            }
+
+    def ingest(self, user_id: int, observations: List[tuple]) -> List[dict]:
+        """
+        Fold newly stored samples into the rules and return the events that fired.
+
+        Args:
+            user_id: User the samples belong to
+            observations: (metric, day "YYYY-MM-DD", amount) tuples; amounts for
+                the same day add up (totals) or are averaged (means)
+
+        Returns:
+            Fired events: rule, day, the day's value, qualifying days and message
+        """
+        started = time.perf_counter()
+        events = []
+        ignored = late = 0
+        with self._lock:
+            cutoff = date.today() - timedelta(days=MAX_WINDOW_DAYS)
+            for metric, day, amount in observations:
+                key = (user_id, metric)
+                rule_ids = self._by_metric.get(key)
+                if not rule_ids or amount is None:
+                    ignored += 1
+                    continue
+                day = date.fromisoformat(day[:10])
+                if day < cutoff:
+                    late += 1
+                    continue
+
+                days = self._days[key]
+                totals = days.get(day)
+                if totals is None:
+                    totals = days[day] = [0.0, 0]
+                    if len(days) > 2 * MAX_WINDOW_DAYS:
+                        newest = max(days)
+                        for old in [d for d in days if d <= newest - timedelta(days=MAX_WINDOW_DAYS)]:
+                            del days[old]
+                totals[0] += amount
+                totals[1] += 1
+                value = self._value(METRICS[metric][0], totals)
+
+                for rule_id in rule_ids:
+                    rule = self.rules[rule_id]
+                    if _deferred(rule):
+                        self._pending.setdefault(key, set()).add(day)
+                    elif not self._apply(rule, day, value, events):
+                        late += 1
+
+            self._counters["observations"] += len(observations)
+            self._counters["ignored"] += ignored
+            self._counters["late"] += late
+            self._counters["fired"] += len(events)
+            self._update_seconds += time.perf_counter() - started
+        return events
+
+    def flush(self, user_id: int) -> List[dict]:
+        """
+        Evaluate deferred rules on the user's finished days and return the events that fired.
+
+        Call once an import's samples are all ingested. Days from today on stay
+        pending, since more samples can still arrive for them.
+
+        Returns:
+            Fired events, as from ingest()
+        """
+        events = []
+        with self._lock:
+            today = date.today()
+            for key, pending in self._pending.items():
+                if key[0] != user_id:
+                    continue
+                days = self._days[key]
+                for day in sorted(d for d in pending if d < today):
+                    pending.discard(day)
+                    if day not in days:
+                        continue  # Dropped from the window meanwhile
+                    value = self._value(METRICS[key[1]][0], days[day])
+                    for rule_id in self._by_metric[key]:
+                        if _deferred(self.rules[rule_id]):
+                            self._apply(self.rules[rule_id], day, value, events)
+            self._counters["fired"] += len(events)
+        return events
+
+    def _apply(self, rule: Rule, day: date, value: float, events: list) -> bool:
+        """Update a rule's window with a day's value, recording an event if it starts to hold."""
+        window = self._windows[rule.rule_id]
+        if not window.update(rule, day, value):
+            return False
+        holds = window.count >= rule.times
+        if holds and not window.active:
+            events.append(self._event(rule, window, day, value))
+        window.active = holds
+        return True
+
+    @staticmethod
+    def _event(rule: Rule, window: _Window, day: date, value: float) -> dict:
+        unit = METRICS[rule.metric][2]
+        return {
+            "rule_id": rule.rule_id,
+            "user_id": rule.user_id,
+            "channel_id": rule.channel_id,
+            "day": day.isoformat(),
+            "value": round(value, 2),
+            "qualifying_days": window.count,
+            "message": f"Alert: {rule.describe()} (latest: {value:.3g}{unit} on {day.isoformat()}).",
+        }
+
+    def metrics(self) -> dict:
+        """Rule count, observations folded in, events fired and mean cost per observation"""
+        with self._lock:
+            applied = self._counters["observations"] - self._counters["ignored"]
+            return {
+                "rules": len(self.rules),
+                "tracked_metrics": len(self._days),
+                "pending_days": sum(len(days) for days in self._pending.values()),
+                **self._counters,
+                "update_us_mean": round(self._update_seconds / applied * 1e6, 2) if applied > 0 else 0.0,
+            }
+
+
+# Global rule engine instance
+rule_engine = RuleEngine()
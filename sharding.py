@@ -0,0 +1,202 @@
+"""
+Maps users to SQLite files and pools their connections.
+
+Modes:
+    single    - every user in wearables.db (the default, and the original layout)
+    hash      - users spread over SHARD_COUNT files, shards/shard_NNN.db
+    per_user  - one file per user, shards/user_<id>.db
+
+With per_user, each user's queries only touch their own small file and
+writes for different users never contend for the same lock; hash bounds the
+number of files while still spreading writes. Rows keep their user_id
+column in every mode, so a file can hold any subset of users.
+
+Open connections are kept in a bounded LRU pool shared across shards, so
+busy users reuse a warm connection and idle files get closed. A connection
+opened before the query-tracing settings changed is reopened on checkout.
+
+Configuration via environment variables:
+    SHARD_MODE=per_user SHARD_DIR=/data/shards SHARD_MAX_CONNECTIONS=64
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from database import init_schema
+from db_trace import connect, finish_statements, query_tracer
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+SHARD_MODES = ("single", "hash", "per_user")
+
+
+class PooledConnection:
+    """
+    A pooled sqlite3 connection; close() hands it back to the pool.
+
+    Everything else is forwarded to the underlying connection, so callers
+    use it exactly like a plain one.
+    """
+
+    def __init__(self, router: "ShardRouter", path: Path, conn: sqlite3.Connection, generation: int):
+        self._router = router
+        self._path = path
+        self._conn = conn
+        self._generation = generation  # Tracing settings the connection was opened with
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._router._release(self._path, conn, self._generation)
+
+
+class ShardRouter:
+    """Routes users to database files and pools connections to them"""
+
+    def __init__(self):
+        self.mode = os.getenv("SHARD_MODE", "single")
+        self.shard_count = int(os.getenv("SHARD_COUNT", 16))
+        self.directory = Path(os.getenv("SHARD_DIR", PROJECT_ROOT / "shards"))
+        self.default_path = PROJECT_ROOT / "wearables.db"
+        self.max_connections = int(os.getenv("SHARD_MAX_CONNECTIONS", 64))
+        # id(conn) -> (path, conn, tracing generation), oldest first
+        self._idle: "OrderedDict[int, tuple]" = OrderedDict()
+        self._schema_ready = set()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def configure(self, mode: Optional[str] = None, shard_count: Optional[int] = None,
+                  directory: Optional[str] = None, default_path: Optional[str] = None,
+                  max_connections: Optional[int] = None):
+        """
+        Change the shard layout; pooled connections are closed.
+
+        Args:
+            mode: 'single', 'hash' or 'per_user'
+            shard_count: Number of files in 'hash' mode
+            directory: Where shard files live
+            default_path: Database used in 'single' mode
+            max_connections: Idle connections kept open across all shards
+        """
+        if mode is not None:
+            if mode not in SHARD_MODES:
+                raise ValueError(f"Unknown shard mode '{mode}'. Use one of: {', '.join(SHARD_MODES)}")
+            self.mode = mode
+        if shard_count is not None:
+            self.shard_count = max(1, shard_count)
+        if directory:
+            self.directory = Path(directory)
+        if default_path is not None:
+            self.default_path = Path(default_path)
+        if max_connections is not None:
+            self.max_connections = max(0, max_connections)
+        self.close_all()
+
+    def path_for(self, user_id: int) -> Path:
+        """Database file holding a user's data"""
+        if self.mode == "per_user":
+            return self.directory / f"user_{int(user_id)}.db"
+        if self.mode == "hash":
+            return self.directory / f"shard_{int(user_id) % self.shard_count:03d}.db"
+        return self.default_path
+
+    def all_paths(self) -> List[Path]:
+        """Every existing database file (for maintenance jobs)"""
+        if self.mode == "single":
+            return [self.default_path] if self.default_path.exists() else []
+        pattern = "user_*.db" if self.mode == "per_user" else "shard_*.db"
+        return sorted(self.directory.glob(pattern))
+
+    def connect(self, user_id: int = 1) -> PooledConnection:
+        """
+        Get a connection to a user's database file (schema ensured on first use)
+
+        Args:
+            user_id: User whose data will be queried
+
+        Returns:
+            Connection whose close() returns it to the pool
+        """
+        path = self.path_for(user_id)
+        generation = query_tracer.generation
+        stale = []
+        with self._lock:
+            for key, (idle_path, conn, idle_generation) in list(reversed(self._idle.items())):
+                if idle_path != path:
+                    continue
+                del self._idle[key]
+                if idle_generation != generation:
+                    stale.append(conn)  # Opened under other tracing settings
+                    continue
+                self.reused += 1
+                break
+            else:
+                conn = None
+                self.opened += 1
+        for old in stale:
+            old.close()
+        if conn is not None:
+            return PooledConnection(self, path, conn, generation)
+
+        if self.mode != "single":
+            path.parent.mkdir(parents=True, exist_ok=True)
+        # Pooled connections move between worker threads (one at a time)
+        conn = connect(str(path), check_same_thread=False)
+        if path not in self._schema_ready:
+            init_schema(conn)
+            self._schema_ready.add(path)
+        return PooledConnection(self, path, conn, generation)
+
+    def _release(self, path: Path, conn: sqlite3.Connection, generation: int):
+        """Return a connection to the pool, closing the least recently used beyond the limit"""
+        if conn.in_transaction:
+            conn.rollback()
+        finish_statements(conn)
+        evict = []
+        with self._lock:
+            self._idle[id(conn)] = (path, conn, generation)
+            while len(self._idle) > self.max_connections:
+                evict.append(self._idle.popitem(last=False)[1][1])
+                self.evicted += 1
+        for old in evict:
+            old.close()
+
+    def close_all(self):
+        """Close every pooled connection"""
+        with self._lock:
+            idle = [conn for _, conn, _ in self._idle.values()]
+            self._idle.clear()
+            self._schema_ready.clear()
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        """Shard layout and connection pool counters"""
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "mode": self.mode,
+            "shard_count": self.shard_count if self.mode == "hash" else None,
+            "idle_connections": idle,
+            "max_connections": self.max_connections,
+            "opened": self.opened,
+            "reused": self.reused,
+            "evicted": self.evicted,
+        }
+
+
+# Global shard router instance
+shard_router = ShardRouter()
@@ -0,0 +1,308 @@
+"""
+Deterministic resolution of date expressions in user questions.
+
+The tools take ISO dates, and the model otherwise has to work out "last
+Tuesday" or "the past fortnight" itself, with no reliable notion of today.
+Each wrong guess costs a corrective tool call and another model round-trip.
+Before the graph runs, the question is scanned for date expressions. They
+are resolved against today in the user's timezone and passed to the model as
+one compact line of JSON, e.g.
+
+    Date context: {"today":"2026-10-19","weekday":"Monday","timezone":"UTC",
+                   "dates":{"last tuesday":"2026-10-13","the weekend":["2026-10-17","2026-10-18"]}}
+
+A configurable share of turns can be held out (no context) so the metrics
+can compare agent iterations with and without it.
+"""
+import calendar
+import json
+import random
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = [m.lower() for m in calendar.month_name[1:]]
+NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+           "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12}
+_COUNT = r"(\d{1,3}|" + "|".join(NUMBERS) + r")"
+_WEEKDAY = "(" + "|".join(WEEKDAYS) + ")"
+# "may" is only a month when it is clearly used as one
+_MONTH = "(" + "|".join(m for m in MONTHS if m != "may") + ")"
+
+
+class DateRange(NamedTuple):
+    """A date expression and the inclusive range it refers to"""
+    expression: str
+    start: date
+    end: date
+    day: bool = False  # The expression always names a single day (e.g. "yesterday", not "this week")
+
+
+def _count(word: str) -> int:
+    return int(word) if word.isdigit() else NUMBERS[word]
+
+
+def _months_back(day: date, months: int) -> date:
+    """Same day of month `months` earlier (clamped to the month's length)."""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _month_range(year: int, month: int) -> tuple:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _previous_month(today: date) -> tuple:
+    last_day = today.replace(day=1) - timedelta(days=1)
+    return _month_range(last_day.year, last_day.month)
+
+
+def _last_weekday(today: date, weekday: int) -> date:
+    """Most recent given weekday before today."""
+    return today - timedelta(days=(today.weekday() - weekday - 1) % 7 + 1)
+
+
+def _weekend(today: date, previous: bool) -> tuple:
+    """The current (or most recent) weekend, or the one before it."""
+    if today.weekday() >= 5 and not previous:
+        saturday = today - timedelta(days=today.weekday() - 5)
+        return saturday, min(today, saturday + timedelta(days=1))
+    saturday = _last_weekday(today, 5)
+    if previous and today.weekday() == 6:
+        saturday -= timedelta(days=7)
+    return saturday, saturday + timedelta(days=1)
+
+
+def _rolling(today: date, amount: int, unit: str) -> tuple:
+    if unit.startswith("day"):
+        return today - timedelta(days=amount - 1), today
+    if unit.startswith("week"):
+        return today - timedelta(days=7 * amount - 1), today
+    if unit.startswith("month"):
+        return _months_back(today, amount) + timedelta(days=1), today
+    return _months_back(today, 12 * amount) + timedelta(days=1), today
+
+
+def _named_month(today: date, month: int, year: Optional[str], since: bool = False) -> tuple:
+    """A named month: the given year, else the most recent one that has started ("since" runs to today)."""
+    if year:
+        start, end = _month_range(int(year), month)
+    else:
+        start, end = _month_range(today.year if month <= today.month else today.year - 1, month)
+    return (start, max(end, today)) if since else (start, end)
+
+
+# (pattern, resolver(match, today) -> (start, end), always a single day);
+# earlier patterns win overlapping text
+_RULES = [
+    (r"\bday before yesterday\b", lambda m, t: (t - timedelta(days=2),) * 2, True),
+    (r"\byesterday\b", lambda m, t: (t - timedelta(days=1),) * 2, True),
+    (r"\blast night\b", lambda m, t: (t - timedelta(days=1), t), False),
+    (r"\btoday\b|\btonight\b", lambda m, t: (t,) * 2, True),
+    (rf"\b{_COUNT} days? ago\b", lambda m, t: (t - timedelta(days=_count(m.group(1))),) * 2, True),
+    (rf"\b{_COUNT} weeks? ago\b", lambda m, t: (
+        t - timedelta(days=t.weekday() + 7 * _count(m.group(1))),
+        t - timedelta(days=t.weekday() + 7 * _count(m.group(1)) - 6)), False),
+    (r"\b(?:last|past|previous) fortnight\b|\b(?:past|last) two weeks\b",
+     lambda m, t: (t - timedelta(days=13), t), False),
+    (rf"\b(?:last|past|previous) {_COUNT} (days?|weeks?|months?|years?)\b",
+     lambda m, t: _rolling(t, _count(m.group(1)), m.group(2)), False),
+    (r"\b(?:the )?past (day|week|month|year)\b", lambda m, t: _rolling(t, 1, m.group(1)), False),
+    (r"\bthis week\b", lambda m, t: (t - timedelta(days=t.weekday()), t), False),
+    (r"\b(?:last|previous) week\b",
+     lambda m, t: (t - timedelta(days=t.weekday() + 7), t - timedelta(days=t.weekday() + 1)), False),
+    (r"\bthis month\b", lambda m, t: (t.replace(day=1), t), False),
+    (r"\b(?:last|previous) month\b", lambda m, t: _previous_month(t), False),
+    (r"\bthis year\b", lambda m, t: (date(t.year, 1, 1), t), False),
+    (r"\b(?:last|previous) year\b", lambda m, t: (date(t.year - 1, 1, 1), date(t.year - 1, 12, 31)), False),
+    (r"\b(?:last|previous) weekend\b", lambda m, t: _weekend(t, previous=True), False),
+    (r"\b(?:this |the )?weekend\b", lambda m, t: _weekend(t, previous=False), False),
+    (rf"\b(?:last |this past |past |on |this )?{_WEEKDAY}\b",
+     lambda m, t: (_last_weekday(t, WEEKDAYS.index(m.group(1))),) * 2, True),
+    (rf"\b(?:in |during |for |since )?(?:{_MONTH}|(may)(?= \d{{4}}))(?: (\d{{4}}))?\b",
+     lambda m, t: _named_month(t, MONTHS.index(m.group(1) or m.group(2)) + 1, m.group(3),
+                               since=m.group(0).startswith("since")), False),
+]
+_COMPILED = [(re.compile(pattern, re.IGNORECASE), resolver, day) for pattern, resolver, day in _RULES]
+
+
+def resolve(text: str, today: date) -> List[DateRange]:
+    """
+    Find and resolve the date expressions in a text.
+
+    Args:
+        text: User message
+        today: The user's current date
+
+    Returns:
+        Resolved ranges in order of appearance (overlapping matches keep the first rule)
+    """
+    text = text.lower()
+    taken = []
+    ranges = []
+    for pattern, resolver, day in _COMPILED:
+        for match in pattern.finditer(text):
+            span = match.span()
+            if any(span[0] < end and start < span[1] for start, end in taken):
+                continue
+            start, end = resolver(match, today)
+            taken.append(span)
+            ranges.append((span[0], DateRange(match.group(0).strip(), start, end, day)))
+    return [found for _, found in sorted(ranges)]
+
+
+def _zone(timezone: Optional[str]) -> Optional[ZoneInfo]:
+    """ZoneInfo for an IANA name, or None if empty or unknown."""
+    if timezone:
+        try:
+            return ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return None
+
+
+def today_in(timezone: Optional[str]) -> date:
+    """Today's date in a timezone (IANA name; invalid or empty means server local time)."""
+    zone = _zone(timezone)
+    return datetime.now(zone).date() if zone else date.today()
+
+
+def build_context(text: str, timezone: Optional[str] = None, today: Optional[date] = None) -> tuple:
+    """
+    Date context line for a question.
+
+    Args:
+        text: User message
+        timezone: User's IANA timezone (empty = server local time)
+        today: Override for the current date (tests, benchmarks)
+
+    Returns:
+        Tuple of (context line, number of resolved expressions)
+    """
+    today = today or today_in(timezone)
+    ranges = resolve(text, today)
+    dates = {}
+    for found in ranges:
+        dates[found.expression] = found.start.isoformat() if found.start == found.end \
+            else [found.start.isoformat(), found.end.isoformat()]
+    context = {"today": today.isoformat(), "weekday": WEEKDAYS[today.weekday()].title(),
+               "timezone": timezone if _zone(timezone) else "local"}
+    if dates:
+        context["dates"] = dates
+    return "Date context (use these dates for tool arguments): " + json.dumps(context, separators=(",", ":")), \
+        len(ranges)
+
+
+def turn_iterations(new_messages: list) -> tuple:
+    """
+    Model iterations and corrective tool calls in one turn.
+
+    A corrective call is a repeat call of a tool with different arguments,
+    typically re-fetching after the model picked the wrong dates.
+
+    Args:
+        new_messages: Messages the turn added after the user message
+
+    Returns:
+        Tuple of (model iterations, corrective tool calls)
+    """
+    iterations = 0
+    seen = {}
+    corrective = 0
+    for message in new_messages:
+        if getattr(message, "type", None) != "ai":
+            continue
+        iterations += 1
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            args = json.dumps(tool_call.get("args", {}), sort_keys=True, default=str)
+            calls = seen.setdefault(tool_call.get("name"), set())
+            if calls and args not in calls:
+                corrective += 1
+            calls.add(args)
+    return iterations, corrective
+
+
+class TemporalStats:
+    """Context injection settings and iterations per turn with vs without it"""
+
+    def __init__(self):
+        self.enabled = True
+        self.holdout = 0.0
+        self.default_timezone = ""
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._resolved = 0
+        self._groups = {True: [0, 0, 0], False: [0, 0, 0]}  # context used -> [turns, iterations, corrective]
+
+    def configure(self, enabled: Optional[bool] = None, holdout: Optional[float] = None,
+                  default_timezone: Optional[str] = None):
+        """Apply settings (e.g. from application settings)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if holdout is not None:
+            self.holdout = min(1.0, max(0.0, holdout))
+        if default_timezone is not None:
+            self.default_timezone = default_timezone
+
+    def today(self, timezone: Optional[str] = None) -> date:
+        """The user's current date (the default timezone when none is given)"""
+        return today_in(timezone or self.default_timezone)
+
+    def context_for(self, text: str, timezone: Optional[str] = None) -> tuple:
+        """
+        Date context for a turn, or None when disabled or held out.
+
+        Returns:
+            Tuple of (context line or None, number of resolved expressions)
+        """
+        context, resolved = build_context(text, timezone or self.default_timezone)
+        if not self.enabled or (resolved and random.random() < self.holdout):
+            return None, resolved
+        return context, resolved
+
+    def record_turn(self, resolved: int, context_used: bool, new_messages: list):
+        """Record a finished turn (only turns with date expressions are compared)."""
+        iterations, corrective = turn_iterations(new_messages)
+        with self._lock:
+            self._turns += 1
+            if not resolved:
+                return
+            self._resolved += resolved
+            group = self._groups[context_used]
+            group[0] += 1
+            group[1] += iterations
+            group[2] += corrective
+
+    def metrics(self) -> dict:
+        """Average iterations on dated turns with/without context and the difference"""
+        with self._lock:
+            groups = {}
+            for used, (turns, iterations, corrective) in self._groups.items():
+                groups[used] = {
+                    "turns": turns,
+                    "avg_iterations": round(iterations / turns, 2) if turns else None,
+                    "corrective_tool_calls": corrective,
+                }
+            with_context, without_context = groups[True], groups[False]
+            eliminated = None
+            if with_context["turns"] and without_context["turns"]:
+                eliminated = round(without_context["avg_iterations"] - with_context["avg_iterations"], 2)
+            return {
+                "enabled": self.enabled,
+                "holdout": self.holdout,
+                "turns": self._turns,
+                "resolved_expressions": self._resolved,
+                "with_context": with_context,
+                "without_context": without_context,
+                "iterations_eliminated_per_turn": eliminated,
+                "iterations_eliminated_total": round(eliminated * with_context["turns"], 1)
+                if eliminated is not None else None,
+            }
+
+
+# Global temporal stats instance
+temporal_stats = TemporalStats()
@@ -0,0 +1,25 @@
+"""
+Shared fixtures: every test gets its own empty database file.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from sharding import shard_router
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Route every user to a fresh database file for the duration of a test."""
+    saved = (shard_router.mode, shard_router.default_path)
+    path = tmp_path / "wearables.db"
+    shard_router.configure(mode="single", default_path=str(path))
+    conn = shard_router.connect()  # Creates the schema
+    conn.close()
+    yield path
+    shard_router.configure(mode=saved[0], default_path=str(saved[1]))
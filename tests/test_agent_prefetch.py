@@ -0,0 +1,76 @@
+"""
+Speculative tool calls started by an agent are finished on that agent's prefetcher.
+"""
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import agent
+from llm_gateway import LLMGateway
+from prefetch import ToolPrefetcher, predict_tool_calls, tool_prefetcher
+
+
+class StubModel:
+    """Answers every prompt without calling tools"""
+    model_name = "stub"
+
+    def bind_tools(self, tools):
+        return RunnableLambda(lambda prompt: AIMessage(content="done"))
+
+
+class RecordingPrefetcher(ToolPrefetcher):
+    def __init__(self):
+        super().__init__()
+        self.started, self.finished = [], []
+
+    def start(self, turn_id, message, tool_map, config, today=None):
+        self.started.append((turn_id, today))
+        super().start(turn_id, message, tool_map, config, today=today)
+
+    def finish(self, turn_id):
+        self.finished.append(turn_id)
+        super().finish(turn_id)
+
+
+def _agent(prefetcher):
+    return agent.create_agent(gateway=LLMGateway(requests_per_minute=6000, burst=100), prefetcher=prefetcher,
+                              response_llm=StubModel())
+
+
+def test_chat_finishes_the_turn_on_the_injected_prefetcher(db_path):
+    prefetcher = RecordingPrefetcher()
+    global_turns = tool_prefetcher.metrics()["turns"]
+
+    agent.chat(_agent(prefetcher), "How did I sleep yesterday?")
+
+    assert [turn for turn, _ in prefetcher.started] == prefetcher.finished
+    assert len(prefetcher.finished) == 1
+    assert prefetcher.handle(prefetcher.finished[0]) is None
+    assert tool_prefetcher.metrics()["turns"] == global_turns
+
+
+def test_stream_chat_finishes_the_turn_on_the_injected_prefetcher(db_path):
+    prefetcher = RecordingPrefetcher()
+
+    events = list(agent.stream_chat(_agent(prefetcher), "steps yesterday?"))
+
+    assert events[-1]["content"] == "done"
+    assert [turn for turn, _ in prefetcher.started] == prefetcher.finished
+
+
+def test_speculative_dates_use_the_users_timezone(db_path):
+    prefetcher = RecordingPrefetcher()
+    zone = "Pacific/Kiritimati"  # UTC+14: a different date from UTC for most of the day
+
+    agent.chat(_agent(prefetcher), "Steps yesterday?", timezone=zone)
+
+    assert prefetcher.started[0][1] == datetime.now(ZoneInfo(zone)).date()
+
+
+def test_predicted_date_follows_the_given_today():
+    today = date(2024, 3, 1)
+
+    assert predict_tool_calls("steps yesterday", today) == \
+           [("daily_steps_tool", {"date": (today - timedelta(days=1)).isoformat()})]
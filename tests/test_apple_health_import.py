@@ -0,0 +1,185 @@
+"""
+Apple Health import -> tools round trip.
+
+Imports only fill the columns the export has, so every tool must cope with
+NULL steps, sleep scores, stages and resting heart rate.
+"""
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import tools
+from importers.apple_health import import_apple_health
+
+DAY = (date.today() - timedelta(days=1)).isoformat()
+NIGHT_START = (date.today() - timedelta(days=2)).isoformat()
+
+
+def _record(record_type, start, end=None, value=None, unit=None):
+    attributes = f'type="{record_type}" startDate="{start} +0000" endDate="{end or start} +0000"'
+    if value is not None:
+        attributes += f' value="{value}"'
+    if unit:
+        attributes += f' unit="{unit}"'
+    return f" <Record {attributes}/>\n"
+
+
+def write_export(path, records):
+    path.write_text('<?xml version="1.0" encoding="UTF-8"?>\n<HealthData locale="en_US">\n'
+                    + "".join(records) + "</HealthData>\n")
+    return path
+
+
+@pytest.fixture
+def partial_export(tmp_path):
+    """Calories without steps, sleep without stages, heart rate without resting values."""
+    return write_export(tmp_path / "export.xml", [
+        _record("HKQuantityTypeIdentifierHeartRate", f"{DAY} 08:00:00", value=72, unit="count/min"),
+        _record("HKQuantityTypeIdentifierHeartRate", f"{DAY} 09:00:00", value=80, unit="count/min"),
+        _record("HKQuantityTypeIdentifierActiveEnergyBurned", f"{DAY} 09:00:00", f"{DAY} 09:10:00",
+                value=20.5, unit="kcal"),
+        _record("HKCategoryTypeIdentifierSleepAnalysis", f"{NIGHT_START} 23:00:00", f"{DAY} 06:00:00",
+                value="HKCategoryValueSleepAnalysisAsleepUnspecified"),
+    ])
+
+
+TOOL_CALLS = [
+    (tools.get_daily_steps, {}),
+    (tools.get_daily_steps, {"date": DAY}),
+    (tools.get_sleep_data, {}),
+    (tools.get_sleep_data, {"date": DAY}),
+    (tools.get_heart_rate_data, {"date": DAY}),
+    (tools.get_activity_history, {}),
+    (tools.get_weekly_summary, {}),
+    (tools.compare_periods, {}),
+    (tools.get_dashboard, {"start_date": DAY, "end_date": DAY}),
+    (tools.search_data_by_date_range, {"start_date": DAY, "end_date": DAY, "metric_type": "steps"}),
+    (tools.search_data_by_date_range, {"start_date": DAY, "end_date": DAY, "metric_type": "sleep"}),
+]
+
+
+@pytest.mark.parametrize("tool, kwargs", TOOL_CALLS, ids=lambda value: getattr(value, "__name__", ""))
+def test_tools_handle_partial_imported_rows(db_path, partial_export, tool, kwargs):
+    import_apple_health(str(partial_export), db_path=str(db_path))
+
+    output = tool(**kwargs)
+
+    assert "None" not in output
+
+
+def test_imported_values_are_reported(db_path, partial_export):
+    import_apple_health(str(partial_export), db_path=str(db_path))
+
+    assert "n/a steps" in tools.get_daily_steps(date=DAY)
+    assert "20.5 calories burned" in tools.get_daily_steps(date=DAY)
+    sleep = tools.get_sleep_data(date=DAY)
+    assert "Total sleep: 7.0 hours" in sleep
+    assert "Sleep score: n/a" in sleep
+    heart_rate = tools.get_heart_rate_data(date=DAY)
+    assert "Average: 76 bpm" in heart_rate
+    assert "Resting heart rate: n/a" in heart_rate
+
+
+
+def test_dashboard_counts_workouts(db_path, partial_export):
+    import_apple_health(str(partial_export), db_path=str(db_path))
+    assert "workout" not in tools.get_dashboard(DAY, DAY)
+
+    workouts = write_export(partial_export.parent / "workouts.xml", [
+        f' <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="{minutes}" durationUnit="min"'
+        f' startDate="{DAY} {hour}:00:00 +0000" endDate="{DAY} {hour}:59:00 +0000"/>\n'
+        for hour, minutes in (("07", 30), ("17", 45))
+    ])
+    import_apple_health(str(workouts), db_path=str(db_path))
+    dashboard = tools.get_dashboard(DAY, DAY)
+
+    assert "HR resting n/a, avg 76" in dashboard
+    assert "Running (75 min, n/a cal)" in dashboard
+    assert dashboard.endswith("Averages: 7.0h sleep/night, 2 workouts")
+
+
+def _stored(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            "calories": conn.execute("SELECT date, calories_burned FROM daily_metrics").fetchall(),
+            "sleep": conn.execute("SELECT date, total_sleep_hours FROM sleep_data").fetchall(),
+            "heart_rate": conn.execute("SELECT COUNT(*) FROM heart_rate").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def test_reimport_and_restart_do_not_double_count(db_path, partial_export):
+    import_apple_health(str(partial_export), db_path=str(db_path))
+    first = _stored(db_path)
+
+    import_apple_health(str(partial_export), db_path=str(db_path), restart=True)
+    assert _stored(db_path) == first
+
+    # A newer cumulative export repeats every earlier record
+    newer = write_export(partial_export.parent / "newer.xml", [
+        *partial_export.read_text().splitlines(keepends=True)[2:-1],
+        _record("HKQuantityTypeIdentifierActiveEnergyBurned", f"{DAY} 18:00:00", f"{DAY} 18:30:00",
+                value=100, unit="kcal"),
+    ])
+    stats = import_apple_health(str(newer), db_path=str(db_path))
+
+    stored = _stored(db_path)
+    assert stored["calories"] == [(DAY, 120.5)]
+    assert stored["sleep"] == first["sleep"]
+    assert stored["heart_rate"] == first["heart_rate"] == 2
+    assert stats["inserted"] == {"heart_rate": 0, "daily_metrics": 0, "sleep_data": 0, "activities": 0}
+
+
+def test_resumed_import_counts_each_record_once(db_path, partial_export):
+    def interrupt(stats):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        import_apple_health(str(partial_export), db_path=str(db_path), batch_size=3, progress=interrupt)
+    stats = import_apple_health(str(partial_export), db_path=str(db_path), batch_size=3)
+
+    assert stats["resumed_from"] == 3
+    stored = _stored(db_path)
+    assert stored["calories"] == [(DAY, 20.5)]
+    assert stored["sleep"] == [(DAY, 7.0)]
+    assert stored["heart_rate"] == 2
+
+
+def test_reimport_observes_only_changes(db_path, partial_export):
+    batches = []
+    import_apple_health(str(partial_export), db_path=str(db_path))
+    import_apple_health(str(partial_export), db_path=str(db_path), restart=True, observe=batches.append)
+
+    assert [observation for batch in batches for observation in batch] == []
+
+
+def test_import_feeds_rules(db_path, partial_export):
+    from rules import RuleEngine
+    engine = RuleEngine()
+    engine.add_rule(1, "high", "heart_rate", ">", 75)
+    engine.add_rule(1, "low", "calories_burned", "<", 100)
+    events = []
+
+    import_apple_health(str(partial_export), db_path=str(db_path),
+                        observe=lambda observations: events.extend(engine.ingest(1, observations)))
+    assert [event["channel_id"] for event in events] == ["high"]  # Mean of 72 and 80
+    events.extend(engine.flush(1))
+
+    assert [(event["channel_id"], event["day"], event["value"]) for event in events[1:]] == [("low", DAY, 20.5)]
+
+
+def test_reimport_after_compaction_adds_no_heart_rate(db_path, partial_export):
+    from datetime import datetime
+    from compaction import compact_heart_rate
+    import_apple_health(str(partial_export), db_path=str(db_path))
+    compact_heart_rate(db_path=str(db_path), now=datetime.now() + timedelta(days=60))
+    compacted = tools.get_heart_rate_data(date=DAY)
+
+    import_apple_health(str(partial_export), db_path=str(db_path), restart=True)
+
+    assert _stored(db_path)["heart_rate"] == 0
+    assert tools.get_heart_rate_data(date=DAY) == compacted
+    assert "Average: 76 bpm" in compacted
@@ -0,0 +1,126 @@
+"""
+Heart-rate downsampling keeps every aggregate the tools read.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from compaction import compact_heart_rate
+from sharding import shard_router
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+OLD = NOW - timedelta(days=40)  # Past the raw retention, within the minute retention
+ANCIENT = NOW - timedelta(days=400)  # Past both
+
+
+def _samples(start: datetime, values: list) -> list:
+    return [(1, (start + timedelta(seconds=10 * i)).strftime('%Y-%m-%d %H:%M:%S'), value, None)
+            for i, value in enumerate(values)]
+
+
+@pytest.fixture
+def heart_rate(db_path):
+    conn = shard_router.connect(1)
+    with conn:
+        conn.executemany("INSERT INTO heart_rate (user_id, timestamp, heart_rate, resting_heart_rate) "
+                         "VALUES (?, ?, ?, ?)",
+                         _samples(OLD, [60, 70, 80, 90, 100, 110, 120])  # Spans two minutes
+                         + _samples(ANCIENT, [50, 70])
+                         + _samples(NOW - timedelta(hours=1), [75])
+                         + [(1, OLD.strftime('%Y-%m-%d 05:00:00'), None, 58)])
+    conn.close()
+    return db_path
+
+
+def _daily(db_path) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('''
+            SELECT substr(timestamp, 1, 10), MIN(min_hr), MAX(max_hr), SUM(sum_hr), SUM(hr_count),
+                   SUM(sum_resting), SUM(resting_count)
+            FROM heart_rate_samples GROUP BY 1 ORDER BY 1
+        ''').fetchall()
+    finally:
+        conn.close()
+
+
+def _count(db_path, table: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_compaction_preserves_daily_aggregates(heart_rate):
+    before = _daily(heart_rate)
+
+    report = compact_heart_rate(raw_days=30, minute_days=365, batch_size=3, db_path=str(heart_rate), now=NOW)
+
+    assert _daily(heart_rate) == before
+    assert report["raw_rows_folded"] == 10
+    assert report["batches"] > 2  # Folded in several small transactions
+    assert _count(heart_rate, "heart_rate") == 1  # Only the recent sample stays raw
+    assert _count(heart_rate, "heart_rate_minute") == 3  # Two minutes plus the resting-only one
+    assert _count(heart_rate, "heart_rate_hour") == 1
+
+
+def test_minute_buckets_keep_min_max_and_count(heart_rate):
+    compact_heart_rate(raw_days=30, minute_days=365, db_path=str(heart_rate), now=NOW)
+
+    conn = sqlite3.connect(heart_rate)
+    try:
+        rows = conn.execute("SELECT timestamp, min_hr, max_hr, avg_hr, hr_count FROM heart_rate_minute "
+                            "WHERE hr_count > 0 ORDER BY timestamp").fetchall()
+    finally:
+        conn.close()
+    minute = OLD.strftime('%Y-%m-%d %H:%M:00')
+    assert rows == [(minute, 60, 110, 85.0, 6),
+                    ((OLD + timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M:00'), 120, 120, 120.0, 1)]
+
+
+def test_compaction_is_idempotent(heart_rate):
+    compact_heart_rate(raw_days=30, minute_days=365, db_path=str(heart_rate), now=NOW)
+    after = _daily(heart_rate)
+
+    report = compact_heart_rate(raw_days=30, minute_days=365, db_path=str(heart_rate), now=NOW)
+
+    assert (report["raw_rows_folded"], report["minute_rows_folded"]) == (0, 0)
+    assert _daily(heart_rate) == after
+
+
+def _fill(path, rows: int):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany("INSERT INTO heart_rate (user_id, timestamp, heart_rate) VALUES (1, ?, 70)",
+                         [((OLD + timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S'),) for i in range(rows)])
+    conn.close()
+
+
+def test_incremental_vacuum_returns_freed_pages(db_path):
+    _fill(db_path, 20000)
+
+    report = compact_heart_rate(db_path=str(db_path), now=NOW)
+
+    assert report["mode"] == "incremental_vacuum"
+    assert report["bytes_reclaimed"] > 0
+    assert report["db_bytes"] == db_path.stat().st_size
+
+
+def test_legacy_file_is_vacuumed_into_incremental_mode(tmp_path):
+    from database import init_schema
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE legacy (x)")  # Fixes auto_vacuum = NONE before init_schema runs
+    init_schema(conn)
+    conn.close()
+    _fill(path, 20000)
+
+    report = compact_heart_rate(db_path=str(path), now=NOW)
+
+    assert report["mode"] == "vacuum"
+    assert report["bytes_reclaimed"] > 0
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
@@ -0,0 +1,26 @@
+"""
+Period-over-period comparison with gaps in the data.
+"""
+import sqlite3
+
+import tools
+
+
+def test_changes_are_against_the_adjacent_period_even_when_it_is_empty(db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany("INSERT INTO daily_metrics (user_id, date, steps) VALUES (1, ?, ?)",
+                         [("2024-01-05", 4000), ("2024-01-21", 8000)])
+    conn.close()
+
+    lines = tools.compare_periods(period_days=7, periods=3, end_date="2024-01-21").splitlines()[1:]
+
+    assert lines == [
+        "- 2024-01-01 to 2024-01-07: steps 4,000/day, workouts 0 / 0 min",
+        "- 2024-01-08 to 2024-01-14: no data",
+        "- 2024-01-15 to 2024-01-21: steps 8,000/day, workouts 0 / 0 min",  # No change vs week 1
+    ]
+
+
+def test_no_data_in_any_period(db_path):
+    assert tools.compare_periods(end_date="2024-01-21") == "No data found from 2024-01-08 to 2024-01-21"
@@ -0,0 +1,85 @@
+"""
+WebSocket fan-out never waits on a slow subscriber.
+"""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import ws
+from app.services.connection_service import SLOW_CONSUMER_CLOSE_CODE, ClientConnection, ConnectionService
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+def _connection(queue_size=2):
+    return ClientConnection(FakeSocket(), max_unacked=1, queue_size=queue_size, max_inflight_turns=1)
+
+
+def test_full_subscriber_is_closed_and_dropped_without_blocking_others():
+    async def scenario():
+        service = ConnectionService()
+        stuck, healthy = _connection(), _connection(queue_size=10)
+        service.subscribe(stuck, "c")
+        service.subscribe(healthy, "c")
+
+        for i in range(3):
+            await asyncio.wait_for(service.publish("c", {"type": "user_message", "n": i}), timeout=1)
+        await asyncio.sleep(0)
+
+        assert stuck.closed and stuck.websocket.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert service.subscriber_count("c") == 1
+        assert healthy.queue.qsize() == 3
+
+    asyncio.run(scenario())
+
+
+def test_tokens_are_dropped_without_closing():
+    async def scenario():
+        connection = _connection(queue_size=1)
+        assert connection.push({"type": "token"})
+        assert not connection.push({"type": "token"})
+        assert not connection.closed
+
+    asyncio.run(scenario())
+
+
+def test_disconnected_connection_is_not_resubscribed():
+    async def scenario():
+        service = ConnectionService()
+        connection = _connection()
+        service.subscribe(connection, "c")
+        service.disconnect(connection)
+
+        service.subscribe(connection, "c")  # A turn still running for the closed socket
+
+        assert service.subscriber_count("c") == 0
+        assert not connection.push({"type": "final"})
+
+    asyncio.run(scenario())
+
+
+def test_malformed_frames_get_an_error_and_keep_the_socket_open():
+    app = FastAPI()
+    app.include_router(ws.router)
+
+    with TestClient(app).websocket_connect("/ws/chat") as socket:
+        socket.send_text("{not json")
+        assert socket.receive_json()["detail"] == "Frames must be JSON objects"
+        socket.send_json({"type": "ack", "seq": "soon"})
+        assert socket.receive_json()["detail"] == "Ack seq must be an integer"
+        socket.send_json({"type": "message", "channel_id": "c", "message": 5})
+        assert socket.receive_json()["code"] == "invalid"
+
+        socket.send_json({"type": "ping"})
+        assert socket.receive_json()["type"] == "pong"
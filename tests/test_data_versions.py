@@ -0,0 +1,49 @@
+"""
+Per-table data versions used to invalidate cached answers and baselines.
+"""
+import sqlite3
+
+import pytest
+
+from tools import get_data_versions
+
+
+@pytest.fixture
+def writer(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO daily_metrics (user_id, date, steps) VALUES (1, '2024-01-01', 1000)")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_versions_are_stable_without_writes(writer):
+    assert get_data_versions(1) == get_data_versions(1)
+
+
+@pytest.mark.parametrize("statement", [
+    "INSERT INTO daily_metrics (user_id, date, steps) VALUES (1, '2024-01-02', 2000)",
+    "UPDATE daily_metrics SET steps = 1500 WHERE date = '2024-01-01'",
+    "DELETE FROM daily_metrics",
+])
+def test_every_kind_of_write_changes_the_table_version(writer, statement):
+    before = get_data_versions(1)
+
+    writer.execute(statement)
+    writer.commit()
+    after = get_data_versions(1)
+
+    assert after["daily_metrics"] != before["daily_metrics"]
+    assert {table: version for table, version in after.items() if table != "daily_metrics"} == \
+           {table: version for table, version in before.items() if table != "daily_metrics"}
+
+
+def test_update_keeping_row_count_and_rowid_changes_the_version(writer):
+    before = get_data_versions(1)["daily_metrics"]
+
+    writer.execute("UPDATE daily_metrics SET steps = steps + 1")
+    writer.commit()
+    after = get_data_versions(1)["daily_metrics"]
+
+    assert after[:2] == before[:2]
+    assert after[2] == before[2] + 1
@@ -0,0 +1,15 @@
+"""
+Degraded-mode answers resolve dates against the user's today.
+"""
+from datetime import date
+
+from degraded import DegradedResponder
+
+
+def test_relative_dates_use_the_turns_today(db_path):
+    responder = DegradedResponder()
+
+    _, calls = responder.answer("How did I sleep yesterday?", "timeout", today=date(2024, 3, 1))
+
+    assert ("sleep_data_tool", {"date": "2024-02-29"}) in [(name, args) for name, args, _ in calls]
+    assert responder.metrics()["by_reason"] == {"timeout": 1}
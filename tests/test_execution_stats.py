@@ -0,0 +1,40 @@
+"""
+Per-run node, edge and tool statistics.
+"""
+from execution_stats import ExecutionStats
+
+
+def _run(stats: ExecutionStats, nodes: list, tools: tuple = ()):
+    with stats.track():
+        for name, seconds in nodes:
+            stats.record_node(name, seconds)
+        for tool in tools:
+            stats.record_tool(tool)
+
+
+def test_snapshot_aggregates_nodes_edges_and_tools():
+    stats = ExecutionStats()
+    _run(stats, [("agent", 0.1), ("tools", 0.02), ("agent", 0.3)], ("get_sleep_data",))
+    _run(stats, [("agent", 0.2)])
+
+    snapshot = stats.snapshot()
+
+    assert snapshot["executions"] == 2
+    assert snapshot["nodes"]["agent"] == {"count": 3, "mean_ms": 200.0, "p95_ms": 300.0, "total_ms": 600.0}
+    assert {"source": "__start__", "target": "agent", "count": 2} in snapshot["edges"]
+    assert {"source": "tools", "target": "agent", "count": 1} in snapshot["edges"]
+    assert snapshot["avg_iterations"] == 1.5
+    assert snapshot["top_tools"] == [{"name": "get_sleep_data", "count": 1}]
+
+
+def test_only_recent_runs_with_nodes_are_kept():
+    stats = ExecutionStats(maxlen=2)
+    stats.record_node("agent", 1.0)  # Outside a run: ignored
+    _run(stats, [])
+    for seconds in (0.1, 0.2, 0.3):
+        _run(stats, [("agent", seconds)])
+
+    snapshot = stats.snapshot()
+
+    assert snapshot["executions"] == 2
+    assert snapshot["nodes"]["agent"]["total_ms"] == 500.0
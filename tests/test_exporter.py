@@ -0,0 +1,86 @@
+"""
+Streaming table exports.
+"""
+import csv
+import io
+import json
+
+import pytest
+
+import exporter as export_formats
+from exporter import Exporter
+from sharding import shard_router
+
+DAYS = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+
+
+@pytest.fixture
+def daily(db_path):
+    conn = shard_router.connect(1)
+    with conn:
+        conn.executemany("INSERT INTO daily_metrics (user_id, date, steps, distance_km) VALUES (?, ?, ?, ?)",
+                         [(1, day, 1000 * i, 0.5 * i) for i, day in enumerate(DAYS, 1)])
+        conn.execute("INSERT INTO daily_metrics (user_id, date, steps) VALUES (2, '2024-01-01', 99)")
+    conn.close()
+    return db_path
+
+
+def test_ndjson_streams_one_chunk_per_batch_of_rows(daily):
+    chunks = list(Exporter().stream("daily_metrics", "ndjson", chunk_rows=2))
+
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert len(chunks) == 3
+    assert [row["date"] for row in rows] == DAYS
+    assert rows[1]["steps"] == 2000 and rows[1]["distance_km"] == 1.0
+
+
+def test_csv_has_a_header_and_the_users_rows_in_range(daily):
+    data = b"".join(Exporter().stream("daily_metrics", "csv", user_id=1, start_date="2024-01-02",
+                                      end_date="2024-01-04", chunk_rows=2))
+
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert [row["date"] for row in rows] == DAYS[1:4]
+    assert {row["user_id"] for row in rows} == {"1"}
+
+
+def test_empty_csv_export_is_just_the_header(daily):
+    data = b"".join(Exporter().stream("sleep_data", "csv"))
+
+    assert data.decode().splitlines() == [
+        "sleep_id,user_id,date,total_sleep_hours,deep_sleep_hours,light_sleep_hours,rem_sleep_hours,"
+        "awake_hours,sleep_score"]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_exports_round_trip(daily, fmt):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    data = b"".join(Exporter().stream("daily_metrics", fmt, chunk_rows=2))
+
+    table = pq.read_table(io.BytesIO(data)) if fmt == "parquet" else pa.ipc.open_stream(data).read_all()
+    assert table.column("date").to_pylist() == DAYS
+    assert table.schema.field("steps").type == pa.int64()
+    assert table.schema.field("floors_climbed").type == pa.int64()  # All NULL, typed from the schema
+
+
+@pytest.mark.parametrize("table, fmt, start, error", [
+    ("nope", "csv", None, KeyError),
+    ("daily_metrics", "xml", None, ValueError),
+    ("daily_metrics", "csv", "01/02/2024", ValueError),
+])
+def test_invalid_exports_are_rejected_before_streaming(daily, table, fmt, start, error):
+    with pytest.raises(error):
+        export_formats.validate(table, fmt, start)
+
+
+def test_metrics_count_finished_and_aborted_exports(daily):
+    exporter = Exporter()
+    list(exporter.stream("daily_metrics", "ndjson"))
+    aborted = exporter.stream("daily_metrics", "ndjson", chunk_rows=1)
+    next(aborted)
+    aborted.close()
+
+    metrics = exporter.metrics()
+    assert (metrics["exports"], metrics["aborted"], metrics["active"]) == (2, 1, 0)
+    assert [export["rows"] for export in metrics["recent"]] == [5, 1]
@@ -0,0 +1,28 @@
+"""
+Upload spooling for background imports.
+"""
+from app.services.import_service import import_service
+
+
+def test_concurrent_uploads_with_the_same_name_get_separate_files():
+    first = import_service.upload_path("export.zip")
+    second = import_service.upload_path("export.zip")
+    first.write_bytes(b"first")
+    second.write_bytes(b"second")
+
+    assert first != second
+    assert first.name == second.name == "export.zip"  # The checkpoint is keyed on the name
+
+    import_service.discard_upload(first)
+    assert not first.parent.exists()
+    assert second.read_bytes() == b"second"
+    import_service.discard_upload(second)
+
+
+def test_upload_path_drops_client_directories():
+    path = import_service.upload_path("../../etc/export.xml")
+    try:
+        assert path.name == "export.xml"
+        assert path.parent.parent.name == "wearables-imports"
+    finally:
+        import_service.discard_upload(path)
@@ -0,0 +1,54 @@
+"""
+Fair queuing state in the LLM gateway.
+"""
+import threading
+import time
+
+from llm_gateway import LLMGateway
+
+
+class EchoModel:
+    def invoke(self, messages, **kwargs):
+        return messages
+
+
+def _gateway() -> LLMGateway:
+    gateway = LLMGateway()
+    gateway.configure(max_concurrency=1, requests_per_minute=60000, burst=1000)
+    return gateway
+
+
+def test_channel_rounds_are_forgotten_once_a_channel_drains():
+    gateway = _gateway()
+
+    for i in range(100):
+        gateway.invoke(EchoModel(), [], channel_id=f"channel-{i}")
+
+    assert gateway._channel_rounds == {}
+
+
+def test_backlogged_channel_keeps_its_round_and_yields_to_others():
+    gateway = _gateway()
+    gateway._in_flight = 1  # Hold the only slot so calls queue up
+    admitted = []
+
+    def call(channel_id):
+        gateway._acquire(channel_id, 0, None)
+        admitted.append(channel_id)
+
+    threads = [threading.Thread(target=call, args=(channel,)) for channel in ("busy", "busy", "busy", "other")]
+    for thread in threads:
+        thread.start()
+        while len(gateway._queue) < threads.index(thread) + 1:
+            time.sleep(0.001)
+    assert gateway._channel_rounds == {"busy": 3, "other": 1}
+
+    for _ in threads:
+        gateway._release(0.0)
+        while gateway._in_flight == 0:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(timeout=1)
+
+    assert admitted == ["busy", "other", "busy", "busy"]
+    assert gateway._channel_rounds == {}
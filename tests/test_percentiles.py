@@ -0,0 +1,27 @@
+"""
+Nearest-rank p95 shared by the execution, model tier and LLM gateway stats.
+"""
+import pytest
+
+from execution_stats import percentile
+from llm_gateway import LLMGateway
+from model_router import ROUTER, TierStats
+
+
+@pytest.mark.parametrize("count, expected", [(1, 1), (2, 2), (10, 10), (20, 19), (30, 29), (100, 95)])
+def test_p95_is_the_nearest_rank(count, expected):
+    assert percentile(list(range(count, 0, -1)), 95) == expected
+
+
+def test_tier_p95_for_few_calls_is_the_slowest():
+    stats = TierStats()
+    stats._latencies[ROUTER].extend([0.010, 0.200])
+
+    assert stats.metrics()[ROUTER]["latency_ms_p95"] == 200.0
+
+
+def test_gateway_wait_p95_for_few_waits_is_the_longest():
+    gateway = LLMGateway()
+    gateway._wait_times.extend([0.001, 0.050])
+
+    assert gateway.metrics()["wait_ms_p95"] == 50.0
@@ -0,0 +1,54 @@
+"""
+Query tracing switched on and off while the connection pool is warm.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+import tools
+from app.api.admin import update_query_tracing
+from app.models.schemas import QueryTraceSettings
+from db_trace import query_tracer
+from sharding import shard_router
+
+
+@pytest.fixture
+def tracer(db_path):
+    saved = (query_tracer.enabled, query_tracer.trace_sql, query_tracer.progress_steps)
+    query_tracer.reset()
+    yield query_tracer
+    query_tracer.configure(enabled=saved[0], trace_sql=saved[1], progress_steps=saved[2])
+    query_tracer.reset()
+
+
+def _checkout_type() -> type:
+    conn = shard_router.connect(1)
+    try:
+        return type(conn._conn)
+    finally:
+        conn.close()
+
+
+def test_enabling_tracing_at_runtime_traces_pooled_connections(tracer):
+    tools.get_daily_steps()  # Warms the pool with an untraced connection
+    assert _checkout_type() is sqlite3.Connection
+
+    asyncio.run(update_query_tracing(QueryTraceSettings(enabled=True)))
+    tools.get_daily_steps(date="2024-01-01")
+
+    assert sum(statement["calls"] for statement in tracer.stats()["statements"]) > 0
+    assert _checkout_type() is not sqlite3.Connection
+
+    asyncio.run(update_query_tracing(QueryTraceSettings(enabled=False)))
+    assert _checkout_type() is sqlite3.Connection
+
+
+def test_changing_only_the_threshold_keeps_pooled_connections(tracer):
+    _checkout_type()
+    opened = shard_router.stats()["opened"]
+
+    asyncio.run(update_query_tracing(QueryTraceSettings(slow_query_ms=5)))
+    _checkout_type()
+
+    assert shard_router.stats()["opened"] == opened
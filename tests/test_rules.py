@@ -0,0 +1,135 @@
+"""
+Incremental goal/alert rules.
+"""
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from rules import RuleEngine
+
+TODAY = date.today()
+
+
+def _day(offset: int) -> str:
+    return (TODAY - timedelta(days=offset)).isoformat()
+
+
+def test_under_rule_on_a_total_waits_for_the_finished_day(db_path):
+    engine = RuleEngine()
+    rule = engine.add_rule(1, "channel", "steps", "<", 5000, window_days=7)
+
+    # The first batch of a day is far below the goal, the whole day is not
+    assert engine.ingest(1, [("steps", _day(1), 300)]) == []
+    assert engine.ingest(1, [("steps", _day(1), 6000)]) == []
+    assert engine.flush(1) == []
+    assert engine.status(rule.rule_id)["newest_day"] == _day(1)
+
+    engine.ingest(1, [("steps", _day(2), 300), ("steps", _day(2), 1200)])
+    events = engine.flush(1)
+    assert [(event["day"], event["value"]) for event in events] == [(_day(2), 1500)]
+
+
+def test_today_stays_pending_until_it_is_over(db_path):
+    engine = RuleEngine()
+    engine.add_rule(1, "channel", "total_sleep_hours", "<=", 6)
+
+    engine.ingest(1, [("total_sleep_hours", _day(0), 2.5)])
+
+    assert engine.flush(1) == []
+    assert engine.metrics()["pending_days"] == 1
+
+
+def test_flush_only_evaluates_the_users_own_days(db_path):
+    engine = RuleEngine()
+    engine.add_rule(1, "one", "steps", "<", 5000)
+    engine.add_rule(2, "two", "steps", "<", 5000)
+    engine.ingest(1, [("steps", _day(1), 100)])
+    engine.ingest(2, [("steps", _day(1), 100)])
+
+    assert [event["channel_id"] for event in engine.flush(2)] == ["two"]
+    assert [event["channel_id"] for event in engine.flush(1)] == ["one"]
+
+
+def test_over_rule_on_a_total_fires_while_ingesting(db_path):
+    engine = RuleEngine()
+    engine.add_rule(1, "channel", "steps", ">=", 10000)
+
+    assert engine.ingest(1, [("steps", _day(0), 6000)]) == []
+    events = engine.ingest(1, [("steps", _day(0), 4000)])
+
+    assert [event["value"] for event in events] == [10000]
+
+
+def _seed_resting(db_path, offsets_and_values):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany("INSERT INTO heart_rate (user_id, timestamp, resting_heart_rate) VALUES (1, ?, ?)",
+                         [(f"{_day(offset)} 07:00:00", value) for offset, value in offsets_and_values])
+    conn.close()
+
+
+def test_new_rule_is_primed_from_stored_days_without_firing(db_path):
+    _seed_resting(db_path, [(3, 75), (2, 72), (1, 71)])
+    engine = RuleEngine()
+
+    rule = engine.add_rule(1, "channel", "resting_heart_rate", ">", 70, times=3)
+
+    assert engine.status(rule.rule_id) == {"qualifying_days": 3, "newest_day": _day(1), "active": True}
+    assert engine.ingest(1, [("resting_heart_rate", _day(0), 80)]) == []  # Already holding
+
+
+def test_consecutive_rule_fires_once_then_rearms_after_lapsing(db_path):
+    engine = RuleEngine()
+    rule = engine.add_rule(1, "channel", "resting_heart_rate", ">", 70, times=2)
+
+    assert engine.ingest(1, [("resting_heart_rate", _day(4), 75)]) == []
+    assert len(engine.ingest(1, [("resting_heart_rate", _day(3), 60), ("resting_heart_rate", _day(3), 90)])) == 1
+    assert engine.ingest(1, [("resting_heart_rate", _day(2), 72)]) == []
+    assert engine.ingest(1, [("resting_heart_rate", _day(1), 65)]) == []
+    assert not engine.status(rule.rule_id)["active"]
+
+    events = engine.ingest(1, [("resting_heart_rate", _day(0), 71), ("resting_heart_rate", _day(-1), 74)])
+    assert [event["day"] for event in events] == [_day(-1)]
+
+
+def test_calendar_week_rule_counts_from_monday(db_path):
+    engine = RuleEngine()
+    rule = engine.add_rule(1, "channel", "resting_heart_rate", ">", 70, times=2, calendar_week=True)
+    monday = TODAY - timedelta(days=TODAY.weekday())
+    last_sunday = (monday - timedelta(days=1)).isoformat()
+
+    engine.ingest(1, [("resting_heart_rate", last_sunday, 80)])
+    assert engine.ingest(1, [("resting_heart_rate", monday.isoformat(), 80)]) == []  # Sunday was last week
+
+    assert engine.status(rule.rule_id)["qualifying_days"] == 1
+    assert rule.describe() == "resting heart rate above 70 bpm on 2 days this week"
+
+
+def test_days_before_the_window_are_late_and_ignored(db_path):
+    engine = RuleEngine()
+    rule = engine.add_rule(1, "channel", "resting_heart_rate", ">", 70, times=2)
+    engine.ingest(1, [("resting_heart_rate", _day(0), 80)])
+
+    assert engine.ingest(1, [("resting_heart_rate", _day(5), 80), ("heart_rate", _day(0), 80)]) == []
+
+    assert engine.status(rule.rule_id)["qualifying_days"] == 1
+    assert (engine.metrics()["late"], engine.metrics()["ignored"]) == (1, 1)
+
+
+def test_removed_rule_stops_tracking_its_metric(db_path):
+    engine = RuleEngine()
+    rule = engine.add_rule(1, "channel", "steps", "<", 5000)
+    engine.ingest(1, [("steps", _day(1), 100)])
+
+    assert engine.remove_rule(rule.rule_id)
+    assert not engine.remove_rule(rule.rule_id)
+    assert engine.flush(1) == []
+    assert engine.metrics()["tracked_metrics"] == engine.metrics()["pending_days"] == 0
+
+
+@pytest.mark.parametrize("kwargs", [{"metric": "vo2max", "op": ">"}, {"metric": "steps", "op": "!="},
+                                    {"metric": "steps", "op": ">", "times": 3, "window_days": 2}])
+def test_invalid_rules_are_rejected(db_path, kwargs):
+    with pytest.raises(ValueError):
+        RuleEngine().add_rule(1, "channel", threshold=1, **kwargs)
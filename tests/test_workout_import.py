@@ -0,0 +1,67 @@
+"""
+Workout file imports are deduplicated per user on file content.
+"""
+import sqlite3
+
+import pytest
+
+from importers.workout_files import import_workout_files
+
+GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">
+ <trk><type>running</type><trkseg>
+{points}
+ </trkseg></trk>
+</gpx>
+"""
+
+
+def write_gpx(path, seconds: int = 3, start_minute: int = 0):
+    points = "\n".join(
+        f'  <trkpt lat="{52.0 + i * 0.0001:.4f}" lon="4.0"><time>2024-05-01T07:{start_minute:02d}:{i:02d}Z</time></trkpt>'
+        for i in range(seconds))
+    path.write_text(GPX.format(points=points))
+    return path
+
+
+@pytest.fixture
+def run(tmp_path):
+    return write_gpx(tmp_path / "run.gpx")
+
+
+def _activities(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT user_id, COUNT(*) FROM activities GROUP BY user_id ORDER BY 1").fetchall()
+    finally:
+        conn.close()
+
+
+def test_same_file_under_another_name_is_skipped(db_path, run, tmp_path):
+    copy = tmp_path / "copy.gpx"
+    copy.write_bytes(run.read_bytes())
+
+    first = import_workout_files([str(run)], db_path=str(db_path), workers=1)
+    second = import_workout_files([str(copy)], db_path=str(db_path), workers=1)
+
+    assert (first["imported"], second["imported"], second["skipped"]) == (1, 0, 1)
+
+
+def test_same_file_for_another_user_is_imported(db_path, run):
+    import_workout_files([str(run)], user_id=1, db_path=str(db_path), workers=1)
+    stats = import_workout_files([str(run)], user_id=2, db_path=str(db_path), workers=1)
+
+    assert stats["imported"] == 1
+    assert _activities(db_path) == [(1, 1), (2, 1)]
+
+
+def test_different_file_with_the_same_name_and_size_is_imported(db_path, tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first = write_gpx(tmp_path / "a" / "run.gpx")
+    second = write_gpx(tmp_path / "b" / "run.gpx", start_minute=30)
+    assert first.stat().st_size == second.stat().st_size
+
+    stats = import_workout_files([str(first), str(second)], db_path=str(db_path), workers=1)
+
+    assert stats["imported"] == 2
@@ -0,0 +1,73 @@
+"""
+Tool-result cache shared by the turns of one batch.
+
+Batch questions overlap heavily ("steps last week", "compare last week",
+"weekly summary" ...), so identical tool calls across the batch run once.
+Calls are keyed by user, tool and arguments with defaults filled in.
+Concurrent identical calls wait for the first one instead of running again.
+"""
+import json
+import threading
+from concurrent.futures import Future
+
+
+class ToolResultCache:
+    """Single-flight cache of tool results (one instance per batch)"""
+
+    def __init__(self):
+        self._results = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tool, args: dict, user_id: int) -> str:
+        """Cache key: user, tool name and arguments with schema defaults filled in"""
+        schema = getattr(tool, "args", None) or {}
+        filled = {name: args.get(name, spec.get("default")) for name, spec in schema.items()}
+        return json.dumps([user_id, tool.name, filled], sort_keys=True, default=str)
+
+    def get_or_run(self, tool, args: dict, user_id: int, run):
+        """
+        Result of a tool call, running it only if no identical call ran or is running.
+
+        Args:
+            tool: LangChain tool being called
+            args: Tool arguments from the model
+            user_id: User the call is for
+            run: Zero-argument callable that executes the tool
+
+        Returns:
+            The tool result (errors are not cached)
+        """
+        key = self.key(tool, args, user_id)
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+        try:
+            result = run()
+        except Exception as e:
+            with self._lock:
+                del self._results[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        """Hits, misses and distinct calls"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,144 @@
+"""
+Per-request tool subsetting and prompt token accounting.
+
+Every model call carries the system prompt and the JSON schema of each bound
+tool. The schemas are converted once when the agent is built; per turn, a
+keyword filter on the user's question picks the tools worth binding (falling
+back to all of them when nothing matches). Each call's prompt is split into a
+fixed part (system prompt + tool schemas) and a variable part (conversation)
+so the effect shows up in the metrics.
+"""
+import json
+import re
+import threading
+from typing import Iterable, Optional
+
+# Rough tokens-per-character ratio for English text and JSON (no tokenizer needed)
+CHARS_PER_TOKEN = 4
+
+# Tool -> keywords that make it relevant
+TOOL_KEYWORDS = {
+    "daily_steps_tool": r"steps?|walk\w*|distance|calories|active",
+    "sleep_data_tool": r"sleep\w*|slept|rem|deep|nap|bed",
+    "heart_rate_tool": r"heart|hr|bpm|pulse|resting",
+    "activity_history_tool": r"workouts?|activit\w*|exercis\w*|runs?|running|cycl\w*|swim\w*|gym|yoga|training",
+    "weekly_summary_tool": r"week\w*|summary|overview|overall",
+    "period_comparison_tool": r"compar\w*|vs|versus|than|change\w*|improv\w*|trend\w*|last (week|month)",
+    "device_info_tool": r"device|watch|tracker|profile|age|height|weight|who am i",
+    "date_range_search_tool": r"from|between|since|range|\d{4}-\d{2}-\d{2}",
+    "dashboard_tool": r"dashboard|everything|all (my )?(data|metrics)|month|how am i doing|health",
+    "anomaly_detection_tool": r"unusual|anomal\w*|weird|abnormal|outliers?|odd|spike|drop\w*|debt",
+    "correlation_tool": r"correlat\w*|affect\w*|impact\w*|relat\w*|effect|cause\w*|influence\w*|because",
+    "workout_analysis_tool": r"splits?|pace|zones?|gps|km|mile|analy[sz]\w*",
+}
+# Broad tools bound whenever subsetting applies, so general follow-ups still have an option
+ALWAYS_BOUND = ("dashboard_tool",)
+
+_PATTERNS = {name: re.compile(rf"\b({keywords})\b", re.IGNORECASE) for name, keywords in TOOL_KEYWORDS.items()}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a string."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(messages: list) -> int:
+    """Estimated tokens of conversation messages (content plus tool call arguments)."""
+    total = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+        total += estimate_tokens(content if isinstance(content, str) else json.dumps(content, default=str))
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            total += estimate_tokens(tool_call.get("name", "") + json.dumps(tool_call.get("args", {}), default=str))
+    return total
+
+
+def select_tools(question: str, available: Iterable[str]) -> Optional[tuple]:
+    """
+    Tools relevant to a question.
+
+    Args:
+        question: The user's question for this turn
+        available: Names of all tools
+
+    Returns:
+        Sorted tuple of tool names to bind, or None to bind every tool
+    """
+    available = list(available)
+    matched = {name for name in available if name in _PATTERNS and _PATTERNS[name].search(question or "")}
+    if not matched:
+        return None
+    matched.update(name for name in ALWAYS_BOUND if name in available)
+    if len(matched) >= len(available):
+        return None
+    return tuple(sorted(matched))
+
+
+class PromptAccounting:
+    """Fixed vs variable prompt tokens per model call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {"calls": 0, "system_tokens": 0, "tool_schema_tokens": 0, "variable_tokens": 0,
+                        "tools_bound": 0, "tool_schema_tokens_saved": 0, "reported_input_tokens": 0,
+                        "reported_calls": 0}
+        self.last_call: Optional[dict] = None
+
+    def record(self, tier: str, system_tokens: int, tool_schema_tokens: int, variable_tokens: int,
+               tools_bound: int, all_tools_tokens: int, reported_input_tokens: Optional[int] = None):
+        """
+        Record one model call.
+
+        Args:
+            tier: Model tier that was called
+            system_tokens: Estimated tokens of the system prompt
+            tool_schema_tokens: Estimated tokens of the bound tool schemas
+            variable_tokens: Estimated tokens of the conversation messages
+            tools_bound: Number of tools bound
+            all_tools_tokens: Estimated tokens if every tool had been bound
+            reported_input_tokens: Input tokens reported by the provider, if any
+        """
+        call = {
+            "tier": tier,
+            "fixed_tokens": system_tokens + tool_schema_tokens,
+            "system_tokens": system_tokens,
+            "tool_schema_tokens": tool_schema_tokens,
+            "variable_tokens": variable_tokens,
+            "tools_bound": tools_bound,
+            "reported_input_tokens": reported_input_tokens,
+        }
+        with self._lock:
+            self.last_call = call
+            totals = self._totals
+            totals["calls"] += 1
+            totals["system_tokens"] += system_tokens
+            totals["tool_schema_tokens"] += tool_schema_tokens
+            totals["variable_tokens"] += variable_tokens
+            totals["tools_bound"] += tools_bound
+            totals["tool_schema_tokens_saved"] += all_tools_tokens - tool_schema_tokens
+            if reported_input_tokens is not None:
+                totals["reported_input_tokens"] += reported_input_tokens
+                totals["reported_calls"] += 1
+
+    def metrics(self) -> dict:
+        """Average fixed/variable tokens per call and schema tokens saved by subsetting"""
+        with self._lock:
+            totals = dict(self._totals)
+            last_call = self.last_call
+        calls = totals["calls"] or 1
+        return {
+            "calls": totals["calls"],
+            "avg_fixed_tokens": round((totals["system_tokens"] + totals["tool_schema_tokens"]) / calls, 1),
+            "avg_system_tokens": round(totals["system_tokens"] / calls, 1),
+            "avg_tool_schema_tokens": round(totals["tool_schema_tokens"] / calls, 1),
+            "avg_variable_tokens": round(totals["variable_tokens"] / calls, 1),
+            "avg_tools_bound": round(totals["tools_bound"] / calls, 2),
+            "tool_schema_tokens_saved": totals["tool_schema_tokens_saved"],
+            "avg_reported_input_tokens": round(totals["reported_input_tokens"] / totals["reported_calls"], 1)
+            if totals["reported_calls"] else None,
+            "last_call": last_call,
+        }
+
+
+# Global prompt accounting instance
+prompt_accounting = PromptAccounting()
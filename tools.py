@@ -1,81 +1,194 @@
 """Tools for querying wearables database."""
 import sqlite3
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from typing import Optional
 from pathlib import Path
 
+from database import VERSIONED_TABLES, init_schema
+from sharding import shard_router
 
-def get_db_connection():
-    """Create a database connection."""
-    # Get the absolute path to wearables.db in project root
-    current_dir = Path(__file__).resolve().parent
-    db_path = current_dir / 'wearables.db'
-    return sqlite3.connect(str(db_path))
 
+def get_db_path() -> Path:
+    """Get the absolute path to wearables.db in project root."""
+    return Path(__file__).resolve().parent / 'wearables.db'
 
-def get_daily_steps(date: Optional[str] = None, days: int = 7) -> str:
+
+def get_db_connection(user_id: int = 1):
+    """
+    Get a connection to the database file holding a user's data.
+    
+    Connections come from the shard router's pool (the schema is brought up
+    to date on first use); close() hands them back.
+    """
+    return shard_router.connect(user_id)
+
+
+def warm_up_database(user_id: int = 1):
+    """
+    Open the database and touch every table so the first real query
+    does not pay for cold file and page-cache misses.
+    """
+    conn = get_db_connection(user_id)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    for (table,) in cursor.fetchall():
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        cursor.fetchone()
+    conn.close()
+
+
+# Tables whose contents determine tool answers
+DATA_TABLES = VERSIONED_TABLES
+
+
+class DataVersionTracker:
+    """
+    Per-table data versions for cache invalidation.
+    
+    Keeps one connection to a database file open and polls PRAGMA data_version, which
+    only changes when another connection commits. Per-table (row count, max
+    rowid, write count) fingerprints are recomputed only after such a change, so
+    the steady-state cost is a single pragma. The write count comes from
+    table_versions, which triggers bump on every insert, update and delete, so
+    an in-place UPDATE changes the fingerprint too.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn = None
+        self._data_version = None
+        self._versions = {}
+        self._lock = threading.Lock()
+    
+    def versions(self) -> dict:
+        """Return {table: (row count, max rowid, write count)} for the data tables."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+                init_schema(self._conn)  # Make sure the write-count triggers exist
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                for table in DATA_TABLES:
+                    self._versions[table] = tuple(self._conn.execute(
+                        f"SELECT COUNT(*), COALESCE(MAX(rowid), 0), "
+                        f"(SELECT version FROM table_versions WHERE table_name = ?) FROM {table}", (table,)
+                    ).fetchone())
+                self._data_version = data_version
+            return dict(self._versions)
+    
+    def close(self):
+        """Close the polling connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# One tracker per database file, least recently used first
+_data_version_trackers = OrderedDict()
+_trackers_lock = threading.Lock()
+
+
+def get_data_versions(user_id: int = 1) -> dict:
+    """
+    Get a version fingerprint for each data table in a user's database file.
+    
+    Args:
+        user_id: User whose database file to check
+    
+    Returns:
+        Dict mapping table name to (row count, max rowid, write count)
+    """
+    path = shard_router.path_for(user_id)
+    with _trackers_lock:
+        tracker = _data_version_trackers.get(path)
+        if tracker is None:
+            tracker = _data_version_trackers[path] = DataVersionTracker(path)
+            # Bounded like the connection pool; an evicted tracker just recounts next time
+            while len(_data_version_trackers) > max(1, shard_router.max_connections):
+                _data_version_trackers.popitem(last=False)[1].close()
+        _data_version_trackers.move_to_end(path)
+    return tracker.versions()
+
+
+def _fmt(value, spec: str = "", unit: str = "") -> str:
+    """Format a column that may be NULL (imports only fill the columns a source has)."""
+    return "n/a" if value is None else f"{value:{spec}}{unit}"
+
+
+def _mean(values) -> Optional[float]:
+    """Average of the non-NULL values, or None if there are none."""
+    present = [value for value in values if value is not None]
+    return sum(present) / len(present) if present else None
+
+
+def get_daily_steps(date: Optional[str] = None, days: int = 7, user_id: int = 1) -> str:
     """
     Get daily step counts for a user.
     
     Args:
         date: Specific date in YYYY-MM-DD format. If None, uses today.
         days: Number of days to look back (default 7)
+        user_id: User whose data to read
     
     Returns:
         String with step data
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     if date:
         cursor.execute('''
             SELECT date, steps, distance_km, calories_burned, active_minutes
             FROM daily_metrics
-            WHERE user_id = 1 AND date = ?
-        ''', (date,))
+            WHERE user_id = ? AND date = ?
+        ''', (user_id, date))
         result = cursor.fetchone()
         conn.close()
         
         if result:
-            return f"On {result[0]}: {result[1]:,} steps, {result[2]} km distance, {result[3]} calories burned, {result[4]} active minutes"
+            return (f"On {result[0]}: {_fmt(result[1], ',.0f')} steps, {_fmt(result[2])} km distance, "
+                    f"{_fmt(result[3])} calories burned, {_fmt(result[4])} active minutes")
         else:
             return f"No data found for {date}"
     else:
         cursor.execute('''
             SELECT date, steps, distance_km, calories_burned, active_minutes
             FROM daily_metrics
-            WHERE user_id = 1
+            WHERE user_id = ?
             ORDER BY date DESC
             LIMIT ?
-        ''', (days,))
+        ''', (user_id, days))
         results = cursor.fetchall()
         conn.close()
         
         if results:
             output = f"Step data for the last {days} days:\n"
-            total_steps = 0
             for row in results:
-                output += f"- {row[0]}: {row[1]:,} steps, {row[2]} km, {row[3]} calories, {row[4]} active min\n"
-                total_steps += row[1]
-            avg_steps = total_steps // len(results)
-            output += f"\nAverage: {avg_steps:,} steps/day"
+                output += (f"- {row[0]}: {_fmt(row[1], ',.0f')} steps, {_fmt(row[2])} km, {_fmt(row[3])} calories, "
+                           f"{_fmt(row[4])} active min\n")
+            avg_steps = _mean(row[1] for row in results)
+            output += f"\nAverage: {_fmt(avg_steps, ',.0f')} steps/day"
             return output
         else:
             return "No step data found"
 
 
-def get_sleep_data(date: Optional[str] = None, days: int = 7) -> str:
+def get_sleep_data(date: Optional[str] = None, days: int = 7, user_id: int = 1) -> str:
     """
     Get sleep data for a user.
     
     Args:
         date: Specific date in YYYY-MM-DD format. If None, uses recent data.
         days: Number of days to look back (default 7)
+        user_id: User whose data to read
     
     Returns:
         String with sleep data
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     if date:
@@ -83,113 +196,115 @@ def get_sleep_data(date: Optional[str] = None, days: int = 7) -> str:
             SELECT date, total_sleep_hours, deep_sleep_hours, light_sleep_hours, 
                    rem_sleep_hours, awake_hours, sleep_score
             FROM sleep_data
-            WHERE user_id = 1 AND date = ?
-        ''', (date,))
+            WHERE user_id = ? AND date = ?
+        ''', (user_id, date))
         result = cursor.fetchone()
         conn.close()
         
         if result:
             return (f"Sleep data for {result[0]}:\n"
-                   f"- Total sleep: {result[1]:.1f} hours\n"
-                   f"- Deep sleep: {result[2]:.1f} hours\n"
-                   f"- Light sleep: {result[3]:.1f} hours\n"
-                   f"- REM sleep: {result[4]:.1f} hours\n"
-                   f"- Awake time: {result[5]:.1f} hours\n"
-                   f"- Sleep score: {result[6]}/100")
+                   f"- Total sleep: {_fmt(result[1], '.1f')} hours\n"
+                   f"- Deep sleep: {_fmt(result[2], '.1f')} hours\n"
+                   f"- Light sleep: {_fmt(result[3], '.1f')} hours\n"
+                   f"- REM sleep: {_fmt(result[4], '.1f')} hours\n"
+                   f"- Awake time: {_fmt(result[5], '.1f')} hours\n"
+                   f"- Sleep score: {_fmt(result[6], '', '/100')}")
         else:
             return f"No sleep data found for {date}"
     else:
         cursor.execute('''
             SELECT date, total_sleep_hours, deep_sleep_hours, rem_sleep_hours, sleep_score
             FROM sleep_data
-            WHERE user_id = 1
+            WHERE user_id = ?
             ORDER BY date DESC
             LIMIT ?
-        ''', (days,))
+        ''', (user_id, days))
         results = cursor.fetchall()
         conn.close()
         
         if results:
             output = f"Sleep data for the last {days} days:\n"
-            total_sleep = 0
-            total_deep = 0
-            total_rem = 0
-            total_score = 0
-            
             for row in results:
-                output += f"- {row[0]}: {row[1]:.1f}h total (Deep: {row[2]:.1f}h, REM: {row[3]:.1f}h) - Score: {row[4]}\n"
-                total_sleep += row[1]
-                total_deep += row[2]
-                total_rem += row[3]
-                total_score += row[4]
+                output += (f"- {row[0]}: {_fmt(row[1], '.1f', 'h')} total (Deep: {_fmt(row[2], '.1f', 'h')}, "
+                           f"REM: {_fmt(row[3], '.1f', 'h')}) - Score: {_fmt(row[4])}\n")
             
-            avg_sleep = total_sleep / len(results)
-            avg_score = total_score // len(results)
-            output += f"\nAverages: {avg_sleep:.1f}h sleep/night, Score: {avg_score}/100"
+            avg_sleep = _mean(row[1] for row in results)
+            avg_score = _mean(row[4] for row in results)
+            output += (f"\nAverages: {_fmt(avg_sleep, '.1f', 'h')} sleep/night, "
+                       f"Score: {_fmt(avg_score, '.0f', '/100')}")
             return output
         else:
             return "No sleep data found"
 
 
-def get_heart_rate_data(date: Optional[str] = None) -> str:
+def get_heart_rate_data(date: Optional[str] = None, user_id: int = 1) -> str:
     """
     Get heart rate data for a user.
     
     Args:
         date: Specific date in YYYY-MM-DD format. If None, uses today.
+        user_id: User whose data to read
     
     Returns:
         String with heart rate data
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     if not date:
         date = datetime.now().strftime('%Y-%m-%d')
     
+    # Raw samples for recent days, minute/hour aggregates for compacted ones
     cursor.execute('''
-        SELECT timestamp, heart_rate, resting_heart_rate
-        FROM heart_rate
-        WHERE user_id = 1 AND date(timestamp) = ?
+        SELECT timestamp, sum_hr / hr_count, min_hr, max_hr, hr_count, sum_resting, resting_count, resolution
+        FROM heart_rate_samples
+        WHERE user_id = ? AND timestamp >= ? AND timestamp < date(?, '+1 day')
         ORDER BY timestamp
-    ''', (date,))
+    ''', (user_id, date, date))
     results = cursor.fetchall()
     conn.close()
     
-    if results:
-        heart_rates = [row[1] for row in results]
-        avg_hr = sum(heart_rates) // len(heart_rates)
-        max_hr = max(heart_rates)
-        min_hr = min(heart_rates)
-        resting_hr = results[0][2]
+    readings = [row for row in results if row[4]]
+    resting_count = sum(row[6] for row in results)
+    resting_hr = round(sum(row[5] or 0 for row in results) / resting_count) if resting_count else None
+    if not readings and resting_hr is not None:
+        # Imports can carry resting heart rate without individual readings
+        return f"Heart rate data for {date}:\n- Resting heart rate: {resting_hr} bpm\n- No individual readings"
+    if readings:
+        avg_hr = int(sum(row[1] * row[4] for row in readings) // sum(row[4] for row in readings))
+        max_hr = max(row[3] for row in readings)
+        min_hr = min(row[2] for row in readings)
         
         output = f"Heart rate data for {date}:\n"
-        output += f"- Resting heart rate: {resting_hr} bpm\n"
+        output += f"- Resting heart rate: {_fmt(resting_hr, '', ' bpm')}\n"
         output += f"- Average: {avg_hr} bpm\n"
         output += f"- Max: {max_hr} bpm\n"
         output += f"- Min: {min_hr} bpm\n"
-        output += "\nReadings throughout the day:\n"
-        for row in results[:8]:  # Show first 8 readings
+        resolution = readings[0][7]
+        label = {"raw": "", "minute": " (per-minute averages)", "hour": " (hourly averages)"}[resolution]
+        output += f"\nReadings throughout the day{label}:\n"
+        for row in readings[:8]:  # Show first 8 readings
             time = row[0].split()[1][:5]
-            output += f"  {time}: {row[1]} bpm\n"
+            output += f"  {time}: {round(row[1])} bpm\n"
         
         return output
     else:
         return f"No heart rate data found for {date}"
 
 
-def get_activity_history(days: int = 14, activity_type: Optional[str] = None) -> str:
+def get_activity_history(days: int = 14, activity_type: Optional[str] = None, user_id: int = 1) -> str:
     """
     Get activity/workout history for a user.
     
     Args:
         days: Number of days to look back (default 14)
         activity_type: Filter by specific activity type (e.g., 'Running', 'Cycling')
+        user_id: User whose data to read
     
     Returns:
         String with activity data
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     if activity_type:
@@ -197,18 +312,18 @@ def get_activity_history(days: int = 14, activity_type: Optional[str] = None) ->
             SELECT date, activity_type, duration_minutes, calories, 
                    average_heart_rate, max_heart_rate, distance_km
             FROM activities
-            WHERE user_id = 1 AND activity_type LIKE ?
+            WHERE user_id = ? AND activity_type LIKE ?
             ORDER BY date DESC
             LIMIT 20
-        ''', (f'%{activity_type}%',))
+        ''', (user_id, f'%{activity_type}%'))
     else:
         cursor.execute('''
             SELECT date, activity_type, duration_minutes, calories, 
                    average_heart_rate, max_heart_rate, distance_km
             FROM activities
-            WHERE user_id = 1 AND date >= date('now', ?)
+            WHERE user_id = ? AND date >= date('now', ?)
             ORDER BY date DESC
-        ''', (f'-{days} days',))
+        ''', (user_id, f'-{days} days'))
     
     results = cursor.fetchall()
     conn.close()
@@ -219,12 +334,12 @@ def get_activity_history(days: int = 14, activity_type: Optional[str] = None) ->
         total_calories = 0
         
         for row in results:
-            distance_str = f", {row[6]} km" if row[6] > 0 else ""
+            distance_str = f", {row[6]} km" if row[6] else ""
             output += (f"- {row[0]}: {row[1]}\n"
-                      f"  Duration: {row[2]} min, Calories: {row[3]}, "
-                      f"Avg HR: {row[4]} bpm, Max HR: {row[5]} bpm{distance_str}\n")
-            total_duration += row[2]
-            total_calories += row[3]
+                      f"  Duration: {_fmt(row[2], '', ' min')}, Calories: {_fmt(row[3])}, "
+                      f"Avg HR: {_fmt(row[4], '', ' bpm')}, Max HR: {_fmt(row[5], '', ' bpm')}{distance_str}\n")
+            total_duration += row[2] or 0
+            total_calories += row[3] or 0
         
         output += f"\nTotal: {len(results)} activities, {total_duration} minutes, {total_calories} calories"
         return output
@@ -233,22 +348,25 @@ def get_activity_history(days: int = 14, activity_type: Optional[str] = None) ->
         return f"No activities found{filter_msg}"
 
 
-def get_weekly_summary() -> str:
+def get_weekly_summary(user_id: int = 1) -> str:
     """
     Get a comprehensive weekly summary of all metrics.
     
+    Args:
+        user_id: User whose data to read
+    
     Returns:
         String with weekly summary
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     # Steps summary
     cursor.execute('''
         SELECT AVG(steps), SUM(steps), AVG(calories_burned), AVG(active_minutes)
         FROM daily_metrics
-        WHERE user_id = 1 AND date >= date('now', '-7 days')
-    ''')
+        WHERE user_id = ? AND date >= date('now', '-7 days')
+    ''', (user_id,))
     steps_data = cursor.fetchone()
     
     # Sleep summary
@@ -256,16 +374,16 @@ def get_weekly_summary() -> str:
         SELECT AVG(total_sleep_hours), AVG(deep_sleep_hours), 
                AVG(rem_sleep_hours), AVG(sleep_score)
         FROM sleep_data
-        WHERE user_id = 1 AND date >= date('now', '-7 days')
-    ''')
+        WHERE user_id = ? AND date >= date('now', '-7 days')
+    ''', (user_id,))
     sleep_data = cursor.fetchone()
     
     # Activity summary
     cursor.execute('''
         SELECT COUNT(*), SUM(duration_minutes), SUM(calories)
         FROM activities
-        WHERE user_id = 1 AND date >= date('now', '-7 days')
-    ''')
+        WHERE user_id = ? AND date >= date('now', '-7 days')
+    ''', (user_id,))
     activity_data = cursor.fetchone()
     
     conn.close()
@@ -274,38 +392,157 @@ def get_weekly_summary() -> str:
     output += "=" * 50 + "\n\n"
     
     output += "🚶 ACTIVITY:\n"
-    if steps_data[0]:
-        output += f"  • Average steps: {int(steps_data[0]):,} steps/day\n"
-        output += f"  • Total steps: {int(steps_data[1]):,} steps\n"
-        output += f"  • Average calories: {int(steps_data[2])} cal/day\n"
-        output += f"  • Average active time: {int(steps_data[3])} min/day\n\n"
+    if any(value is not None for value in steps_data):
+        output += f"  • Average steps: {_fmt(steps_data[0], ',.0f')} steps/day\n"
+        output += f"  • Total steps: {_fmt(steps_data[1], ',.0f')} steps\n"
+        output += f"  • Average calories: {_fmt(steps_data[2], '.0f', ' cal/day')}\n"
+        output += f"  • Average active time: {_fmt(steps_data[3], '.0f', ' min/day')}\n\n"
     
     output += "😴 SLEEP:\n"
-    if sleep_data[0]:
-        output += f"  • Average sleep: {sleep_data[0]:.1f} hours/night\n"
-        output += f"  • Average deep sleep: {sleep_data[1]:.1f} hours\n"
-        output += f"  • Average REM sleep: {sleep_data[2]:.1f} hours\n"
-        output += f"  • Average sleep score: {int(sleep_data[3])}/100\n\n"
+    if any(value is not None for value in sleep_data):
+        output += f"  • Average sleep: {_fmt(sleep_data[0], '.1f', ' hours/night')}\n"
+        output += f"  • Average deep sleep: {_fmt(sleep_data[1], '.1f', ' hours')}\n"
+        output += f"  • Average REM sleep: {_fmt(sleep_data[2], '.1f', ' hours')}\n"
+        output += f"  • Average sleep score: {_fmt(sleep_data[3], '.0f', '/100')}\n\n"
     
     output += "💪 WORKOUTS:\n"
     if activity_data[0] and activity_data[0] > 0:
         output += f"  • Total workouts: {activity_data[0]}\n"
-        output += f"  • Total workout time: {activity_data[1]} minutes\n"
-        output += f"  • Total calories burned: {activity_data[2]}\n"
+        output += f"  • Total workout time: {_fmt(activity_data[1], '', ' minutes')}\n"
+        output += f"  • Total calories burned: {_fmt(activity_data[2])}\n"
     else:
         output += "  • No recorded workouts this week\n"
     
     return output
 
 
-def get_device_info() -> str:
+def compare_periods(period_days: int = 7, periods: int = 2, end_date: Optional[str] = None,
+                    user_id: int = 1) -> str:
+    """
+    Compare consecutive periods (e.g. this week vs last week) across all metrics.
+    
+    Aggregates and deltas are computed in a single grouped query with
+    window functions, so the numbers are exact rather than left to the LLM.
+    Every period is listed, even without data, so each change is against
+    the period right before it.
+    
+    Args:
+        period_days: Length of each period in days (default 7)
+        periods: Number of consecutive periods to compare (default 2)
+        end_date: Last day of the most recent period in YYYY-MM-DD format. If None, uses today.
+        user_id: User whose data to read
+    
+    Returns:
+        String with per-period averages and changes vs the previous period
+    """
+    period_days = max(1, int(period_days))
+    periods = max(2, int(periods))
+    if not end_date:
+        end_date = datetime.now().strftime('%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    start_date = (end - timedelta(days=period_days * periods - 1)).strftime('%Y-%m-%d')
+    
+    conn = get_db_connection(user_id)
+    cursor = conn.cursor()
+    cursor.execute('''
+        WITH daily AS (
+            SELECT date, steps, NULL AS sleep_hours, NULL AS sleep_score,
+                   NULL AS resting_hr, NULL AS workouts, NULL AS workout_minutes
+            FROM daily_metrics
+            WHERE user_id = :user AND date BETWEEN :start AND :end
+            UNION ALL
+            SELECT date, NULL, total_sleep_hours, sleep_score, NULL, NULL, NULL
+            FROM sleep_data
+            WHERE user_id = :user AND date BETWEEN :start AND :end
+            UNION ALL
+            SELECT date(timestamp), NULL, NULL, NULL, SUM(sum_resting) / SUM(resting_count), NULL, NULL
+            FROM heart_rate_samples
+            WHERE user_id = :user AND timestamp >= :start AND timestamp < date(:end, '+1 day')
+            GROUP BY date(timestamp)
+            UNION ALL
+            SELECT date, NULL, NULL, NULL, NULL, 1, duration_minutes
+            FROM activities
+            WHERE user_id = :user AND date BETWEEN :start AND :end
+        ),
+        period_totals AS (
+            SELECT CAST((julianday(:end) - julianday(date)) / :days AS INTEGER) AS period,
+                   AVG(steps) AS steps, AVG(sleep_hours) AS sleep_hours,
+                   AVG(sleep_score) AS sleep_score, AVG(resting_hr) AS resting_hr,
+                   COALESCE(SUM(workouts), 0) AS workouts,
+                   COALESCE(SUM(workout_minutes), 0) AS workout_minutes
+            FROM daily
+            GROUP BY period
+        ),
+        series(period) AS (
+            SELECT 0
+            UNION ALL
+            SELECT period + 1 FROM series WHERE period < :periods - 1
+        )
+        SELECT period, steps, sleep_hours, sleep_score, resting_hr, workouts, workout_minutes,
+               steps - LAG(steps) OVER w,
+               100.0 * (steps - LAG(steps) OVER w) / NULLIF(LAG(steps) OVER w, 0),
+               sleep_hours - LAG(sleep_hours) OVER w,
+               100.0 * (sleep_hours - LAG(sleep_hours) OVER w) / NULLIF(LAG(sleep_hours) OVER w, 0),
+               sleep_score - LAG(sleep_score) OVER w,
+               resting_hr - LAG(resting_hr) OVER w,
+               workouts - LAG(workouts) OVER w,
+               workout_minutes - LAG(workout_minutes) OVER w
+        FROM series LEFT JOIN period_totals USING (period)
+        WINDOW w AS (ORDER BY period DESC)
+        ORDER BY period DESC
+    ''', {"user": user_id, "start": start_date, "end": end_date, "days": period_days, "periods": periods})
+    results = cursor.fetchall()
+    conn.close()
+    
+    # Periods without data have no workout count (periods with data count 0 or more)
+    if all(row[5] is None for row in results):
+        return f"No data found from {start_date} to {end_date}"
+    
+    def change(delta, pct=None, fmt="{:+,.0f}"):
+        if delta is None:
+            return ""
+        text = fmt.format(delta)
+        if pct is not None:
+            text += f", {pct:+.1f}%"
+        return f" ({text})"
+    
+    output = f"Comparison of {periods} periods of {period_days} days ending {end_date} (oldest first; changes vs previous period):\n"
+    for row in results:
+        (period, steps, sleep_hours, sleep_score, resting_hr, workouts, workout_minutes,
+         d_steps, p_steps, d_sleep, p_sleep, d_score, d_hr, d_workouts, d_minutes) = row
+        period_end = end - timedelta(days=period * period_days)
+        period_start = period_end - timedelta(days=period_days - 1)
+        parts = []
+        if steps is not None:
+            parts.append(f"steps {steps:,.0f}/day{change(d_steps, p_steps)}")
+        if sleep_hours is not None:
+            parts.append(f"sleep {sleep_hours:.1f}h/night{change(d_sleep, p_sleep, '{:+.1f}h')}")
+        if sleep_score is not None:
+            parts.append(f"sleep score {sleep_score:.0f}{change(d_score)}")
+        if resting_hr is not None:
+            parts.append(f"resting HR {resting_hr:.0f} bpm{change(d_hr)}")
+        if workouts is None:
+            parts.append("no data")
+        else:
+            workout_change = f" ({d_workouts:+}, {d_minutes:+} min)" if d_workouts is not None else ""
+            parts.append(f"workouts {workouts} / {workout_minutes} min{workout_change}")
+        output += (f"- {period_start.strftime('%Y-%m-%d')} to {period_end.strftime('%Y-%m-%d')}: "
+                   + ", ".join(parts) + "\n")
+    
+    return output
+
+
+def get_device_info(user_id: int = 1) -> str:
     """
     Get information about the user's wearable device.
     
+    Args:
+        user_id: User whose device to look up
+    
     Returns:
         String with device information
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -313,8 +550,8 @@ def get_device_info() -> str:
                u.name, u.age, u.gender, u.height_cm, u.weight_kg
         FROM devices d
         JOIN users u ON d.user_id = u.user_id
-        WHERE d.user_id = 1
-    ''')
+        WHERE d.user_id = ?
+    ''', (user_id,))
     result = cursor.fetchone()
     conn.close()
     
@@ -330,7 +567,8 @@ def get_device_info() -> str:
         return "No device information found"
 
 
-def search_data_by_date_range(start_date: str, end_date: str, metric_type: str = "steps") -> str:
+def search_data_by_date_range(start_date: str, end_date: str, metric_type: str = "steps",
+                              user_id: int = 1) -> str:
     """
     Search for data within a specific date range.
     
@@ -338,45 +576,151 @@ def search_data_by_date_range(start_date: str, end_date: str, metric_type: str =
         start_date: Start date in YYYY-MM-DD format
         end_date: End date in YYYY-MM-DD format
         metric_type: Type of metric to retrieve (steps, sleep, activities)
+        user_id: User whose data to read
     
     Returns:
         String with requested data
     """
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cursor = conn.cursor()
     
     if metric_type.lower() == "steps":
         cursor.execute('''
             SELECT date, steps, distance_km, calories_burned
             FROM daily_metrics
-            WHERE user_id = 1 AND date BETWEEN ? AND ?
+            WHERE user_id = ? AND date BETWEEN ? AND ?
             ORDER BY date
-        ''', (start_date, end_date))
+        ''', (user_id, start_date, end_date))
         results = cursor.fetchall()
+        conn.close()
         
         if results:
             output = f"Steps data from {start_date} to {end_date}:\n"
-            total_steps = 0
             for row in results:
-                output += f"- {row[0]}: {row[1]:,} steps, {row[2]} km, {row[3]} cal\n"
-                total_steps += row[1]
-            output += f"\nTotal steps: {total_steps:,}"
+                output += f"- {row[0]}: {_fmt(row[1], ',.0f')} steps, {_fmt(row[2])} km, {_fmt(row[3])} cal\n"
+            output += f"\nTotal steps: {sum(row[1] or 0 for row in results):,.0f}"
             return output
     
     elif metric_type.lower() == "sleep":
         cursor.execute('''
             SELECT date, total_sleep_hours, sleep_score
             FROM sleep_data
-            WHERE user_id = 1 AND date BETWEEN ? AND ?
+            WHERE user_id = ? AND date BETWEEN ? AND ?
             ORDER BY date
-        ''', (start_date, end_date))
+        ''', (user_id, start_date, end_date))
         results = cursor.fetchall()
+        conn.close()
         
         if results:
             output = f"Sleep data from {start_date} to {end_date}:\n"
             for row in results:
-                output += f"- {row[0]}: {row[1]:.1f} hours, Score: {row[2]}/100\n"
+                output += f"- {row[0]}: {_fmt(row[1], '.1f', ' hours')}, Score: {_fmt(row[2], '', '/100')}\n"
             return output
+    else:
+        conn.close()
+    return f"No {metric_type} data found for the specified date range"
+
+
+# Per-metric SELECTs for get_dashboard; each yields (date, metric, v1, v2, v3, v4)
+DASHBOARD_QUERIES = {
+    "steps": '''
+        SELECT date, 'steps', steps, distance_km, calories_burned, active_minutes
+        FROM daily_metrics
+        WHERE user_id = :user AND date BETWEEN :start AND :end
+    ''',
+    "sleep": '''
+        SELECT date, 'sleep', total_sleep_hours, deep_sleep_hours, rem_sleep_hours, sleep_score
+        FROM sleep_data
+        WHERE user_id = :user AND date BETWEEN :start AND :end
+    ''',
+    "heart_rate": '''
+        SELECT date(timestamp), 'heart_rate', SUM(sum_resting) / SUM(resting_count),
+               SUM(sum_hr) / SUM(hr_count), MAX(max_hr), MIN(min_hr)
+        FROM heart_rate_samples
+        WHERE user_id = :user AND timestamp >= :start AND timestamp < date(:end, '+1 day')
+        GROUP BY date(timestamp)
+    ''',
+    "activities": '''
+        SELECT date, 'activities', COUNT(*), SUM(duration_minutes), SUM(calories),
+               GROUP_CONCAT(activity_type, ', ')
+        FROM activities
+        WHERE user_id = :user AND date BETWEEN :start AND :end
+        GROUP BY date
+    ''',
+}
+
+
+def get_dashboard(start_date: str, end_date: str, metrics: str = "steps,sleep,heart_rate,activities",
+                  user_id: int = 1) -> str:
+    """
+    Get several metrics for a date range in one query, aligned per day.
     
+    Args:
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        metrics: Comma-separated subset of steps, sleep, heart_rate, activities
+        user_id: User whose data to read
+    
+    Returns:
+        String with one line per day covering every requested metric, plus averages
+    """
+    requested = [m.strip().lower() for m in metrics.split(",") if m.strip()]
+    unknown = [m for m in requested if m not in DASHBOARD_QUERIES]
+    if unknown or not requested:
+        return (f"Unknown metrics: {', '.join(unknown) or '(none)'}. "
+                f"Choose from: {', '.join(DASHBOARD_QUERIES)}")
+    
+    conn = get_db_connection(user_id)
+    cursor = conn.cursor()
+    query = " UNION ALL ".join(DASHBOARD_QUERIES[m] for m in requested) + " ORDER BY 1"
+    cursor.execute(query, {"user": user_id, "start": start_date, "end": end_date})
+    results = cursor.fetchall()
     conn.close()
-    return f"No {metric_type} data found for the specified date range"
+    
+    if not results:
+        return f"No {', '.join(requested)} data found from {start_date} to {end_date}"
+    
+    # Align rows per day
+    days = {}
+    for day, metric, v1, v2, v3, v4 in results:
+        days.setdefault(day, {})[metric] = (v1, v2, v3, v4)
+    
+    totals = {metric: [] for metric in requested}
+    output = f"Dashboard from {start_date} to {end_date}:\n"
+    for day, values in days.items():
+        parts = []
+        if "steps" in values:
+            steps, distance, calories, active = values["steps"]
+            parts.append(f"{_fmt(steps, ',.0f')} steps ({_fmt(distance)} km, {_fmt(calories, '.0f')} cal, "
+                         f"{_fmt(active)} active min)")
+            totals["steps"].append(steps)
+        if "sleep" in values:
+            total, deep, rem, score = values["sleep"]
+            parts.append(f"sleep {_fmt(total, '.1f', 'h')} (deep {_fmt(deep, '.1f', 'h')}, "
+                         f"REM {_fmt(rem, '.1f', 'h')}, score {_fmt(score)})")
+            totals["sleep"].append(total)
+        if "heart_rate" in values:
+            resting, avg, max_hr, min_hr = values["heart_rate"]
+            parts.append(f"HR resting {_fmt(resting, '.0f')}, avg {_fmt(avg, '.0f')}, "
+                         f"max {_fmt(max_hr)}, min {_fmt(min_hr)} bpm")
+            totals["heart_rate"].append(resting)
+        if "activities" in values:
+            count, duration, calories, types = values["activities"]
+            parts.append(f"{types} ({_fmt(duration, '.0f')} min, {_fmt(calories, '.0f')} cal)")
+            totals["activities"].append(count)
+        output += f"- {day}: " + " | ".join(parts) + "\n"
+    
+    summary = []
+    steps, sleep, resting = (_mean(totals.get(m, [])) for m in ("steps", "sleep", "heart_rate"))
+    if steps is not None:
+        summary.append(f"{steps:,.0f} steps/day")
+    if sleep is not None:
+        summary.append(f"{sleep:.1f}h sleep/night")
+    if resting is not None:
+        summary.append(f"resting HR {resting:.0f} bpm")
+    workouts = sum(totals.get("activities", []))
+    if workouts:
+        summary.append(f"{workouts} workout{'s' if workouts != 1 else ''}")
+    if summary:
+        output += "\nAverages: " + ", ".join(summary)
+    return output